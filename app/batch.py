@@ -0,0 +1,56 @@
+import argparse
+import json
+import os
+import sys
+from components.batch_runner import BatchRunner, discover_pairs, load_manifest
+from components.cache import DiskCache
+from components.http_client import RateLimiter
+from components.pdf_parser import BACKENDS
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Validate contract/template pairs without the Streamlit UI")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--manifest", help="CSV (id,template,contract) or JSONL manifest of pairs")
+    source.add_argument("--dir", help="Directory of PDFs; contracts are paired with *Template* PDFs by name")
+    parser.add_argument("--output", required=True, help="JSONL file results are appended to; reruns resume from it")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processes for parsing, diffing and NER")
+    parser.add_argument("--llm-concurrency", type=int, default=4, help="Pairs analyzed by the LLM at once")
+    parser.add_argument("--pdf-backend", choices=BACKENDS, default="pdfplumber")
+    parser.add_argument("--template-store", help="Directory for persisted template fingerprints")
+    parser.add_argument("--llm-cache", default=os.path.join(".cache", "llm_responses.sqlite"),
+                        help="LLM response cache path ('' disables it)")
+    parser.add_argument("--requests-per-minute", type=float, help="LLM request rate limit across all pairs")
+    parser.add_argument("--tokens-per-minute", type=float, help="LLM prompt token rate limit across all pairs")
+    parser.add_argument("--line-hunks", action="store_true",
+                        help="Send line-based diff hunks to NER and the LLM instead of changed clauses")
+    parser.add_argument("--no-ner", action="store_true", help="Skip named entity extraction")
+    parser.add_argument("--no-llm", action="store_true", help="Skip LLM analysis (parse, diff and NER only)")
+    return parser.parse_args(argv)
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    pairs = load_manifest(args.manifest) if args.manifest else discover_pairs(args.dir)
+
+    analyzer = None
+    if not args.no_llm:
+        from components.llm_analyzer import LLMAnalyzer
+        cache = DiskCache(args.llm_cache) if args.llm_cache else None
+        rate_limiter = RateLimiter(args.requests_per_minute, args.tokens_per_minute)
+        analyzer = LLMAnalyzer(max_concurrency=2, cache=cache, scope_entities=True, rate_limiter=rate_limiter)
+
+    runner = BatchRunner(
+        args.output,
+        analyzer=analyzer,
+        workers=args.workers,
+        llm_concurrency=args.llm_concurrency,
+        pdf_backend=args.pdf_backend,
+        template_store_dir=args.template_store,
+        run_ner=not args.no_ner,
+        clause_diff=not args.line_hunks,
+    )
+    summary = runner.run(pairs)
+    print(json.dumps(summary))
+    return 1 if summary["error"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
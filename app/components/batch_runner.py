@@ -0,0 +1,247 @@
+# app/components/batch_runner.py
+import csv
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from .cache import MemoryCache, TieredCache
+from .instrumentation import Metrics
+from .ner_extractor import NERExtractor
+from .pipeline import ContractPipeline
+from .template_store import TemplateStore
+from .text_compare import TextComparer
+
+def load_manifest(path: str) -> list[dict]:
+    """Read pairs from a CSV (id,template,contract columns) or JSONL manifest.
+
+    Relative PDF paths are resolved against the manifest's directory.
+    """
+    base_dir = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    pairs = []
+    for row in rows:
+        template = os.path.join(base_dir, row["template"])
+        contract = os.path.join(base_dir, row["contract"])
+        pair_id = row.get("id") or os.path.splitext(os.path.basename(contract))[0]
+        pairs.append({"id": str(pair_id), "template": template, "contract": contract})
+    return pairs
+
+def _pairing_key(path: str) -> str:
+    """File name with 'template'/'contract' words removed, e.g. Lease_Contract_Template -> lease"""
+    stem = os.path.splitext(os.path.basename(path))[0].lower()
+    words = [word for word in re.split(r"[\s_\-]+", stem) if word and word not in ("template", "contract")]
+    return "_".join(words)
+
+def discover_pairs(directory: str) -> list[dict]:
+    """Pair each contract PDF in directory with the *Template* PDF sharing its name.
+
+    Contracts without a matching template are paired with the only template when
+    the directory holds exactly one, and skipped otherwise.
+    """
+    pdfs = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory) if name.lower().endswith(".pdf")
+    )
+    templates = [path for path in pdfs if "template" in os.path.basename(path).lower()]
+    contracts = [path for path in pdfs if path not in templates]
+    by_key = {_pairing_key(path): path for path in templates}
+
+    pairs = []
+    for contract in contracts:
+        template = by_key.get(_pairing_key(contract))
+        if template is None and len(templates) == 1:
+            template = templates[0]
+        if template is not None:
+            pair_id = os.path.splitext(os.path.basename(contract))[0]
+            pairs.append({"id": pair_id, "template": template, "contract": contract})
+    return pairs
+
+# Per-process state of prepare workers, created once by _init_worker
+_worker: dict = {}
+
+def _init_worker(pdf_backend: str, template_store_dir: str | None, run_ner: bool,
+                 clause_diff: bool = True) -> None:
+    # Templates recur across pairs: keep their fingerprints and text in memory for the life of the worker
+    _worker["pipeline"] = ContractPipeline(
+        TemplateStore(template_store_dir), None, pdf_backend=pdf_backend,
+        pdf_cache=TieredCache(MemoryCache()), clause_diff=clause_diff, run_ner=run_ner,
+    )
+    if run_ner:
+        NERExtractor.shared()  # Load the model before the first pair
+
+def prepare_pair(pair: dict) -> dict:
+    """Parse, diff and run diff-scoped NER for one pair (runs in a worker process).
+
+    Runs the same stage DAG as the app (ContractPipeline.schedule), up to the LLM.
+    """
+    metrics = Metrics()
+    with metrics.activate():
+        result = _prepare_pair(pair)
+    result["metrics"] = metrics.report()
+    return result
+
+def _prepare_pair(pair: dict) -> dict:
+    started = time.perf_counter()
+    with open(pair["template"], "rb") as f:
+        template_bytes = f.read()
+    with open(pair["contract"], "rb") as f:
+        contract_bytes = f.read()
+
+    with _worker["pipeline"].schedule(contract_bytes, template_bytes, prepare_only=True) as stages:
+        _, similarity, _ = stages.result("comparison")
+        hunks = stages.result("hunks")
+        _, _, entities, entity_delta = stages.result("entities")
+    return {
+        "id": pair["id"],
+        "template": pair["template"],
+        "contract": pair["contract"],
+        "similarity": similarity,
+        "hunks": len(hunks),
+        "changes": TextComparer.format_hunks(hunks),
+        "entities": entities,
+        "entity_delta": entity_delta,
+        "prepare_seconds": time.perf_counter() - started,
+    }
+
+class BatchRunner:
+    """Validates many template/contract pairs, streaming one JSON result per pair to a JSONL file.
+
+    Parsing, diffing and NER run in a process pool; LLM analysis runs in a bounded thread
+    stage. Pairs already written with status "ok" are skipped, so an interrupted batch
+    resumes where it stopped.
+    """
+
+    def __init__(self, output_path: str, analyzer=None, workers: int | None = None,
+                 llm_concurrency: int = 4, pdf_backend: str = "pdfplumber",
+                 template_store_dir: str | None = None, run_ner: bool = True, clause_diff: bool = True):
+        if llm_concurrency < 1:
+            raise ValueError("llm_concurrency must be at least 1")
+        self.output_path = output_path
+        self.analyzer = analyzer
+        self.workers = workers or os.cpu_count() or 1
+        self.llm_concurrency = llm_concurrency
+        self.pdf_backend = pdf_backend
+        self.template_store_dir = template_store_dir
+        self.run_ner = run_ner
+        self.clause_diff = clause_diff
+        self._write_lock = threading.Lock()
+
+    def completed_ids(self) -> set[str]:
+        """Ids of pairs already validated successfully in the output file"""
+        done = set()
+        if not os.path.exists(self.output_path):
+            return done
+        with open(self.output_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partial line from an interrupted run
+                if record.get("status") == "ok":
+                    done.add(record["id"])
+        return done
+
+    def _drop_partial_line(self) -> None:
+        """Cut a trailing partial record left by an interrupted run, so appends start on a new line"""
+        if not os.path.exists(self.output_path):
+            return
+        with open(self.output_path, "rb+") as f:
+            end = position = f.seek(0, os.SEEK_END)
+            while position > 0:
+                start = max(position - 4096, 0)
+                f.seek(start)
+                newline = f.read(position - start).rfind(b"\n")
+                if newline != -1:
+                    position = start + newline + 1
+                    break
+                position = start
+            if position < end:
+                f.truncate(position)
+
+    def _write(self, out, record: dict) -> None:
+        with self._write_lock:
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+
+    def _analyze(self, prepared: dict) -> dict:
+        record = {key: value for key, value in prepared.items() if key != "changes"}
+        metrics = Metrics()
+        metrics.merge(prepared["metrics"])
+        started = time.perf_counter()
+        if self.analyzer is not None:
+            with metrics.activate():
+                record["analysis"] = self.analyzer.analyze_differences(prepared["changes"], prepared["entities"])
+        record["analyze_seconds"] = time.perf_counter() - started
+        record["metrics"] = metrics.report()
+        record["status"] = "ok"
+        return record
+
+    def run(self, pairs: list[dict]) -> dict:
+        """Validate pairs, appending results to output_path; returns a summary"""
+        done = self.completed_ids()
+        pending = [pair for pair in pairs if pair["id"] not in done]
+        summary = {"total": len(pairs), "skipped": len(pairs) - len(pending), "ok": 0, "error": 0}
+        if not pending:
+            return summary
+
+        directory = os.path.dirname(self.output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._drop_partial_line()
+
+        max_prepare_in_flight = self.workers * 2
+        max_llm_in_flight = self.llm_concurrency * 2
+        queue = iter(pending)
+        totals = Metrics()
+        # Spawned workers: forking while LLM threads hold locks can deadlock the children
+        with open(self.output_path, "a", encoding="utf-8") as out, \
+                ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                    initializer=_init_worker,
+                                    initargs=(self.pdf_backend, self.template_store_dir, self.run_ner,
+                                              self.clause_diff)) as processes, \
+                ThreadPoolExecutor(max_workers=self.llm_concurrency) as threads:
+            preparing: dict = {}
+            analyzing: dict = {}
+
+            def fill():
+                # Stop submitting parse work while the LLM stage is saturated
+                while len(preparing) < max_prepare_in_flight and len(analyzing) < max_llm_in_flight:
+                    pair = next(queue, None)
+                    if pair is None:
+                        return
+                    preparing[processes.submit(prepare_pair, pair)] = pair
+
+            fill()
+            while preparing or analyzing:
+                finished, _ = wait(list(preparing) + list(analyzing), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future in preparing:
+                        pair = preparing.pop(future)
+                        try:
+                            prepared = future.result()
+                        except Exception as e:
+                            self._write(out, {**pair, "status": "error", "stage": "prepare", "error": str(e)})
+                            summary["error"] += 1
+                            continue
+                        analyzing[threads.submit(self._analyze, prepared)] = pair
+                    else:
+                        pair = analyzing.pop(future)
+                        try:
+                            record = future.result()
+                        except Exception as e:
+                            self._write(out, {**pair, "status": "error", "stage": "analyze", "error": str(e)})
+                            summary["error"] += 1
+                            continue
+                        self._write(out, record)
+                        totals.merge(record["metrics"])
+                        summary["ok"] += 1
+                fill()
+        summary["metrics"] = totals.report()
+        return summary
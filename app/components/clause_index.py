@@ -0,0 +1,190 @@
+# app/components/clause_index.py
+import bisect
+import re
+from .diff_engine import line_hash
+
+# "1.", "2)", "2.1", "3.4.1." or "Article IV" / "Section 5" / "Clause 7" at the start of a line
+CLAUSE_HEADING = re.compile(
+    r"^\s*(?:(?P<number>\d{1,3}(?:\.\d{1,3})+\.?|\d{1,3}[.)])|(?:article|section|clause)\s+(?P<named>\d+(?:\.\d+)*|[ivxlc]+)\b[.:]?)(?=\s|$)",
+    re.IGNORECASE,
+)
+# Lines left behind by page breaks: "3", "- 3 -", "Page 3", "Page 3 of 10", "3/10"
+PAGE_ARTIFACT = re.compile(r"^\s*(?:page\s+\d+(?:\s+of\s+\d+)?|-?\s*\d+\s*-?|\d+\s*/\s*\d+)\s*$", re.IGNORECASE)
+SENTENCE_BREAK = re.compile(
+    r"(?<=[.;!?])(?<!\bMr\.)(?<!\bMrs\.)(?<!\bMs\.)(?<!\bDr\.)(?<!\bNo\.)(?<!\bSt\.)\s+(?=[\"'(\[A-Z0-9])|\s+(?=•)"
+)
+MAX_TITLE_CHARS = 80
+
+def clean_text(text: str) -> str:
+    """Clean and normalize text"""
+    return ' '.join(text.split())
+
+def normalize_text(text: str) -> str:
+    """clean_text for wrapped PDF lines, dropping the page-number lines page breaks leave"""
+    return clean_text('\n'.join(line for line in text.splitlines() if not PAGE_ARTIFACT.match(line)))
+
+class Clause:
+    """One numbered clause (or the unnumbered preamble) with wrapping normalized away"""
+
+    def __init__(self, number: str | None, text: str, start_line: int, end_line: int, heading: str = ""):
+        self.number = number
+        self.text = text  # Heading remainder and body, without the clause number
+        self.start_line = start_line  # 0-based physical line range [start_line, end_line)
+        self.end_line = end_line
+        self.key = line_hash(text)  # Independent of the number, so renumbered clauses still match
+        # Heading text up to its first period or colon, e.g. "Fees" in "2. Fees: ..."
+        self.title = re.split(r"[.:]", heading, maxsplit=1)[0][:MAX_TITLE_CHARS].strip().lower()
+
+    @property
+    def label(self) -> str:
+        return f"clause {self.number}" if self.number is not None else "preamble"
+
+    def sentences(self) -> list[str]:
+        return [sentence for sentence in SENTENCE_BREAK.split(self.text) if sentence]
+
+    def __repr__(self) -> str:
+        return f"Clause({self.label!r}, {self.text[:40]!r})"
+
+def segment_clauses(lines: list[str]) -> list[Clause]:
+    """Group physical lines into clauses at numbered headings, dropping page-number lines"""
+    clauses = []
+    number, body, start, heading = None, [], 0, ""
+    for index, line in enumerate(lines):
+        match = CLAUSE_HEADING.match(line)
+        if match:
+            if body or number is not None:
+                clauses.append(Clause(number, normalize_text('\n'.join(body)), start, index, heading))
+            number = (match.group("number") or match.group("named")).rstrip('.)').lower()
+            heading = line[match.end():]
+            body, start = [heading], index
+        else:
+            body.append(line)
+    if body or number is not None:
+        clauses.append(Clause(number, normalize_text('\n'.join(body)), start, len(lines), heading))
+    return clauses
+
+class ClauseChange:
+    """How one clause differs between versions; old or new is None for removed/added clauses"""
+
+    def __init__(self, kind: str, old: Clause | None, new: Clause | None, moved: bool = False):
+        self.kind = kind  # "unchanged", "modified", "removed" or "added"
+        self.old = old
+        self.new = new
+        self.moved = moved  # Matched out of order relative to the other matched clauses
+
+    @property
+    def renumbered(self) -> bool:
+        return self.old is not None and self.new is not None and self.old.number != self.new.number
+
+    @property
+    def label(self) -> str:
+        if self.old is None or self.new is None:
+            return f"{(self.old or self.new).label} {self.kind}"
+        label = self.new.label
+        if self.renumbered:
+            label += f" (was {self.old.label})"
+        if self.moved:
+            label += " moved"
+        return label
+
+    def __repr__(self) -> str:
+        return f"ClauseChange({self.kind!r}, {self.label!r})"
+
+class ClauseIndex:
+    """Clauses of one document indexed by content hash, clause number and title"""
+
+    def __init__(self, clauses: list[Clause]):
+        self.clauses = clauses
+        self.by_key: dict[int, list[int]] = {}
+        self.by_number: dict[str | None, list[int]] = {}
+        self.by_title: dict[str, list[int]] = {}
+        for position, clause in enumerate(clauses):
+            self.by_key.setdefault(clause.key, []).append(position)
+            self.by_number.setdefault(clause.number, []).append(position)
+            if clause.title:
+                self.by_title.setdefault(clause.title, []).append(position)
+
+    @classmethod
+    def from_text(cls, text: str) -> "ClauseIndex":
+        return cls(segment_clauses(text.splitlines()))
+
+def _take(positions: list[int] | None, used: list[bool]) -> int | None:
+    """First position not matched yet"""
+    for position in positions or ():
+        if not used[position]:
+            return position
+    return None
+
+def _in_order(pairs: list[tuple[int, int]]) -> set[int]:
+    """Indices of pairs (sorted by new position) on a longest increasing run of old positions"""
+    tails, tail_pairs, previous = [], [], [None] * len(pairs)
+    for index, (old, _) in enumerate(pairs):
+        slot = bisect.bisect_left(tails, old)
+        if slot == len(tails):
+            tails.append(old)
+            tail_pairs.append(index)
+        else:
+            tails[slot] = old
+            tail_pairs[slot] = index
+        previous[index] = tail_pairs[slot - 1] if slot else None
+    keep = set()
+    index = tail_pairs[-1] if tail_pairs else None
+    while index is not None:
+        keep.add(index)
+        index = previous[index]
+    return keep
+
+def match_clauses(old: ClauseIndex, new: ClauseIndex) -> list[ClauseChange]:
+    """Align clauses of two versions in new-document order, removed clauses at their old position.
+
+    Identical text is matched first through the hash index (so moved and renumbered clauses
+    are found), then remaining clauses by number, then by title. Each lookup is a dict
+    probe, and move detection is a longest-increasing-subsequence pass: O(n log n) overall.
+    """
+    old_used = [False] * len(old.clauses)
+    matches: list[int | None] = [None] * len(new.clauses)
+    for lookup in (lambda clause: old.by_key.get(clause.key),
+                   lambda clause: old.by_number.get(clause.number),
+                   lambda clause: old.by_title.get(clause.title) if clause.title else None):
+        for position, clause in enumerate(new.clauses):
+            if matches[position] is None:
+                found = _take(lookup(clause), old_used)
+                if found is not None:
+                    old_used[found] = True
+                    matches[position] = found
+
+    pairs = [(found, position) for position, found in enumerate(matches) if found is not None]
+    in_order = _in_order(pairs)
+    moved = {pairs[index][1] for index in range(len(pairs)) if index not in in_order}
+
+    # Old position of the next in-order match at or after each new position
+    next_anchor = [len(old.clauses)] * (len(new.clauses) + 1)
+    for position in range(len(new.clauses) - 1, -1, -1):
+        found = matches[position]
+        anchored = found is not None and position not in moved
+        next_anchor[position] = found if anchored else next_anchor[position + 1]
+
+    changes = []
+    next_old = 0
+
+    def flush_removed(stop: int) -> None:
+        # Unmatched old clauses before the next anchor were removed here
+        for removed in range(next_old, stop):
+            if not old_used[removed]:
+                changes.append(ClauseChange("removed", old.clauses[removed], None))
+
+    for position, clause in enumerate(new.clauses):
+        found = matches[position]
+        if found is None:
+            flush_removed(next_anchor[position])
+            next_old = max(next_old, next_anchor[position])
+            changes.append(ClauseChange("added", None, clause))
+            continue
+        if position not in moved:
+            flush_removed(found)
+            next_old = max(next_old, found + 1)
+        old_clause = old.clauses[found]
+        kind = "unchanged" if old_clause.key == clause.key else "modified"
+        changes.append(ClauseChange(kind, old_clause, clause, moved=position in moved))
+    flush_removed(len(old.clauses))
+    return changes
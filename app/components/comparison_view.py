@@ -0,0 +1,127 @@
+# app/components/comparison_view.py
+import html
+from .diff_engine import SideBySide
+
+DEFAULT_CONTEXT_LINES = 3  # Unchanged lines kept around each change when collapsing
+PAGE_ROWS = 500
+
+STYLE = """
+<style>
+.cmp-table { border-collapse: collapse; width: 100%; table-layout: fixed; font-family: monospace; font-size: 0.8rem; }
+.cmp-table td { padding: 0 0.4rem; white-space: pre-wrap; word-break: break-word; vertical-align: top; }
+.cmp-table td.cmp-num { width: 3.5rem; color: #888; text-align: right; user-select: none; }
+.cmp-table tr.cmp-skip td { color: #888; font-style: italic; text-align: center; background: #f4f4f4; }
+.cmp-table td.cmp-delete { background: #fde8d7; color: #b35c00; }
+.cmp-table td.cmp-insert { background: #e3f6e3; color: #1e7b1e; }
+</style>
+"""
+
+def collapse_segments(view: SideBySide, context: int = DEFAULT_CONTEXT_LINES) -> list[tuple]:
+    """Display plan of ("rows", start, stop) and ("skip", count) segments.
+
+    Unchanged runs keep `context` rows next to each change and are otherwise replaced
+    by a skip marker, unless that would hide a single row. Identical documents show
+    only their first `context` rows.
+    """
+    ranges = list(view.row_ranges())
+    has_changes = any(tag != 'equal' for tag, _, _ in ranges)
+    segments = []
+    for index, (tag, start, stop) in enumerate(ranges):
+        if tag != 'equal':
+            segments.append(("rows", start, stop))
+            continue
+        head = context if index > 0 or not has_changes else 0
+        tail = context if index < len(ranges) - 1 else 0
+        hidden = stop - start - head - tail
+        if hidden <= 1:
+            segments.append(("rows", start, stop))
+            continue
+        if head:
+            segments.append(("rows", start, start + head))
+        segments.append(("skip", hidden))
+        if tail:
+            segments.append(("rows", stop - tail, stop))
+    return segments
+
+def _segment_length(segment: tuple) -> int:
+    """Display rows of a segment; a skip marker takes one"""
+    return 1 if segment[0] == "skip" else segment[2] - segment[1]
+
+def _cell(number, tag: str, line) -> str:
+    if line is None:
+        return '<td class="cmp-num"></td><td></td>'
+    css = f' class="cmp-{tag}"' if tag != 'equal' else ''
+    return f'<td class="cmp-num">{number}</td><td{css}>{html.escape(line)}</td>'
+
+def render_rows(rows) -> str:
+    """One HTML table for aligned rows and ("skip", count) markers; all text is escaped"""
+    parts = [STYLE, '<table class="cmp-table">']
+    for row in rows:
+        if row[0] == "skip":
+            parts.append(f'<tr class="cmp-skip"><td colspan="4">… {row[1]} unchanged lines …</td></tr>')
+        else:
+            parts.append(f'<tr>{_cell(*row[:3])}{_cell(*row[3:])}</tr>')
+    parts.append('</table>')
+    return ''.join(parts)
+
+class ComparisonView:
+    """Pre-rendered, paginated HTML for the two-column document comparison.
+
+    Pages are cut from the SideBySide alignment on demand, so only visible rows are
+    materialized. Rendered pages are memoized per (context, page), so UI reruns that
+    only change the page or the context do not redo the full document.
+    """
+
+    def __init__(self, side_by_side: SideBySide | dict, page_rows: int = PAGE_ROWS):
+        if page_rows < 1:
+            raise ValueError("page_rows must be at least 1")
+        if not isinstance(side_by_side, SideBySide):
+            side_by_side = SideBySide.from_columns(side_by_side)
+        self.side_by_side = side_by_side
+        self.page_rows = page_rows
+        self._segments: dict[int, list[tuple]] = {}
+        self._pages: dict[tuple[int | None, int], str] = {}
+
+    @property
+    def changed_rows(self) -> int:
+        return sum(stop - start for tag, start, stop in self.side_by_side.row_ranges() if tag != 'equal')
+
+    def segments(self, context: int | None = DEFAULT_CONTEXT_LINES) -> list[tuple]:
+        """Display plan; context=None expands every unchanged run"""
+        if context is None:
+            return [("rows", 0, self.side_by_side.row_count)]
+        if context not in self._segments:
+            self._segments[context] = collapse_segments(self.side_by_side, context)
+        return self._segments[context]
+
+    def display_row_count(self, context: int | None = DEFAULT_CONTEXT_LINES) -> int:
+        return sum(_segment_length(segment) for segment in self.segments(context))
+
+    def page_count(self, context: int | None = DEFAULT_CONTEXT_LINES) -> int:
+        return max(1, -(-self.display_row_count(context) // self.page_rows))
+
+    def page_rows_of(self, page: int, context: int | None = DEFAULT_CONTEXT_LINES):
+        """Yield the rows and skip markers shown on one page (0-based)"""
+        first, last = page * self.page_rows, (page + 1) * self.page_rows
+        position = 0
+        for segment in self.segments(context):
+            length = _segment_length(segment)
+            if position + length > first and position < last:
+                if segment[0] == "skip":
+                    yield segment
+                else:
+                    start = segment[1] + max(first - position, 0)
+                    stop = segment[1] + min(last - position, length)
+                    yield from self.side_by_side.iter_rows(start, stop)
+            position += length
+            if position >= last:
+                return
+
+    def render(self, page: int = 0, context: int | None = DEFAULT_CONTEXT_LINES) -> str:
+        """HTML of one page (0-based) of the view"""
+        if not 0 <= page < self.page_count(context):
+            raise IndexError(f"page {page} out of range")
+        key = (context, page)
+        if key not in self._pages:
+            self._pages[key] = render_rows(self.page_rows_of(page, context))
+        return self._pages[key]
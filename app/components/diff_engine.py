@@ -0,0 +1,350 @@
+# app/components/diff_engine.py
+import bisect
+import difflib
+import hashlib
+
+Opcode = tuple[str, int, int, int, int]
+
+MAX_ANCHOR_OCCURRENCES = 64  # Lines repeated more often than this never anchor an alignment
+MAX_RATIO_CHARS = 4096  # Unmatched word runs longer than this get no character-level credit
+
+class LineInterner:
+    """Maps line strings to small integer ids so alignment compares ints, not strings"""
+
+    def __init__(self):
+        self.ids: dict[str, int] = {}
+
+    def intern(self, lines: list[str]) -> list[int]:
+        ids = self.ids
+        return [ids.setdefault(line, len(ids)) for line in lines]
+
+def line_hash(line: str) -> int:
+    """Stable 64-bit content hash of a line, usable as an interned id across processes and runs"""
+    return int.from_bytes(hashlib.blake2b(line.encode("utf-8"), digest_size=8).digest(), "big")
+
+def _histogram_matches(a: list[int], b: list[int]) -> list[tuple[int, int, int]]:
+    """Return matching blocks (i, j, size) between a and b using histogram diff.
+
+    Each region is split on the common element that occurs least often in `a`, extended
+    to the longest surrounding equal run, and the two sides are aligned recursively.
+    Rare lines (clause headings, signatures) anchor the alignment, which keeps the
+    result close to what a human would read as the change. Among equally good anchors
+    the one nearest the middle of the region wins, so evenly spread edits split regions
+    in half instead of peeling them one edit at a time.
+    """
+    matches = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        a_lo, a_hi, b_lo, b_hi = stack.pop()
+
+        # Common prefix and suffix are matched without any counting
+        prefix = 0
+        while a_lo + prefix < a_hi and b_lo + prefix < b_hi and a[a_lo + prefix] == b[b_lo + prefix]:
+            prefix += 1
+        if prefix:
+            matches.append((a_lo, b_lo, prefix))
+            a_lo += prefix
+            b_lo += prefix
+        suffix = 0
+        while a_lo < a_hi - suffix and b_lo < b_hi - suffix and a[a_hi - suffix - 1] == b[b_hi - suffix - 1]:
+            suffix += 1
+        if suffix:
+            matches.append((a_hi - suffix, b_hi - suffix, suffix))
+            a_hi -= suffix
+            b_hi -= suffix
+        if a_lo == a_hi or b_lo == b_hi:
+            continue
+
+        positions: dict[int, list[int]] = {}
+        for i in range(a_lo, a_hi):
+            positions.setdefault(a[i], []).append(i)
+
+        best = None  # (size, i, j)
+        best_count = best_offset = None
+        middle = a_lo + a_hi
+        j = b_lo
+        while j < b_hi:
+            occurrences = positions.get(b[j])
+            if (occurrences is None or len(occurrences) > MAX_ANCHOR_OCCURRENCES
+                    or (best_count is not None and len(occurrences) > best_count)):
+                j += 1
+                continue
+            next_j = j + 1
+            for i in occurrences:
+                start_i, start_j = i, j
+                while start_i > a_lo and start_j > b_lo and a[start_i - 1] == b[start_j - 1]:
+                    start_i -= 1
+                    start_j -= 1
+                end_i, end_j = i + 1, j + 1
+                while end_i < a_hi and end_j < b_hi and a[end_i] == b[end_j]:
+                    end_i += 1
+                    end_j += 1
+                size = end_i - start_i
+                offset = abs(2 * start_i + size - middle)  # Twice the distance from the middle
+                if (best is None or len(occurrences) < best_count
+                        or (len(occurrences) == best_count
+                            and (size > best[0] or (size == best[0] and offset < best_offset)))):
+                    best = (size, start_i, start_j)
+                    best_count = len(occurrences)
+                    best_offset = offset
+                next_j = max(next_j, end_j)
+            j = next_j
+
+        if best is None:
+            # Only very common lines (blank lines, separators) left: let difflib align them
+            matcher = difflib.SequenceMatcher(None, a[a_lo:a_hi], b[b_lo:b_hi])
+            matches.extend((a_lo + i, b_lo + j, size) for i, j, size in matcher.get_matching_blocks() if size)
+            continue
+        size, i, j = best
+        matches.append((i, j, size))
+        stack.append((i + size, a_hi, j + size, b_hi))
+        stack.append((a_lo, i, b_lo, j))
+
+    matches.sort()
+    return matches
+
+def _replace_weight(left_lines: list[str], right_lines: list[str]) -> float:
+    """Matched character weight of a replaced block, aligned on words rather than lines.
+
+    Re-wrapped text keeps its credit although no line matches; words left unmatched
+    between aligned runs (e.g. a changed amount) are scored with a character ratio.
+    """
+    left_words = ' '.join(left_lines).split()
+    right_words = ' '.join(right_lines).split()
+    interner = LineInterner()
+    matches = _histogram_matches(interner.intern(left_words), interner.intern(right_words))
+    matched = 0.0
+    i = j = 0
+    for wi, wj, size in matches + [(len(left_words), len(right_words), 0)]:
+        if i < wi and j < wj:
+            left_text, right_text = ' '.join(left_words[i:wi]), ' '.join(right_words[j:wj])
+            if len(left_text) + len(right_text) <= MAX_RATIO_CHARS:
+                ratio = difflib.SequenceMatcher(None, left_text, right_text, autojunk=False).ratio()
+                matched += ratio * (len(left_text) + len(right_text))
+        matched += 2 * sum(len(word) + 1 for word in left_words[wi:wi + size])
+        i, j = wi + size, wj + size
+    return matched
+
+def _opcodes_from_matches(matches: list[tuple[int, int, int]], len_a: int, len_b: int) -> list[Opcode]:
+    """Convert matching blocks to SequenceMatcher-style opcodes"""
+    opcodes = []
+    i = j = 0
+    for ai, bj, size in matches + [(len_a, len_b, 0)]:
+        if i < ai and j < bj:
+            opcodes.append(('replace', i, ai, j, bj))
+        elif i < ai:
+            opcodes.append(('delete', i, ai, j, bj))
+        elif j < bj:
+            opcodes.append(('insert', i, ai, j, bj))
+        if size:
+            if opcodes and opcodes[-1][0] == 'equal':
+                _, ei1, _, ej1, _ = opcodes.pop()
+                opcodes.append(('equal', ei1, ai + size, ej1, bj + size))
+            else:
+                opcodes.append(('equal', ai, ai + size, bj, bj + size))
+        i, j = ai + size, bj + size
+    return opcodes
+
+class SideBySide:
+    """Two-column view stored as opcodes plus references to both line lists.
+
+    Tagged lines, aligned rows and hunks are produced on demand rather than copied.
+    view['left'] and view['right'] still return (tag, line) lists for existing callers.
+    Rows are numbered like the opcodes: an equal block contributes one row per line, a
+    changed block max(deleted, inserted) rows with the shorter side padded.
+    """
+
+    SIDES = ('left', 'right')
+
+    def __init__(self, opcodes: list[Opcode], left_lines: list[str], right_lines: list[str]):
+        self.opcodes = opcodes
+        self.left_lines = left_lines
+        self.right_lines = right_lines
+        self._row_starts = []
+        rows = 0
+        for tag, i1, i2, j1, j2 in opcodes:
+            self._row_starts.append(rows)
+            rows += i2 - i1 if tag == 'equal' else max(i2 - i1, j2 - j1)
+        self.row_count = rows
+
+    @classmethod
+    def from_columns(cls, view: dict[str, list[tuple[str, str]]]) -> "SideBySide":
+        """Rebuild from the legacy {'left': [(tag, line)], 'right': [...]} dict"""
+        left, right = view['left'], view['right']
+        left_lines = [line for _, line in left]
+        right_lines = [line for _, line in right]
+        opcodes = []
+        i = j = 0
+        while i < len(left) or j < len(right):
+            i_end, j_end = i, j
+            while i_end < len(left) and left[i_end][0] != 'equal':
+                i_end += 1
+            while j_end < len(right) and right[j_end][0] != 'equal':
+                j_end += 1
+            if i_end > i or j_end > j:
+                tag = 'replace' if i_end > i and j_end > j else 'delete' if i_end > i else 'insert'
+                opcodes.append((tag, i, i_end, j, j_end))
+            i, j = i_end, j_end
+            while i_end < len(left) and j_end < len(right) and left[i_end][0] == right[j_end][0] == 'equal':
+                i_end += 1
+                j_end += 1
+            if i_end > i:
+                opcodes.append(('equal', i, i_end, j, j_end))
+            elif i < len(left) or j < len(right):
+                raise ValueError("columns have different numbers of equal lines")
+            i, j = i_end, j_end
+        return cls(opcodes, left_lines, right_lines)
+
+    def keys(self) -> tuple[str, str]:
+        return self.SIDES
+
+    def __getitem__(self, side: str) -> list[tuple[str, str]]:
+        if side not in self.SIDES:
+            raise KeyError(side)
+        return list(self.iter_side(side))
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, SideBySide):
+            return (self.opcodes == other.opcodes and self.left_lines == other.left_lines
+                    and self.right_lines == other.right_lines)
+        if isinstance(other, dict):
+            return set(other) == set(self.SIDES) and all(self[side] == other[side] for side in self.SIDES)
+        return NotImplemented
+
+    def iter_side(self, side: str):
+        """Lazily yield the (tag, line) pairs of one column"""
+        lines = self.left_lines if side == 'left' else self.right_lines
+        changed = 'delete' if side == 'left' else 'insert'
+        for tag, i1, i2, j1, j2 in self.opcodes:
+            start, end = (i1, i2) if side == 'left' else (j1, j2)
+            label = 'equal' if tag == 'equal' else changed
+            for line in lines[start:end]:
+                yield label, line
+
+    def iter_rows(self, start: int = 0, stop: int | None = None):
+        """Lazily yield aligned rows in [start, stop).
+
+        A row is (left_number, left_tag, left_line, right_number, right_tag, right_line)
+        with 1-based line numbers; a padded side has None number and line.
+        """
+        stop = self.row_count if stop is None else min(stop, self.row_count)
+        if start >= stop:
+            return
+        left, right = self.left_lines, self.right_lines
+        first = bisect.bisect_right(self._row_starts, start) - 1
+        for index in range(first, len(self.opcodes)):
+            row_start = self._row_starts[index]
+            if row_start >= stop:
+                return
+            tag, i1, i2, j1, j2 = self.opcodes[index]
+            rows = i2 - i1 if tag == 'equal' else max(i2 - i1, j2 - j1)
+            for offset in range(max(start - row_start, 0), min(stop - row_start, rows)):
+                if tag == 'equal':
+                    yield (i1 + offset + 1, 'equal', left[i1 + offset], j1 + offset + 1, 'equal', right[j1 + offset])
+                    continue
+                l, r = i1 + offset, j1 + offset
+                yield (
+                    l + 1 if l < i2 else None, 'delete', left[l] if l < i2 else None,
+                    r + 1 if r < j2 else None, 'insert', right[r] if r < j2 else None,
+                )
+
+    def rows(self, start: int, stop: int) -> list[tuple]:
+        """Aligned rows [start, stop), e.g. one page of the view"""
+        return list(self.iter_rows(start, stop))
+
+    def row_ranges(self):
+        """Yield (tag, row_start, row_stop) for each opcode"""
+        for (tag, *_), row_start, row_stop in zip(self.opcodes, self._row_starts,
+                                                   self._row_starts[1:] + [self.row_count]):
+            yield tag, row_start, row_stop
+
+    def iter_hunks(self, context: int = 3):
+        """Lazily yield groups of opcodes around each change, like SequenceMatcher.get_grouped_opcodes"""
+        codes = list(self.opcodes)
+        if not any(tag != 'equal' for tag, *_ in codes):
+            return
+        if codes[0][0] == 'equal':
+            tag, i1, i2, j1, j2 = codes[0]
+            codes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+        if codes[-1][0] == 'equal':
+            tag, i1, i2, j1, j2 = codes[-1]
+            codes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+        group = []
+        for tag, i1, i2, j1, j2 in codes:
+            if tag == 'equal' and i2 - i1 > 2 * context:
+                group.append((tag, i1, i1 + context, j1, j1 + context))
+                yield group
+                group = []
+                i1, j1 = i2 - context, j2 - context
+            group.append((tag, i1, i2, j1, j2))
+        if group and not (len(group) == 1 and group[0][0] == 'equal'):
+            yield group
+
+class LineDiff:
+    """A single line alignment of two documents that every derived view is computed from"""
+
+    def __init__(self, left_lines: list[str], right_lines: list[str], left_hashes: list[int] | None = None):
+        self.left_lines = left_lines
+        self.right_lines = right_lines
+        if left_hashes is not None:
+            # Precomputed (e.g. stored template) hashes: hash only the other side
+            left_ids = left_hashes
+            right_ids = [line_hash(line) for line in right_lines]
+        else:
+            interner = LineInterner()
+            left_ids = interner.intern(left_lines)
+            right_ids = interner.intern(right_lines)
+        matches = _histogram_matches(left_ids, right_ids)
+        self.opcodes: list[Opcode] = _opcodes_from_matches(matches, len(left_ids), len(right_ids))
+
+    def differ_lines(self, opcodes: list[Opcode] | None = None) -> list[str]:
+        """Differ-compatible diff lines ("  ", "- ", "+ " prefixes; no "? " hints).
+
+        opcodes restricts the output to part of the alignment (default: all of it).
+        """
+        left, right = self.left_lines, self.right_lines
+        diff = []
+        for tag, i1, i2, j1, j2 in self.opcodes if opcodes is None else opcodes:
+            if tag == 'equal':
+                diff.extend('  ' + line for line in left[i1:i2])
+                continue
+            diff.extend('- ' + line for line in left[i1:i2])
+            diff.extend('+ ' + line for line in right[j1:j2])
+        return diff
+
+    def similarity(self) -> float:
+        """Character-weighted similarity in [0, 1], comparable to SequenceMatcher.ratio().
+
+        Equal lines count in full; replaced blocks are aligned word by word (see
+        _replace_weight), so edits inside a line or re-wrapped paragraphs are not treated
+        as a full rewrite. That work is bounded by the block, not the document.
+        """
+        matched, total = self.weights()
+        if total == 0:
+            return 1.0
+        return min(matched / total, 1.0)
+
+    def weights(self, opcodes: list[Opcode] | None = None) -> tuple[float, int]:
+        """(matched, total) character weights behind similarity(), optionally for part of the alignment.
+
+        Weights of consecutive parts add up, so a diff computed piece by piece can still
+        report one similarity for the whole document.
+        """
+        left, right = self.left_lines, self.right_lines
+        opcodes = self.opcodes if opcodes is None else opcodes
+        total = 0
+        matched = 0.0
+        for tag, i1, i2, j1, j2 in opcodes:
+            total += sum(len(line) + 1 for line in left[i1:i2]) + sum(len(line) + 1 for line in right[j1:j2])
+            if tag == 'equal':
+                matched += 2 * sum(len(line) + 1 for line in left[i1:i2])
+            elif tag == 'replace':
+                matched += _replace_weight(left[i1:i2], right[j1:j2])
+        return matched, total
+
+    def side_by_side(self) -> SideBySide:
+        """Two-column view sharing this alignment and the line lists (no copies)"""
+        return SideBySide(self.opcodes, self.left_lines, self.right_lines)
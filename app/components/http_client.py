@@ -0,0 +1,130 @@
+# app/components/http_client.py
+import email.utils
+import importlib.util
+import random
+import threading
+import time
+import httpx
+
+DEFAULT_TIMEOUT = 60.0
+MAX_CONNECTIONS = 32
+MAX_KEEPALIVE_CONNECTIONS = 16
+
+_shared_lock = threading.Lock()
+_shared_clients: dict[tuple, httpx.Client] = {}
+_shared_limiters: dict[tuple, "RateLimiter"] = {}
+
+def http2_available() -> bool:
+    """HTTP/2 in httpx needs the optional h2 package"""
+    return importlib.util.find_spec("h2") is not None
+
+def get_shared_http_client(http2: bool = False, max_connections: int = MAX_CONNECTIONS,
+                           max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS) -> httpx.Client:
+    """Process-wide pooled client, so connections (and TLS sessions) are reused across analyses"""
+    http2 = http2 and http2_available()
+    key = (http2, max_connections, max_keepalive_connections)
+    with _shared_lock:
+        client = _shared_clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.Client(
+                timeout=DEFAULT_TIMEOUT,
+                transport=httpx.HTTPTransport(
+                    retries=3,  # Connection establishment only; HTTP errors are retried by the caller
+                    http2=http2,
+                    limits=httpx.Limits(max_connections=max_connections,
+                                        max_keepalive_connections=max_keepalive_connections),
+                ),
+            )
+            _shared_clients[key] = client
+        return client
+
+class TokenBucket:
+    """Continuously refilling budget of `per_minute` units; acquire blocks until units are available"""
+
+    def __init__(self, per_minute: float, clock=time.monotonic, sleep=time.sleep):
+        if per_minute <= 0:
+            raise ValueError("per_minute must be positive")
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._available = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._available = min(self.capacity, self._available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1) -> float:
+        """Take amount units (clamped to capacity), returning the seconds spent waiting"""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._available >= amount:
+                    self._available -= amount
+                    return waited
+                wait = (amount - self._available) / self.rate
+            self._sleep(wait)
+            waited += wait
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits shared by every caller"""
+
+    def __init__(self, requests_per_minute: float | None = None, tokens_per_minute: float | None = None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.requests = TokenBucket(requests_per_minute, clock, sleep) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, clock, sleep) if tokens_per_minute else None
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Wait for one request slot and `tokens` tokens; returns the seconds spent waiting"""
+        waited = 0.0
+        if self.requests is not None:
+            waited += self.requests.acquire(1)
+        if self.tokens is not None and tokens:
+            waited += self.tokens.acquire(tokens)
+        return waited
+
+def get_shared_rate_limiter(requests_per_minute: float | None = None,
+                            tokens_per_minute: float | None = None) -> RateLimiter:
+    """Process-wide limiter per limit pair, so concurrent analyses share one budget"""
+    key = (requests_per_minute, tokens_per_minute)
+    with _shared_lock:
+        limiter = _shared_limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+            _shared_limiters[key] = limiter
+        return limiter
+
+def parse_retry_after(headers) -> float | None:
+    """Seconds to wait from Retry-After (seconds or HTTP date) or retry-after-ms headers"""
+    if headers is None:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return max(float(value) / 1000.0, 0.0)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0, retry_after: float | None = None) -> float:
+    """Full-jitter exponential backoff; a server-provided Retry-After is a lower bound"""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after is not None:
+        delay = retry_after + random.uniform(0, base)
+    return delay
@@ -0,0 +1,160 @@
+# app/components/instrumentation.py
+import contextvars
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+_current: contextvars.ContextVar["Metrics | None"] = contextvars.ContextVar("metrics", default=None)
+
+class Metrics:
+    """Thread-safe stage timings and counters for one analysis run.
+
+    Activate an instance with `with metrics.activate():` and every component called in
+    that context (and in pools started through `propagate`) records into it.
+    With profile=True each stage also runs under cProfile and tracemalloc; that is meant
+    for one-off deep dives, not concurrent production runs. Both are process-wide, so a
+    stage that overlaps another profiled stage (nested, or on another thread) cannot be
+    measured on its own: its profile entry is marked "overlapped" and its peak and top
+    functions mix in or miss the other stage's work.
+    on_stage, if given, is called with each stage name as the stage starts (progress reporting).
+    """
+
+    PROFILE_TOP_FUNCTIONS = 25
+
+    def __init__(self, profile: bool = False, on_stage=None):
+        self.profile = profile
+        self.on_stage = on_stage
+        self.stages: dict[str, dict] = {}
+        self.counters: dict[str, float] = {}
+        self.profiles: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._active_profiles: list[dict] = []  # Profiled stages currently running
+        self._started_tracing = False
+
+    @contextmanager
+    def activate(self):
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Record wall and CPU time of the enclosed block under name"""
+        if self.on_stage is not None:
+            self.on_stage(name)
+        profiler = self._start_profile() if self.profile else None
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            with self._lock:
+                stats = self.stages.setdefault(name, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+                stats["calls"] += 1
+                stats["wall_seconds"] += wall
+                stats["cpu_seconds"] += cpu
+            if profiler is not None:
+                self._stop_profile(name, *profiler)
+
+    def incr(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def merge(self, report: dict) -> None:
+        """Add the stages and counters of another run's report (e.g. from a worker process)"""
+        with self._lock:
+            for name, other in report.get("stages", {}).items():
+                stats = self.stages.setdefault(name, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+                for key in stats:
+                    stats[key] += other[key]
+            for name, value in report.get("counters", {}).items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            self.profiles.update(report.get("profiles", {}))
+
+    def report(self) -> dict:
+        """Structured, JSON-serializable snapshot"""
+        with self._lock:
+            report = {
+                "stages": {name: dict(stats) for name, stats in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+            if self.profiles:
+                report["profiles"] = dict(self.profiles)
+            return report
+
+    def _start_profile(self):
+        state = {"overlapped": False}
+        with self._lock:
+            if self._active_profiles:
+                state["overlapped"] = True
+                for other in self._active_profiles:
+                    other["overlapped"] = True
+            else:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self._started_tracing = True
+                # Only when alone: resetting would discard a running stage's peak
+                tracemalloc.reset_peak()
+            self._active_profiles.append(state)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active (nested or concurrent stage)
+            profiler = None
+        return profiler, state
+
+    def _stop_profile(self, name: str, profiler, state: dict) -> None:
+        if profiler is not None:
+            profiler.disable()
+        with self._lock:
+            entry = {"peak_traced_bytes": tracemalloc.get_traced_memory()[1]}
+            self._active_profiles.remove(state)
+            if not self._active_profiles and self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        if state["overlapped"]:
+            entry["overlapped"] = True
+        if profiler is not None:
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(self.PROFILE_TOP_FUNCTIONS)
+            entry["top_functions"] = out.getvalue()
+        with self._lock:
+            self.profiles[name] = entry
+
+class _NullMetrics:
+    """Stand-in used when no Metrics is active; records nothing"""
+
+    profile = False
+
+    @contextmanager
+    def stage(self, name: str):
+        yield
+
+    def incr(self, name: str, amount: float = 1) -> None:
+        pass
+
+NULL_METRICS = _NullMetrics()
+
+def current_metrics() -> "Metrics | _NullMetrics":
+    """The Metrics active in this context, or a no-op recorder"""
+    return _current.get() or NULL_METRICS
+
+def propagate(func):
+    """Wrap func so it runs with the caller's active Metrics, e.g. inside a thread pool"""
+    metrics = _current.get()
+
+    def run(*args, **kwargs):
+        token = _current.set(metrics)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
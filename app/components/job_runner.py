@@ -0,0 +1,119 @@
+# app/components/job_runner.py
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_WORKERS = 2
+MAX_FINISHED_JOBS = 32  # Finished jobs kept for lookup; older ones are forgotten
+
+class Job:
+    """One background run: status, current stage, streamed progress and the final result"""
+
+    def __init__(self, key: str, label: str = ""):
+        self.id = uuid.uuid4().hex
+        self.key = key  # Hash of the inputs; equal inputs share a job
+        self.label = label
+        self.status = "queued"  # "queued", "running", "done" or "failed"
+        self.stage = None
+        self.stages: list[str] = []  # Stages started so far, in order
+        self.findings: list[dict] = []  # Progress events, e.g. per-chunk LLM findings
+        self.partial = ""  # Text streamed so far, e.g. the summary being generated
+        self.estimate = None  # Quick similarity estimate, available before the exact diff
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def enter_stage(self, name: str) -> None:
+        with self._lock:
+            self.stage = name
+            if name not in self.stages:
+                self.stages.append(name)
+
+    def add_finding(self, finding: dict) -> None:
+        with self._lock:
+            self.findings.append(finding)
+
+    def append_text(self, text: str) -> None:
+        with self._lock:
+            self.partial += text
+
+    def set_estimate(self, estimate: float) -> None:
+        with self._lock:
+            self.estimate = estimate
+
+    def snapshot(self) -> dict:
+        """Consistent copy of the progress fields for rendering from another thread"""
+        with self._lock:
+            return {
+                "id": self.id, "status": self.status, "stage": self.stage, "stages": list(self.stages),
+                "findings": list(self.findings), "partial": self.partial, "estimate": self.estimate,
+                "error": self.error,
+            }
+
+class JobRunner:
+    """Runs jobs on a thread pool so callers (e.g. Streamlit script runs) never block on them.
+
+    Submitting the same key while a job for it is queued, running or done returns that
+    job instead of starting another; failed jobs are retried on the next submit.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, max_finished: int = MAX_FINISHED_JOBS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.max_finished = max_finished
+        self._jobs: dict[str, Job] = {}
+        self._by_key: dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, func, label: str = "") -> Job:
+        """Run func(job) in the background; it reports progress through the Job and returns the result"""
+        with self._lock:
+            existing = self._by_key.get(key)
+            if existing is not None and existing.status != "failed":
+                return existing
+            job = Job(key, label)
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+        self._executor.submit(self._run, job, func)
+        return job
+
+    def _run(self, job: Job, func) -> None:
+        job.status = "running"
+        result = error = None
+        try:
+            result = func(job)
+            status = "done"
+        except Exception as e:
+            error = str(e)
+            status = "failed"
+        with self._lock:
+            # finished_at first: _evict sorts finished jobs by it
+            job.result, job.error = result, error
+            job.finished_at = time.time()
+            job.status = status
+        self._evict()
+
+    def _evict(self) -> None:
+        with self._lock:
+            finished = sorted((job for job in self._jobs.values() if job.finished), key=lambda job: job.finished_at)
+            for job in finished[:max(0, len(finished) - self.max_finished)]:
+                del self._jobs[job.id]
+                if self._by_key.get(job.key) is job:
+                    del self._by_key[job.key]
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def find(self, key: str) -> Job | None:
+        with self._lock:
+            return self._by_key.get(key)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,77 @@
+# app/components/lazy.py
+import importlib
+import sys
+import threading
+import time
+
+_timings: dict[str, float] = {}  # What was loaded on demand or by warm-up -> seconds
+_lock = threading.Lock()
+
+def record_timing(name: str, seconds: float) -> None:
+    with _lock:
+        _timings[name] = seconds
+
+def timed_import(name: str):
+    """Import a module, recording how long it took unless it was already loaded"""
+    loaded = name in sys.modules
+    started = time.perf_counter()
+    # Always go through importlib: it waits if another thread is still initializing the module
+    module = importlib.import_module(name)
+    if not loaded:
+        record_timing(name, time.perf_counter() - started)
+    return module
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None or self._name in sys.modules
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = timed_import(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self._name!r}{' (loaded)' if self.loaded else ''}>"
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+def warm_up(modules: list[str], loaders: dict | None = None, background: bool = True) -> threading.Thread | None:
+    """Import modules, then call loaders (name -> callable, e.g. model loads), ahead of first use.
+
+    In the background by default so the first screen is not delayed; failures are
+    recorded in the report instead of raised, since the stage that needs the module
+    will report them properly.
+    """
+    def run() -> None:
+        for name in modules:
+            try:
+                timed_import(name)
+            except ImportError as e:
+                record_timing(f"{name} (failed: {e})", 0.0)
+        for name, loader in (loaders or {}).items():
+            started = time.perf_counter()
+            try:
+                loader()
+            except Exception as e:
+                name = f"{name} (failed: {e})"
+            record_timing(name, time.perf_counter() - started)
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+def import_report() -> list[tuple[str, float]]:
+    """(name, seconds) of everything loaded on demand or by warm-up so far, slowest first"""
+    with _lock:
+        return sorted(_timings.items(), key=lambda item: -item[1])
@@ -1,48 +1,240 @@
 # app/components/llm_analyzer.py
+import hashlib
+import json
 import os
+import time
+from collections import deque
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import groq
 import httpx
 from groq import Groq
+from .cache import DiskCache
+from .http_client import RateLimiter, backoff_delay, get_shared_http_client, parse_retry_after
+from .instrumentation import current_metrics, propagate
+from .text_compare import hunk_key, strip_line_numbers
+
+RETRYABLE_STATUS_CODES = (408, 409, 429)  # Plus every 5xx
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, groq.APIConnectionError):  # Includes timeouts
+        return True
+    if isinstance(error, groq.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
 
 class LLMAnalyzer:
     MODEL_NAME = "llama-3.2-90b-vision-preview"
     MAX_CHUNK_TOKENS = 2048  # Conservative limit per chunk
+    SYNTHESIS_FAN_IN = 8  # Max analyses combined by a single synthesis call
+    PROMPT_TOKEN_BUDGET = 3000  # Estimated diff tokens sent per chunk request
+    CHARS_PER_TOKEN = 4  # Rough English/legal text average
+    TEMPERATURE = 0.1
+    CHUNK_SYSTEM_PROMPT = "You are a legal document analyzer. Analyze the differences between contract versions."
+    SYNTHESIS_SYSTEM_PROMPT = "Synthesize multiple contract analysis chunks into a coherent summary."
+    MAX_RETRIES = 5
     
-    def __init__(self):
+    def __init__(self, max_concurrency: int = 1, synthesis_fan_in: int = SYNTHESIS_FAN_IN,
+                 cache: DiskCache | None = None, token_budget: int = PROMPT_TOKEN_BUDGET,
+                 scope_entities: bool = False, http_client: httpx.Client | None = None,
+                 rate_limiter: RateLimiter | None = None, max_retries: int = MAX_RETRIES):
+        if token_budget < 1:
+            raise ValueError("token_budget must be at least 1")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if synthesis_fan_in < 2:
+            raise ValueError("synthesis_fan_in must be at least 2")
+        if max_retries < 0:
+            raise ValueError("max_retries must not be negative")
+        self.max_concurrency = max_concurrency
+        self.synthesis_fan_in = synthesis_fan_in
+        self.cache = cache
+        self.token_budget = token_budget
+        self.scope_entities = scope_entities  # Attach only entities that occur in each chunk
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+
         api_key = os.getenv("GROQ_API_KEY")
         if not api_key:
             raise ValueError("GROQ_API_KEY environment variable is required")
 
-        http_client = httpx.Client(
-            timeout=60.0,
-            transport=httpx.HTTPTransport(retries=3)
-        )
-        
-        self.client = Groq(api_key=api_key,http_client=http_client)
+        # Pooled connections are shared by every analyzer in the process. Retries happen in
+        # _request so they can honor Retry-After and go through the rate limiter again.
+        self.client = Groq(api_key=api_key, http_client=http_client or get_shared_http_client(),
+                           max_retries=0)
+
+    @classmethod
+    def _estimate_tokens(cls, text: str) -> int:
+        """Cheap token estimate used for chunk budgeting"""
+        return len(text) // cls.CHARS_PER_TOKEN + 1
+
+    def _chunk_differences(self, differences: list[str], chunk_size: int | None = None,
+                           token_budget: int | None = None) -> list[list[str]]:
+        """Split differences into chunks of at most token_budget estimated tokens.
+
+        Hunks ("@@" header lines and what follows) are kept together when they fit.
+        Passing chunk_size splits into fixed-size chunks of that many lines instead.
+        """
+        if chunk_size is not None:
+            return [differences[i:i + chunk_size] for i in range(0, len(differences), chunk_size)]
+        budget = token_budget or self.token_budget
+
+        blocks = []
+        for line in differences:
+            if not blocks or str(line).startswith('@@'):
+                blocks.append([])
+            blocks[-1].append(line)
+
+        chunks = []
+        current, current_tokens = [], 0
+        for block in blocks:
+            block_tokens = sum(self._estimate_tokens(str(line)) for line in block)
+            if current and current_tokens + block_tokens > budget:
+                chunks.append(current)
+                current, current_tokens = [], 0
+            if block_tokens <= budget:
+                current.extend(block)
+                current_tokens += block_tokens
+                continue
+            # Oversized hunk: fall back to packing its lines individually
+            for line in block:
+                line_tokens = self._estimate_tokens(str(line))
+                if current and current_tokens + line_tokens > budget:
+                    chunks.append(current)
+                    current, current_tokens = [], 0
+                current.append(line)
+                current_tokens += line_tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _cache_key(self, system_prompt: str, prompt: str, max_tokens: int) -> str:
+        """Content address of a completion request.
+
+        Hunk line numbers are left out, so chunks shifted by an edit further up the
+        document are still served from the cache.
+        """
+        prompt_hash = hashlib.sha256(f"{system_prompt}\x00{strip_line_numbers(prompt)}".encode("utf-8")).hexdigest()
+        key = json.dumps([self.MODEL_NAME, self.TEMPERATURE, max_tokens, prompt_hash])
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
 
-    def _chunk_differences(self, differences: list[str], chunk_size: int = 10) -> list[list[str]]:
-        """Split differences into manageable chunks"""
-        return [differences[i:i + chunk_size] for i in range(0, len(differences), chunk_size)]
+    def _complete(self, system_prompt: str, prompt: str, max_tokens: int) -> str:
+        """Run a chat completion, served from the response cache when possible"""
+        metrics = current_metrics()
+        key = None
+        if self.cache is not None:
+            key = self._cache_key(system_prompt, prompt, max_tokens)
+            cached = self.cache.get(key)
+            if cached is not None:
+                metrics.incr("llm_cache_hits")
+                return cached
+            metrics.incr("llm_cache_misses")
+
+        with metrics.stage("llm_request"):
+            response = self._request(system_prompt, prompt, max_tokens)
+        metrics.incr("llm_requests")
+        self._record_usage(getattr(response, "usage", None))
+        content = response.choices[0].message.content
+        if key is not None and content is not None:
+            self.cache.set(key, content)
+        return content
+
+    def _complete_stream(self, system_prompt: str, prompt: str, max_tokens: int):
+        """Yield completion text as it arrives; a cached response is yielded in one piece"""
+        metrics = current_metrics()
+        key = None
+        if self.cache is not None:
+            key = self._cache_key(system_prompt, prompt, max_tokens)
+            cached = self.cache.get(key)
+            if cached is not None:
+                metrics.incr("llm_cache_hits")
+                yield cached
+                return
+            metrics.incr("llm_cache_misses")
+
+        parts = []
+        with metrics.stage("llm_request"):
+            for chunk in self._request(system_prompt, prompt, max_tokens, stream=True):
+                # Groq reports usage on the final chunk of a stream
+                self._record_usage(getattr(getattr(chunk, "x_groq", None), "usage", None))
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        metrics.incr("llm_requests")
+        if key is not None and parts:
+            self.cache.set(key, "".join(parts))
+
+    @staticmethod
+    def _record_usage(usage) -> None:
+        metrics = current_metrics()
+        for field in ("prompt_tokens", "completion_tokens"):
+            count = getattr(usage, field, None)
+            if isinstance(count, int):
+                metrics.incr(f"llm_{field}", count)
+
+    def _request(self, system_prompt: str, prompt: str, max_tokens: int, **options):
+        """Send a completion request, retrying rate limits and transient failures with jittered backoff.
+
+        With stream=True only opening the stream is retried, never a partially received one.
+        """
+        metrics = current_metrics()
+        prompt_tokens = self._estimate_tokens(system_prompt) + self._estimate_tokens(prompt)
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                waited = self.rate_limiter.acquire(prompt_tokens)
+                if waited:
+                    metrics.incr("llm_rate_limit_wait_seconds", waited)
+            try:
+                return self.client.chat.completions.create(
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": prompt}
+                    ],
+                    model=self.MODEL_NAME,
+                    max_tokens=max_tokens,
+                    temperature=self.TEMPERATURE,
+                    **options
+                )
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                response = getattr(e, "response", None)
+                retry_after = parse_retry_after(response.headers if response is not None else None)
+                metrics.incr("llm_retries")
+                time.sleep(backoff_delay(attempt, retry_after=retry_after))
+                attempt += 1
+
+    @staticmethod
+    def _entities_for_chunk(chunk: list[str], entities: dict) -> dict:
+        """Subset of entities whose values occur in the chunk text"""
+        chunk_text = '\n'.join(str(line) for line in chunk)
+        scoped = {}
+        for label, values in entities.items():
+            relevant = [value for value in dict.fromkeys(values) if value in chunk_text]
+            if relevant:
+                scoped[label] = relevant
+        return scoped
+
+    def _chunk_prompt(self, chunk: list[str], entities: dict) -> str:
+        current_metrics().incr("llm_chunks_sent")
+        if self.scope_entities:
+            entities = self._entities_for_chunk(chunk, entities)
+        return self._create_prompt(chunk, entities)
 
     def _analyze_chunk(self, chunk: list[str], entities: dict) -> str:
         """Analyze a single chunk of differences"""
-        prompt = self._create_prompt(chunk, entities)
-        response = self.client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a legal document analyzer. Analyze the differences between contract versions."
-                },
-                {"role": "user", "content": prompt}
-            ],
-            model=self.MODEL_NAME,
-            max_tokens=self.MAX_CHUNK_TOKENS,
-            temperature=0.1
-        )
-        return response.choices[0].message.content
+        return self._complete(self.CHUNK_SYSTEM_PROMPT, self._chunk_prompt(chunk, entities), self.MAX_CHUNK_TOKENS)
 
     def _synthesize_analyses(self, analyses: list[str]) -> str:
         """Combine multiple chunk analyses into coherent summary"""
-        synthesis_prompt = f"""
+        return self._complete(self.SYNTHESIS_SYSTEM_PROMPT, self._synthesis_prompt(analyses), 2048)
+
+    def _synthesis_prompt(self, analyses: list[str]) -> str:
+        return f"""
         Synthesize these analysis chunks into a coherent summary:
         
         {'\n'.join(analyses)}
@@ -52,42 +244,237 @@ class LLMAnalyzer:
         2. Major suspicious modifications
         3. Critical clause changes
         """
-        
-        response = self.client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Synthesize multiple contract analysis chunks into a coherent summary."
-                },
-                {"role": "user", "content": synthesis_prompt}
-            ],
-            model=self.MODEL_NAME,
-            max_tokens=2048,
-            temperature=0.1
-        )
-        return response.choices[0].message.content
+
+    def _map_ordered(self, func, items: list) -> list:
+        """Apply func to items with at most max_concurrency calls in flight, keeping input order"""
+        if self.max_concurrency == 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(items))) as executor:
+            return list(executor.map(propagate(func), items))
+
+    def _analyze_chunks(self, chunks: list[list[str]], entities: dict) -> list[str]:
+        """Analyze chunks, concurrently when max_concurrency > 1"""
+        return self._map_ordered(lambda chunk: self._analyze_chunk(chunk, entities), chunks)
+
+    def _iter_chunk_analyses(self, chunks: list[list[str]], entities: dict | Callable[[int], dict]):
+        """Yield (index, analysis) pairs as chunk analyses complete.
+
+        entities is one dict for all chunks, or a function of the chunk index called
+        in the chunk's worker (so a chunk waiting for its entities holds up no other).
+        """
+        def analyze_indexed(index: int, chunk: list[str]) -> str:
+            return self._analyze_chunk(chunk, entities(index) if callable(entities) else entities)
+
+        if self.max_concurrency == 1 or len(chunks) <= 1:
+            for index, chunk in enumerate(chunks):
+                yield index, analyze_indexed(index, chunk)
+            return
+        executor = ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(chunks)))
+        try:
+            analyze = propagate(analyze_indexed)
+            futures = {executor.submit(analyze, index, chunk): index for index, chunk in enumerate(chunks)}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # Don't start queued chunks if the consumer stopped early
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _reduce_levels(self, analyses: list[str]) -> list[str]:
+        """Synthesize groups until at most synthesis_fan_in analyses remain for the final call"""
+        while len(analyses) > self.synthesis_fan_in:
+            groups = [analyses[i:i + self.synthesis_fan_in]
+                      for i in range(0, len(analyses), self.synthesis_fan_in)]
+            analyses = self._map_ordered(self._synthesize_analyses, groups)
+        return analyses
+
+    def _reduce_analyses(self, analyses: list[str]) -> str:
+        """Synthesize analyses level by level so no prompt holds more than synthesis_fan_in of them"""
+        return self._synthesize_analyses(self._reduce_levels(analyses))
 
     def analyze_differences(self, differences: list[str], entities: dict) -> str:
         """Analyze differences using chunking for large inputs"""
+        with current_metrics().stage("llm_analysis"):
+            return self._analyze_differences(differences, entities)
+
+    def _analyze_differences(self, differences: list[str], entities: dict) -> str:
         try:
-            # Split into chunks if too large
-            if len(differences) > 1500:  # Arbitrary threshold
-                chunks = self._chunk_differences(differences)
-                chunk_analyses = []
-                
-                for chunk in chunks:
-                    analysis = self._analyze_chunk(chunk, entities)
-                    chunk_analyses.append(analysis)
+            if not isinstance(differences, list):
+                raise TypeError("differences must be a list of strings")
+            # Split into chunks if the payload exceeds the per-request token budget
+            chunks = self._chunk_differences(differences)
+            if len(chunks) > 1:
+                chunk_analyses = self._analyze_chunks(chunks, entities)
                 
                 # Synthesize all chunk analyses
-                return self._synthesize_analyses(chunk_analyses)
+                return self._reduce_analyses(chunk_analyses)
             else:
                 # Original direct analysis for small inputs
                 return self._analyze_chunk(differences, entities)
                 
         except Exception as e:
             raise RuntimeError(f"Error analyzing differences: {str(e)}")
+
+    def stream_analysis(self, differences: list[str], entities: dict):
+        """Analyze differences like analyze_differences, yielding results as they arrive.
+
+        Yields {"type": "chunk", "index", "total", "text"} for each chunk analysis of a
+        multi-chunk payload in completion order, then {"type": "token", "text"} pieces of
+        the final analysis, and finally {"type": "done", "text"} with the full analysis.
+        """
+        with current_metrics().stage("llm_analysis"):
+            try:
+                if not isinstance(differences, list):
+                    raise TypeError("differences must be a list of strings")
+                chunks = self._chunk_differences(differences)
+                if len(chunks) > 1:
+                    analyses = [None] * len(chunks)
+                    for index, text in self._iter_chunk_analyses(chunks, entities):
+                        analyses[index] = text
+                        yield {"type": "chunk", "index": index, "total": len(chunks), "text": text}
+                    prompt = self._synthesis_prompt(self._reduce_levels(analyses))
+                    pieces = self._complete_stream(self.SYNTHESIS_SYSTEM_PROMPT, prompt, 2048)
+                else:
+                    prompt = self._chunk_prompt(differences, entities)
+                    pieces = self._complete_stream(self.CHUNK_SYSTEM_PROMPT, prompt, self.MAX_CHUNK_TOKENS)
+                parts = []
+                for piece in pieces:
+                    parts.append(piece)
+                    yield {"type": "token", "text": piece}
+                yield {"type": "done", "text": "".join(parts)}
+            except Exception as e:
+                raise RuntimeError(f"Error analyzing differences: {str(e)}")
         
+    def _plan_hunk_chunks(self, hunks: list[list[str]], previous_chunks: list[dict] | None) -> list[dict]:
+        """Chunk records in document order: reused {"hunks", "analysis"} or new {"hunks", "lines"}.
+
+        A previous chunk is reused when every hunk it covered is still present verbatim;
+        the remaining hunks are packed into new chunks as usual.
+        """
+        keys = [hunk_key(hunk) for hunk in hunks]
+        position = {}
+        for index, key in enumerate(keys):
+            position.setdefault(key, index)
+        records = [{"hunks": list(chunk["hunks"]), "analysis": chunk["analysis"]}
+                   for chunk in previous_chunks or ()
+                   if chunk["hunks"] and all(key in position for key in chunk["hunks"])]
+        covered = {key for record in records for key in record["hunks"]}
+        lines, owners = [], []
+        for key, hunk in zip(keys, hunks):
+            if key not in covered:
+                covered.add(key)  # Identical hunks are analyzed once
+                lines.extend(hunk)
+                owners.extend([key] * len(hunk))
+        offset = 0
+        for chunk in self._chunk_differences(lines):
+            records.append({"hunks": list(dict.fromkeys(owners[offset:offset + len(chunk)])), "lines": chunk})
+            offset += len(chunk)
+        records.sort(key=lambda record: min(position[key] for key in record["hunks"]))
+        return records
+
+    def stream_hunk_analysis(self, hunks: list[list[str]], entities: dict | Callable[[list[str]], dict],
+                             previous_chunks: list[dict] | None = None):
+        """Like stream_analysis for formatted hunks, reusing analyses from an earlier revision.
+
+        previous_chunks is the "chunks" list of an earlier run's done event: chunks whose
+        hunks are all unchanged keep their analysis, and only the rest go to the model.
+        Chunk events carry a "reused" flag; the done event adds this run's "chunks".
+        entities may be a function of a chunk's hunk keys instead of a dict; it is called
+        as each chunk is sent and may block until those hunks' entities are ready.
+        """
+        with current_metrics().stage("llm_analysis"):
+            try:
+                records = self._plan_hunk_chunks(hunks, previous_chunks)
+                pending = [index for index, record in enumerate(records) if "analysis" not in record]
+                current_metrics().incr("llm_chunks_reused", len(records) - len(pending))
+                if len(records) > 1:
+                    for index, record in enumerate(records):
+                        if "analysis" in record:
+                            yield {"type": "chunk", "index": index, "total": len(records),
+                                   "text": record["analysis"], "reused": True}
+                    chunks = [records[index]["lines"] for index in pending]
+                    chunk_entities = (lambda position: entities(records[pending[position]]["hunks"])) \
+                        if callable(entities) else entities
+                    for position, text in self._iter_chunk_analyses(chunks, chunk_entities):
+                        index = pending[position]
+                        records[index]["analysis"] = text
+                        yield {"type": "chunk", "index": index, "total": len(records), "text": text, "reused": False}
+                    prompt = self._synthesis_prompt(self._reduce_levels([record["analysis"] for record in records]))
+                    pieces = self._complete_stream(self.SYNTHESIS_SYSTEM_PROMPT, prompt, 2048)
+                elif records and not pending:
+                    pieces = [records[0]["analysis"]]
+                else:
+                    chunk = records[0]["lines"] if records else []
+                    if callable(entities):
+                        entities = entities(records[0]["hunks"] if records else [])
+                    prompt = self._chunk_prompt(chunk, entities)
+                    pieces = self._complete_stream(self.CHUNK_SYSTEM_PROMPT, prompt, self.MAX_CHUNK_TOKENS)
+                parts = []
+                for piece in pieces:
+                    parts.append(piece)
+                    yield {"type": "token", "text": piece}
+                text = "".join(parts)
+                if len(records) == 1:
+                    records[0]["analysis"] = text
+                chunks = [{"hunks": record["hunks"], "analysis": record["analysis"]} for record in records]
+                yield {"type": "done", "text": text, "chunks": chunks}
+            except Exception as e:
+                raise RuntimeError(f"Error analyzing differences: {str(e)}")
+
+    def _iter_hunk_chunks(self, hunks: Iterable):
+        """Pack hunks (objects with to_lines()) into (hunks, lines) chunks within the token budget, lazily"""
+        pending, lines, tokens = [], [], 0
+        for hunk in hunks:
+            hunk_lines = hunk.to_lines()
+            hunk_tokens = self._estimate_tokens("\n".join(hunk_lines))
+            if lines and tokens + hunk_tokens > self.token_budget:
+                yield pending, lines
+                pending, lines, tokens = [], [], 0
+            if hunk_tokens > self.token_budget:
+                # Oversized hunk: split on its own, as _chunk_differences does
+                for piece in self._chunk_differences(hunk_lines):
+                    yield [hunk], piece
+                continue
+            pending.append(hunk)
+            lines.extend(hunk_lines)
+            tokens += hunk_tokens
+        if lines:
+            yield pending, lines
+
+    def analyze_hunk_stream(self, hunks: Iterable, entities_for=None, on_chunk=None) -> str:
+        """Analyze hunks while they are still being produced, holding only in-flight chunks.
+
+        Chunks are sent as soon as they fill the token budget, with at most max_concurrency
+        outstanding; only their analyses are kept for the final synthesis. entities_for
+        (hunks of a chunk -> entity dict) supplies per-chunk entities; on_chunk is called
+        with (index, analysis) as each chunk completes, in order.
+        """
+        with current_metrics().stage("llm_analysis"):
+            try:
+                analyses = []
+                in_flight = deque()
+                analyze = propagate(self._analyze_chunk)
+                with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                    def collect() -> None:
+                        analyses.append(in_flight.popleft().result())
+                        if on_chunk is not None:
+                            on_chunk(len(analyses) - 1, analyses[-1])
+
+                    for chunk_hunks, lines in self._iter_hunk_chunks(hunks):
+                        entities = entities_for(chunk_hunks) if entities_for is not None else {}
+                        if len(in_flight) >= self.max_concurrency:
+                            collect()
+                        in_flight.append(executor.submit(analyze, lines, entities))
+                    while in_flight:
+                        collect()
+                current_metrics().incr("llm_stream_chunks", len(analyses))
+                if not analyses:
+                    return self._analyze_chunk([], {})
+                if len(analyses) == 1:
+                    return analyses[0]
+                return self._reduce_analyses(analyses)
+            except Exception as e:
+                raise RuntimeError(f"Error analyzing differences: {str(e)}")
+
     def _create_prompt(self, differences: list, entities: dict) -> str:
         """Create prompt for LLM analysis"""
         return f"""
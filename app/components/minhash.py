@@ -0,0 +1,128 @@
+# app/components/minhash.py
+import functools
+import hashlib
+import numpy as np
+
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 32  # 4 rows per band: candidates from ~0.4 Jaccard up, nearly always above 0.55
+SHINGLE_WORDS = 3
+BLOCK_SHINGLES = 4096  # Shingles hashed per numpy block, bounding the (block x permutations) matrix
+SEED = 1
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+@functools.lru_cache(maxsize=8)
+def _permutations(num_perm: int, seed: int = SEED) -> tuple[np.ndarray, np.ndarray]:
+    generator = np.random.default_rng(seed)
+    a = generator.integers(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+    b = generator.integers(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+    return a, b
+
+def shingle_hashes(text: str, k: int = SHINGLE_WORDS) -> np.ndarray:
+    """32-bit hashes of the distinct k-word shingles of text (case and wrapping ignored)"""
+    words = text.lower().split()
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    word_hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little") for word in words),
+        dtype=np.uint64, count=len(words),
+    )
+    k = min(k, len(words))
+    count = len(words) - k + 1
+    # Polynomial combination of the k word hashes; uint64 arithmetic wraps around
+    combined = np.zeros(count, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for offset in range(k):
+            combined = combined * np.uint64(1099511628211) + word_hashes[offset:offset + count]
+    return np.unique(combined & _MAX_HASH)
+
+class MinHash:
+    """Fixed-size MinHash signature; the fraction of equal slots estimates Jaccard similarity"""
+
+    def __init__(self, signature: np.ndarray):
+        self.signature = signature
+
+    @classmethod
+    def from_text(cls, text: str, num_perm: int = NUM_PERMUTATIONS, k: int = SHINGLE_WORDS) -> "MinHash":
+        a, b = _permutations(num_perm)
+        signature = np.full(num_perm, _MAX_HASH, dtype=np.uint64)
+        hashes = shingle_hashes(text, k)
+        with np.errstate(over="ignore"):
+            for start in range(0, len(hashes), BLOCK_SHINGLES):
+                block = hashes[start:start + BLOCK_SHINGLES, np.newaxis]
+                permuted = ((block * a + b) % _MERSENNE_PRIME) & _MAX_HASH
+                np.minimum(signature, permuted.min(axis=0), out=signature)
+        return cls(signature)
+
+    @property
+    def num_perm(self) -> int:
+        return len(self.signature)
+
+    def jaccard(self, other: "MinHash") -> float:
+        """Estimated Jaccard similarity of the two documents' shingle sets"""
+        if self.num_perm != other.num_perm:
+            raise ValueError("MinHash signatures have different sizes")
+        return float(np.mean(self.signature == other.signature))
+
+    def to_list(self) -> list[int]:
+        return self.signature.tolist()
+
+    @classmethod
+    def from_list(cls, values: list[int]) -> "MinHash":
+        return cls(np.array(values, dtype=np.uint64))
+
+class LSHIndex:
+    """Banded locality-sensitive hash index of MinHash signatures for top-k candidate lookup"""
+
+    def __init__(self, num_perm: int = NUM_PERMUTATIONS, bands: int = LSH_BANDS):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets: list[dict[bytes, set]] = [{} for _ in range(bands)]
+        self._sketches: dict = {}
+
+    def _band_keys(self, minhash: MinHash) -> list[bytes]:
+        if minhash.num_perm != self.num_perm:
+            raise ValueError(f"expected {self.num_perm} permutations, got {minhash.num_perm}")
+        signature = minhash.signature
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def add(self, key, minhash: MinHash) -> None:
+        if key in self._sketches:
+            self.remove(key)
+        self._sketches[key] = minhash
+        for buckets, band_key in zip(self._buckets, self._band_keys(minhash)):
+            buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key) -> None:
+        minhash = self._sketches.pop(key)
+        for buckets, band_key in zip(self._buckets, self._band_keys(minhash)):
+            bucket = buckets[band_key]
+            bucket.discard(key)
+            if not bucket:
+                del buckets[band_key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._sketches
+
+    def __len__(self) -> int:
+        return len(self._sketches)
+
+    def query(self, minhash: MinHash, k: int = 5, min_similarity: float = 0.0,
+              where=None) -> list[tuple[object, float]]:
+        """Up to k (key, estimated Jaccard) pairs sharing at least one band, most similar first.
+
+        where(key), if given, filters the candidates before the top k are taken.
+        """
+        candidates = set()
+        for buckets, band_key in zip(self._buckets, self._band_keys(minhash)):
+            candidates.update(buckets.get(band_key, ()))
+        if where is not None:
+            candidates = {key for key in candidates if where(key)}
+        scored = [(key, minhash.jaccard(self._sketches[key])) for key in candidates]
+        scored = [(key, score) for key, score in scored if score >= min_similarity]
+        scored.sort(key=lambda item: (-item[1], str(item[0])))
+        return scored[:k]
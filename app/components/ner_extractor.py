@@ -1,17 +1,181 @@
-import spacy
+import hashlib
+import json
+import threading
+from collections import Counter
+from .cache import MemoryCache
+from .instrumentation import current_metrics
+from .lazy import lazy_import
+
+spacy = lazy_import("spacy")  # Imported when the first extractor is built, not at app start
+DEFAULT_MODEL = "en_core_web_sm"
+# Pipeline components entity recognition does not depend on
+NER_UNUSED_COMPONENTS = ("tagger", "parser", "attribute_ruler", "lemmatizer", "senter")
+MAX_SINGLE_DOC_CHARS = 100_000  # Longer texts are split and sent through nlp.pipe
+SEGMENT_CHARS = 10_000
+DELTA_LABELS = ("MONEY", "DATE", "ORG", "PERSON")  # Entity types reported in entity deltas
+
+_shared_lock = threading.Lock()
+_shared_extractors: dict[tuple[str, tuple[str, ...]], "NERExtractor"] = {}
+
+def split_segments(text: str, max_chars: int = SEGMENT_CHARS) -> list[tuple[int, str]]:
+    """Split text into (offset, segment) pieces of at most max_chars.
+
+    Cuts prefer paragraph breaks, then line breaks, then spaces, so entities are
+    rarely split across segments.
+    """
+    segments = []
+    start = 0
+    while start < len(text):
+        end = min(start + max_chars, len(text))
+        if end < len(text):
+            for separator in ("\n\n", "\n", " "):
+                cut = text.rfind(separator, start + 1, end)
+                if cut > start:
+                    end = cut + len(separator)
+                    break
+        segments.append((start, text[start:end]))
+        start = end
+    return segments
+
+def hunk_sides(hunk) -> tuple[str, str]:
+    """Template-side and contract-side text of a DiffHunk, context lines included on both"""
+    left = [line[2:] for line in hunk.lines if line[:2] != '+ ']
+    right = [line[2:] for line in hunk.lines if line[:2] != '- ']
+    return "\n".join(left), "\n".join(right)
 
 class NERExtractor:
-    def __init__(self):
-        self.nlp = spacy.load("en_core_web_sm")
-        
-    def extract_entities(self, text: str) -> dict:
+    def __init__(self, model: str = DEFAULT_MODEL, disable: tuple[str, ...] | list[str] | None = None):
+        # Entities of template-side hunk text, which recurs across every contract of a template
+        self.template_cache = MemoryCache(max_entries=4096)
+        if disable:
+            self.nlp = spacy.load(model, disable=list(disable))
+        else:
+            self.nlp = spacy.load(model)
+
+    @classmethod
+    def shared(cls, model: str = DEFAULT_MODEL,
+               disable: tuple[str, ...] | list[str] | None = NER_UNUSED_COMPONENTS) -> "NERExtractor":
+        """Process-wide extractor, loading each model/disable combination only once"""
+        key = (model, tuple(disable or ()))
+        with _shared_lock:
+            extractor = _shared_extractors.get(key)
+            if extractor is None:
+                extractor = cls(model, disable)
+                _shared_extractors[key] = extractor
+            return extractor
+
+    def _iter_docs(self, text: str, n_process: int = 1, batch_size: int = 8):
+        """Yield (offset, doc) pairs covering text"""
+        if len(text) <= MAX_SINGLE_DOC_CHARS:
+            yield 0, self.nlp(text)
+            return
+        segments = split_segments(text, SEGMENT_CHARS)
+        docs = self.nlp.pipe((segment for _, segment in segments), batch_size=batch_size, n_process=n_process)
+        for (offset, _), doc in zip(segments, docs):
+            yield offset, doc
+
+    def extract_entity_spans(self, text: str, n_process: int = 1) -> list[tuple[str, str, int, int]]:
+        """Extract (label, text, start, end) entities with offsets into the full text"""
+        return [
+            (ent.label_, ent.text, offset + ent.start_char, offset + ent.end_char)
+            for offset, doc in self._iter_docs(text, n_process)
+            for ent in doc.ents
+        ]
+
+    def extract_entities(self, text: str, n_process: int = 1) -> dict:
         """Extract named entities from text"""
-        doc = self.nlp(text)
+        metrics = current_metrics()
         entities = {}
-        
-        for ent in doc.ents:
-            if ent.label_ not in entities:
-                entities[ent.label_] = []
-            entities[ent.label_].append(ent.text)
-            
-        return entities
\ No newline at end of file
+
+        with metrics.stage("ner"):
+            for _, doc in self._iter_docs(text, n_process):
+                for ent in doc.ents:
+                    if ent.label_ not in entities:
+                        entities[ent.label_] = []
+                    entities[ent.label_].append(ent.text)
+
+        metrics.incr("entities_found", sum(len(values) for values in entities.values()))
+        return entities
+
+    def _entities_by_text(self, texts: list[str], cache: MemoryCache | None = None) -> list[dict]:
+        """Entity dicts for each text, running the pipeline only on cache misses"""
+        results: list[dict | None] = [None] * len(texts)
+        keys = [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts]
+        missing = []
+        for i, key in enumerate(keys):
+            cached = cache.get(key) if cache is not None else None
+            if cached is not None:
+                results[i] = json.loads(cached)
+            else:
+                missing.append(i)
+
+        docs = self.nlp.pipe(texts[i] for i in missing)
+        for i, doc in zip(missing, docs):
+            entities = {}
+            for ent in doc.ents:
+                entities.setdefault(ent.label_, []).append(ent.text)
+            results[i] = entities
+            if cache is not None:
+                cache.set(keys[i], json.dumps(entities))
+        return results
+
+    def extract_hunk_entities(self, hunks: list, known: dict[str, list[dict]] | None = None) -> tuple[list[dict], list[dict]]:
+        """Run NER only on changed hunks (with their context lines).
+
+        Returns per-hunk entity dicts for the template side and the contract side.
+        Template-side results are cached, since the same template regions recur.
+        known maps hunk keys to [left, right] results of an earlier revision; those
+        hunks are not processed again.
+        """
+        metrics = current_metrics()
+        known = known or {}
+        results = [known.get(hunk.key) if known else None for hunk in hunks]
+        pending = [hunk for hunk, result in zip(hunks, results) if result is None]
+        with metrics.stage("ner"):
+            sides = [hunk_sides(hunk) for hunk in pending]
+            left = iter(self._entities_by_text([left for left, _ in sides], self.template_cache))
+            right = iter(self._entities_by_text([right for _, right in sides]))
+        results = [result if result is not None else [next(left), next(right)] for result in results]
+        metrics.incr("ner_hunks_reused", len(hunks) - len(pending))
+        right_entities = [result[1] for result in results]
+        metrics.incr("entities_found", sum(len(values) for entities in right_entities for values in entities.values()))
+        return [result[0] for result in results], right_entities
+
+    @staticmethod
+    def entity_delta(left_entities: list[dict], right_entities: list[dict],
+                     labels: tuple[str, ...] = DELTA_LABELS) -> dict:
+        """Added, removed and changed entity values between template and contract hunks.
+
+        Context lines appear on both sides of a hunk and cancel out. Within a hunk, a
+        removed and an added value of the same label are reported as a change.
+        """
+        delta = {"added": {}, "removed": {}, "changed": {}}
+        for left, right in zip(left_entities, right_entities):
+            for label in labels:
+                left_counts = Counter(left.get(label, []))
+                right_counts = Counter(right.get(label, []))
+                removed = list((left_counts - right_counts).elements())
+                added = list((right_counts - left_counts).elements())
+                pairs = min(len(removed), len(added))
+                if pairs:
+                    delta["changed"].setdefault(label, []).extend(zip(removed[:pairs], added[:pairs]))
+                if removed[pairs:]:
+                    delta["removed"].setdefault(label, []).extend(removed[pairs:])
+                if added[pairs:]:
+                    delta["added"].setdefault(label, []).extend(added[pairs:])
+        return delta
+
+    @staticmethod
+    def merge_entities(entity_dicts: list[dict]) -> dict:
+        """Combine entity dicts, keeping each value once per label in first-seen order"""
+        merged = {}
+        seen: dict[str, set] = {}  # Same values as merged, for constant-time membership checks
+        for entities in entity_dicts:
+            for label, values in entities.items():
+                bucket = merged.setdefault(label, [])
+                known = seen.setdefault(label, set())
+                for value in values:
+                    if value not in known:
+                        known.add(value)
+                        bucket.append(value)
+        return merged
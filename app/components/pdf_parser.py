@@ -1,17 +1,191 @@
-import pdfplumber
+import hashlib
+import importlib.metadata
+import io
+import multiprocessing
+import os
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from .instrumentation import current_metrics
+from .lazy import lazy_import
+
+pdfplumber = lazy_import("pdfplumber")  # Imported on the first extraction, not at app start
+BACKENDS = ("pdfplumber", "pypdfium2")
+MIN_PAGES_PER_WORKER = 4  # Below this, process start-up costs more than it saves
+
+_pools_lock = threading.Lock()
+_pools: dict[int, ProcessPoolExecutor] = {}
+
+def get_shared_pool(workers: int) -> ProcessPoolExecutor:
+    """Process-wide extraction pool per worker count, so workers start once, not per document.
+
+    Workers are spawned: extraction runs on pipeline threads while job and LLM threads
+    may hold locks that a forked child would inherit.
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pools[workers] = pool
+        return pool
+
+def _discard_pool(workers: int, pool: ProcessPoolExecutor) -> None:
+    """Forget a broken pool so the next extraction starts a new one"""
+    with _pools_lock:
+        if _pools.get(workers) is pool:
+            del _pools[workers]
+
+def _open_source(source):
+    """pdfplumber and pypdfium2 accept paths and file objects; wrap raw bytes"""
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+def _iter_pdfplumber_pages(source, start: int = 0, stop: int | None = None) -> Iterator[str]:
+    with pdfplumber.open(_open_source(source)) as pdf:
+        for page in pdf.pages[start:stop]:
+            # extract_text() returns None for pages without a text layer
+            text = page.extract_text() or ""
+            page.close()
+            yield text
+
+def _load_pdfium():
+    try:
+        import pypdfium2
+    except ImportError as e:
+        raise ImportError("The pypdfium2 backend requires the pypdfium2 package") from e
+    return pypdfium2
+
+def _iter_pdfium_pages(source, start: int = 0, stop: int | None = None) -> Iterator[str]:
+    pdfium = _load_pdfium()
+    pdf = pdfium.PdfDocument(_open_source(source))
+    try:
+        for index in range(start, len(pdf) if stop is None else min(stop, len(pdf))):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            text = textpage.get_text_range()
+            textpage.close()
+            page.close()
+            # Match pdfplumber's output: "\n" line breaks, no trailing spaces
+            yield "\n".join(line.rstrip() for line in text.splitlines())
+    finally:
+        pdf.close()
+
+def _iter_backend_pages(source, backend: str, start: int = 0, stop: int | None = None) -> Iterator[str]:
+    if backend == "pypdfium2":
+        return _iter_pdfium_pages(source, start, stop)
+    return _iter_pdfplumber_pages(source, start, stop)
+
+def _extract_page_range(source, backend: str, start: int, stop: int) -> list[str]:
+    """Process pool worker: text of pages [start, stop)"""
+    return list(_iter_backend_pages(source, backend, start, stop))
+
+def _count_pages(source, backend: str) -> int:
+    if backend == "pypdfium2":
+        pdf = _load_pdfium().PdfDocument(_open_source(source))
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    with pdfplumber.open(_open_source(source)) as pdf:
+        return len(pdf.pages)
+
+def _read_bytes(pdf_file) -> bytes:
+    """Raw bytes of a path, bytes object or binary file object"""
+    if isinstance(pdf_file, (str, os.PathLike)):
+        with open(pdf_file, "rb") as f:
+            return f.read()
+    if isinstance(pdf_file, (bytes, bytearray)):
+        return bytes(pdf_file)
+    pdf_file.seek(0)
+    data = pdf_file.read()
+    pdf_file.seek(0)
+    return data
+
+def _backend_version(backend: str) -> str:
+    try:
+        return importlib.metadata.version(backend)
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
 
 class PDFParser:
-    def __init__(self):
+    def __init__(self, backend: str = "pdfplumber", workers: int = 1, cache=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown PDF backend '{backend}', expected one of {BACKENDS}")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.backend = backend
+        self.workers = workers
+        self.cache = cache  # Any object with get/set, e.g. components.cache.TieredCache
         self.text = ""
-        
+
+    @property
+    def extractor(self) -> str:
+        """Backend and backend version: different ones may extract different text from a PDF"""
+        return f"{self.backend}:{_backend_version(self.backend)}"
+
+    def cache_key(self, data: bytes) -> str:
+        """Cache key for extracted text: content hash plus backend and backend version"""
+        digest = hashlib.sha256(data).hexdigest()
+        return f"{self.extractor}:{digest}"
+
+    def iter_pages(self, pdf_file) -> Iterator[str]:
+        """Yield the text of each page lazily, one page in memory at a time"""
+        try:
+            yield from _iter_backend_pages(pdf_file, self.backend)
+        except Exception as e:
+            raise Exception(f"Error extracting text from PDF: {str(e)}")
+
+    def _extract_parallel(self, pdf_file) -> list[str]:
+        """Split page ranges across worker processes, returning page texts in order"""
+        if isinstance(pdf_file, (str, os.PathLike)):
+            source = os.fspath(pdf_file)
+        else:
+            source = _read_bytes(pdf_file)
+
+        page_count = _count_pages(source, self.backend)
+        workers = min(self.workers, page_count // MIN_PAGES_PER_WORKER)
+        if workers <= 1:
+            return list(_iter_backend_pages(source, self.backend))
+
+        step = -(-page_count // workers)
+        ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        pool = get_shared_pool(self.workers)
+        try:
+            futures = [pool.submit(_extract_page_range, source, self.backend, start, stop) for start, stop in ranges]
+            return [text for future in futures for text in future.result()]
+        except BrokenProcessPool:
+            _discard_pool(self.workers, pool)
+            raise
+
+    def page_count(self, pdf_file) -> int:
+        """Number of pages, without extracting any text"""
+        source = os.fspath(pdf_file) if isinstance(pdf_file, (str, os.PathLike)) else _read_bytes(pdf_file)
+        return _count_pages(source, self.backend)
+
     def extract_text(self, pdf_file):
         """Extract text from PDF file"""
+        metrics = current_metrics()
         try:
-            with pdfplumber.open(pdf_file) as pdf:
-                text = ""
-                for page in pdf.pages:
-                    text += page.extract_text() + "\n"
-                self.text = text.strip()
+            with metrics.stage("pdf_extract"):
+                key = None
+                if self.cache is not None:
+                    pdf_file = _read_bytes(pdf_file)
+                    key = self.cache_key(pdf_file)
+                    cached = self.cache.get(key)
+                    if cached is not None:
+                        metrics.incr("pdf_cache_hits")
+                        self.text = cached
+                        return self.text
+                    metrics.incr("pdf_cache_misses")
+
+                if self.workers > 1:
+                    pages = self._extract_parallel(pdf_file)
+                else:
+                    pages = list(_iter_backend_pages(pdf_file, self.backend))
+                metrics.incr("pages_parsed", len(pages))
+                self.text = "\n".join(pages).strip()
+                if key is not None:
+                    self.cache.set(key, self.text)
                 return self.text
         except Exception as e:
-            raise Exception(f"Error extracting text from PDF: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error extracting text from PDF: {str(e)}")
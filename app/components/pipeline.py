@@ -0,0 +1,245 @@
+# app/components/pipeline.py
+import hashlib
+import io
+from concurrent.futures import Future
+from .instrumentation import Metrics
+from .minhash import MinHash
+from .ner_extractor import NERExtractor
+from .pdf_parser import PDFParser
+from .revision_store import Revision
+from .scheduler import MAX_STAGE_WORKERS, StageScheduler
+from .streaming import DEFAULT_MEMORY_BUDGET_BYTES, StreamingAnalysis, iter_lines
+from .template_store import TemplateStore
+from .text_compare import TextComparer
+
+NER_BATCH_HUNKS = 16  # Hunks per NER batch; a chunk goes to the LLM once its hunks' batches are done
+
+def analysis_key(template_hash: str, contract_hash: str, contract_id: str = "", clause_diff: bool = True,
+                 profile: bool = False) -> str:
+    """Identity of an analysis: equal inputs give equal results, so they share one run"""
+    parts = [template_hash, contract_hash, contract_id, "clauses" if clause_diff else "lines", "profile" if profile else ""]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+class ContractPipeline:
+    """parse -> diff -> NER -> LLM for one contract against its template, without any UI.
+
+    The work is a DAG of stages (see schedule): both PDFs parse in parallel, and the clause
+    hunks, their NER and the LLM run alongside the full-document diff used for display.
+    NER publishes entities batch by batch, so LLM chunks start before it has finished.
+    Progress goes to an optional job (see JobRunner): each instrumented stage as it starts,
+    the MinHash similarity estimate, chunk findings as they complete and the summary as it streams.
+    Contracts of streaming_pages pages or more go through StreamingAnalysis instead, within
+    memory_budget_bytes: no side-by-side view, entity delta or revision tracking for those.
+    Without run_ner every hunk gets empty entities and there is no entity delta.
+    """
+
+    def __init__(self, template_store: TemplateStore, llm_analyzer, revision_store=None,
+                 pdf_backend: str = "pdfplumber", pdf_workers: int = 1, pdf_cache=None, clause_diff: bool = True,
+                 streaming_pages: int | None = None, memory_budget_bytes: int = DEFAULT_MEMORY_BUDGET_BYTES,
+                 run_ner: bool = True):
+        self.template_store = template_store
+        self.llm_analyzer = llm_analyzer
+        self.revision_store = revision_store
+        self.pdf_backend = pdf_backend
+        self.pdf_workers = pdf_workers
+        self.pdf_cache = pdf_cache
+        self.clause_diff = clause_diff
+        self.streaming_pages = streaming_pages
+        self.memory_budget_bytes = memory_budget_bytes
+        self.run_ner = run_ner
+
+    def run(self, contract_bytes: bytes, template_bytes: bytes | None = None, template_hash: str | None = None,
+            template_name: str | None = None, contract_id: str = "", job=None, profile: bool = False) -> dict:
+        """Analyze a contract against an uploaded template (bytes) or a stored one (hash)"""
+        metrics = Metrics(profile=profile, on_stage=job.enter_stage if job is not None else None)
+        with metrics.activate():
+            if self.streaming_pages and self._parser().page_count(contract_bytes) >= self.streaming_pages:
+                result = self.run_streaming(contract_bytes, template_bytes, template_hash, template_name, job)
+            else:
+                # Profiles are process-wide: stages run one at a time so each is measured alone
+                with self.schedule(contract_bytes, template_bytes, template_hash, template_name, contract_id, job,
+                                   serial=profile) as stages:
+                    result = stages.result("result")
+        result["metrics"] = metrics.report()
+        return result
+
+    def run_streaming(self, contract_bytes: bytes, template_bytes: bytes | None = None, template_hash: str | None = None,
+                      template_name: str | None = None, job=None) -> dict:
+        """Memory-bounded analysis: pages stream through the windowed diff, NER and LLM chunking.
+
+        An uploaded template is streamed too and not added to the template store, which
+        would keep its full text; a stored template's lines are already in memory.
+        """
+        if template_bytes is not None:
+            template_lines = iter_lines(self._parser().iter_pages(io.BytesIO(template_bytes)))
+        else:
+            template = self.template_store.get(template_hash)
+            if template is None:
+                raise ValueError("Stored template not found")
+            template_lines, template_name = template.lines, template.name
+        contract_lines = iter_lines(self._parser().iter_pages(io.BytesIO(contract_bytes)))
+        findings = []
+
+        def on_chunk(index: int, text: str) -> None:
+            finding = {"type": "chunk", "index": index, "total": None, "text": text, "reused": False}
+            findings.append(finding)
+            if job is not None:
+                job.add_finding(finding)
+
+        streamed = StreamingAnalysis(self.llm_analyzer, NERExtractor.shared(), self.memory_budget_bytes).run(
+            template_lines, contract_lines, on_chunk)
+        if job is not None:
+            job.append_text(streamed["analysis"])
+        return {
+            "template_name": template_name,
+            "estimate": None,
+            "similarity": streamed["similarity"],
+            "entities": streamed["entities"],
+            "entity_delta": None,
+            "findings": findings,
+            "analysis": streamed["analysis"],
+            "side_by_side": None,
+            "previous_revision": None,
+            "revision_changes": None,
+            "revision": None,
+            "cache_stats": self.llm_analyzer.cache.stats() if self.llm_analyzer.cache is not None else None,
+            "streaming": {key: streamed[key] for key in ("hunks", "lines", "window_lines", "memory_budget_bytes")},
+        }
+
+    def _parser(self) -> PDFParser:
+        # One parser per stage: PDFParser keeps the last extracted text on the instance
+        return PDFParser(backend=self.pdf_backend, workers=self.pdf_workers, cache=self.pdf_cache)
+
+    def schedule(self, contract_bytes: bytes, template_bytes: bytes | None = None, template_hash: str | None = None,
+                 template_name: str | None = None, contract_id: str = "", job=None, serial: bool = False,
+                 prepare_only: bool = False) -> StageScheduler:
+        """Start the stages and return the scheduler; every stage result is a future.
+
+        Stages: template, contract_text, previous, estimate, comparison, hunks, hunk_entities (a
+        future of contract-side entities per hunk key, resolved by entities batch by batch),
+        entities, revision_changes, analysis and result (the dict run() returns, without metrics).
+        Shut the scheduler down (or use it as a context manager) when done. serial runs
+        one stage at a time, e.g. for profiling. prepare_only stops before the LLM (no
+        analysis or result stage), for callers that analyze elsewhere, e.g. the batch runner.
+        """
+        ner_extractor = NERExtractor.shared() if self.run_ner else None
+        stages = StageScheduler(max_workers=1 if serial else MAX_STAGE_WORKERS)
+        contract_hash = TemplateStore.hash_bytes(contract_bytes)
+
+        def load_template():
+            # Template text and line hashes are computed once per template
+            if template_bytes is not None:
+                return self.template_store.get_or_create(template_bytes, self._parser(), name=template_name)
+            template = self.template_store.get(template_hash)
+            if template is None:
+                raise ValueError("Stored template not found")
+            return template
+
+        def estimate_similarity(template, edited_text):
+            estimate = template.minhash.jaccard(MinHash.from_text(edited_text))
+            if job is not None:
+                job.set_estimate(estimate)
+            return estimate
+
+        def extract_entities(hunks, previous, hunk_entities):
+            if ner_extractor is None:
+                for future in hunk_entities.values():
+                    future.set_result({})
+                return [{}] * len(hunks), [{}] * len(hunks), {}, None
+            known_entities = previous.hunk_entities if previous else None
+            template_hunk_entities, edited_hunk_entities = [], []
+            try:
+                for start in range(0, len(hunks), NER_BATCH_HUNKS):
+                    batch = hunks[start:start + NER_BATCH_HUNKS]
+                    left, right = ner_extractor.extract_hunk_entities(batch, known_entities)
+                    for hunk, entities in zip(batch, right):
+                        if not hunk_entities[hunk.key].done():
+                            hunk_entities[hunk.key].set_result(entities)
+                    template_hunk_entities.extend(left)
+                    edited_hunk_entities.extend(right)
+            except Exception as e:
+                for future in hunk_entities.values():
+                    if not future.done():
+                        future.set_exception(e)
+                raise
+            return (template_hunk_entities, edited_hunk_entities, ner_extractor.merge_entities(edited_hunk_entities),
+                    ner_extractor.entity_delta(template_hunk_entities, edited_hunk_entities))
+
+        def revision_changes(previous, edited_text):
+            if previous is None:
+                return None
+            return TextComparer.format_hunks(TextComparer.clause_hunks(previous.clause_index, edited_text))
+
+        def analyze(hunks, previous, hunk_entities, *_):
+            def entities_for(keys):
+                # Waits only for the NER batches holding this chunk's hunks
+                return NERExtractor.merge_entities([hunk_entities[key].result() for key in keys])
+
+            # Only changed hunks (with a little context) go to the LLM
+            events = self.llm_analyzer.stream_hunk_analysis(
+                [hunk.to_lines() for hunk in hunks], entities_for, previous.chunks if previous else None)
+            findings, done = [], None
+            for event in events:
+                if event["type"] == "chunk":
+                    findings.append(event)
+                    if job is not None:
+                        job.add_finding(event)
+                elif event["type"] == "token":
+                    if job is not None:
+                        job.append_text(event["text"])
+                else:
+                    done = event
+            return sorted(findings, key=lambda event: event["index"]), done
+
+        def assemble(template, edited_text, previous, estimate, comparison, hunks, entities, changes, analysis):
+            _, similarity, side_by_side = comparison
+            template_hunk_entities, edited_hunk_entities, merged_entities, entity_delta = entities
+            findings, done = analysis
+            revision = None
+            if self.revision_store is not None and contract_id:
+                revision = self.revision_store.add(contract_id, Revision(
+                    contract_hash, template.template_hash, edited_text,
+                    {hunk.key: [left, right] for hunk, left, right in zip(hunks, template_hunk_entities, edited_hunk_entities)},
+                    done["chunks"], done["text"], similarity,
+                ))
+            return {
+                "template_name": template.name,
+                "estimate": estimate,
+                "similarity": similarity,
+                "entities": merged_entities,
+                "entity_delta": entity_delta,
+                "findings": findings,
+                "analysis": done["text"],
+                "side_by_side": side_by_side,
+                "previous_revision": previous.number if previous else None,
+                "revision_changes": changes,
+                "revision": revision.number if revision else None,
+                "cache_stats": self.llm_analyzer.cache.stats() if self.llm_analyzer.cache is not None else None,
+            }
+
+        stages.add("template", load_template)
+        stages.add("contract_text", lambda: self._parser().extract_text(io.BytesIO(contract_bytes)))
+        stages.add("previous", lambda: self.revision_store.previous(contract_id, contract_hash)
+                   if self.revision_store is not None and contract_id else None)
+        # Cheap next to the exact diff, so the job shows an estimate long before the comparison
+        stages.add("estimate", estimate_similarity, ("template", "contract_text"))
+        # The Differ lines only feed line-mode hunks; clause mode needs just similarity and the view
+        stages.add("comparison", lambda template, edited_text: TextComparer.compare_with_template(
+            template, edited_text, with_diff=not self.clause_diff), ("template", "contract_text"))
+        if self.clause_diff:
+            # Only clauses whose wrapping-normalized text changed, matched across moves and renumbering;
+            # independent of the line diff, so NER and the LLM don't wait for it
+            stages.add("hunks", lambda template, edited_text: TextComparer.clause_hunks(template.clause_index, edited_text),
+                       ("template", "contract_text"))
+        else:
+            stages.add("hunks", lambda comparison: TextComparer.compact_diff(comparison[0]), ("comparison",))
+        stages.add("hunk_entities", lambda hunks: {hunk.key: Future() for hunk in hunks}, ("hunks",))
+        stages.add("entities", extract_entities, ("hunks", "previous", "hunk_entities"))
+        stages.add("revision_changes", revision_changes, ("previous", "contract_text"))
+        if prepare_only:
+            return stages
+        # Serially, analysis must not hold the only worker while waiting for hunk entities
+        stages.add("analysis", analyze, ("hunks", "previous", "hunk_entities") + (("entities",) if serial else ()))
+        stages.add("result", assemble, ("template", "contract_text", "previous", "estimate", "comparison", "hunks",
+                                        "entities", "revision_changes", "analysis"))
+        return stages
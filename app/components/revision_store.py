@@ -0,0 +1,125 @@
+# app/components/revision_store.py
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from .clause_index import ClauseIndex
+
+MAX_REVISIONS = 20  # Oldest revisions of a contract are dropped beyond this
+# "v2", "rev 3", "revision-4", "(1)", "draft", "final", "redline", "clean", "copy"
+VERSION_MARKER = re.compile(r"\b(?:v\d+|rev(?:ision)?\s*\d+|draft|final|redline|clean|copy)\b|\(\d+\)", re.IGNORECASE)
+
+def contract_identity(file_name: str) -> str:
+    """Default contract id from an upload name, ignoring version markers: "Lease v3 (final).pdf" -> "lease" """
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+    stem = VERSION_MARKER.sub(" ", stem.replace("_", " ").replace("-", " "))
+    return "_".join(re.findall(r"\w+", stem.lower()))
+
+def scoped_contract_id(workspace: str, contract_id: str) -> str:
+    """Revision-history key of a contract within a workspace; equal file names in other workspaces stay apart"""
+    return f"{workspace}/{contract_id}" if contract_id else ""
+
+class Revision:
+    """Artifacts of one analyzed revision of a contract, reused when the next revision arrives"""
+
+    def __init__(self, pdf_hash: str, template_hash: str, text: str, hunk_entities: dict | None = None,
+                 chunks: list[dict] | None = None, analysis: str = "", similarity: float | None = None,
+                 number: int = 0, created_at: float | None = None):
+        self.number = number  # 1-based, assigned by RevisionStore.add
+        self.pdf_hash = pdf_hash
+        self.template_hash = template_hash
+        self.text = text
+        self.hunk_entities = hunk_entities or {}  # Hunk key -> [template entities, contract entities]
+        self.chunks = chunks or []  # LLM chunk records: {"hunks": [hunk keys], "analysis"}
+        self.analysis = analysis
+        self.similarity = similarity
+        self.created_at = created_at if created_at is not None else time.time()
+        self._clause_index = None
+
+    @property
+    def clause_index(self) -> ClauseIndex:
+        if self._clause_index is None:
+            self._clause_index = ClauseIndex.from_text(self.text)
+        return self._clause_index
+
+    def to_dict(self) -> dict:
+        return {
+            "number": self.number,
+            "pdf_hash": self.pdf_hash,
+            "template_hash": self.template_hash,
+            "text": self.text,
+            "hunk_entities": self.hunk_entities,
+            "chunks": self.chunks,
+            "analysis": self.analysis,
+            "similarity": self.similarity,
+            "created_at": self.created_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Revision":
+        return cls(data["pdf_hash"], data["template_hash"], data["text"], data.get("hunk_entities"),
+                   data.get("chunks"), data.get("analysis", ""), data.get("similarity"),
+                   data.get("number", 0), data.get("created_at"))
+
+class RevisionStore:
+    """Revision history per contract id, one JSON file per contract.
+
+    Each revision keeps its text, per-hunk entities and per-chunk LLM analyses, so the
+    next revision of the same contract only re-extracts and re-analyzes what changed.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, root_dir: str, max_revisions: int = MAX_REVISIONS):
+        os.makedirs(root_dir, exist_ok=True)
+        self.root_dir = root_dir
+        self.max_revisions = max_revisions
+        self._lock = threading.Lock()
+
+    def _path(self, contract_id: str) -> str:
+        # Ids come from file names and user input; hash them into safe file names
+        digest = hashlib.sha256(contract_id.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.root_dir, f"{digest}.json")
+
+    def history(self, contract_id: str) -> list[Revision]:
+        """Stored revisions of the contract, oldest first"""
+        try:
+            with open(self._path(contract_id), encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+        if data.get("format_version") != self.FORMAT_VERSION or data.get("contract_id") != contract_id:
+            return []
+        return [Revision.from_dict(revision) for revision in data["revisions"]]
+
+    def latest(self, contract_id: str) -> Revision | None:
+        revisions = self.history(contract_id)
+        return revisions[-1] if revisions else None
+
+    def previous(self, contract_id: str, pdf_hash: str) -> Revision | None:
+        """Latest revision of a different PDF, so re-analyzing an upload compares it with the one before"""
+        revisions = [revision for revision in self.history(contract_id) if revision.pdf_hash != pdf_hash]
+        return revisions[-1] if revisions else None
+
+    def add(self, contract_id: str, revision: Revision) -> Revision:
+        """Append a revision and number it; re-uploading the latest PDF replaces that revision"""
+        with self._lock:
+            revisions = self.history(contract_id)
+            if revisions and revisions[-1].pdf_hash == revision.pdf_hash:
+                revision.number = revisions.pop().number
+            else:
+                revision.number = revisions[-1].number + 1 if revisions else 1
+            revisions = (revisions + [revision])[-self.max_revisions:]
+            data = {
+                "format_version": self.FORMAT_VERSION,
+                "contract_id": contract_id,
+                "revisions": [stored.to_dict() for stored in revisions],
+            }
+            path = self._path(contract_id)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        return revision
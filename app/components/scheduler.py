@@ -0,0 +1,82 @@
+# app/components/scheduler.py
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from .instrumentation import propagate
+
+MAX_STAGE_WORKERS = 4
+
+def _copy_outcome(source: Future, target: Future) -> None:
+    if source.cancelled():
+        # target is already RUNNING, where cancel() is a no-op; fail it so waiters wake up
+        target.set_exception(CancelledError())
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+class StageScheduler:
+    """A DAG of named stages on a thread pool; each stage starts once its dependencies finish.
+
+    add() returns the stage's Future right away, so callers can wait on (or attach
+    callbacks to) any intermediate result. A stage whose dependency failed fails with
+    the same exception without running. Stages run with the caller's active Metrics.
+    """
+
+    def __init__(self, max_workers: int = MAX_STAGE_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage")
+        self.futures: dict[str, Future] = {}
+
+    def add(self, name: str, func, deps: tuple[str, ...] | list[str] = ()) -> Future:
+        """Schedule func(*dependency results) under name; dependencies must be added first"""
+        if name in self.futures:
+            raise ValueError(f"stage {name!r} already added")
+        missing = [dep for dep in deps if dep not in self.futures]
+        if missing:
+            raise ValueError(f"stage {name!r} depends on unknown stages {missing}")
+        future = Future()
+        future.set_running_or_notify_cancel()
+        self.futures[name] = future
+        run = propagate(func)
+        dep_futures = [self.futures[dep] for dep in deps]
+        remaining = [len(dep_futures)]
+        lock = threading.Lock()
+
+        def start() -> None:
+            for dep in dep_futures:
+                if dep.cancelled() or dep.exception() is not None:
+                    _copy_outcome(dep, future)
+                    return
+            try:
+                inner = self._executor.submit(run, *[dep.result() for dep in dep_futures])
+            except RuntimeError as e:  # Scheduler already shut down
+                future.set_exception(e)
+                return
+            inner.add_done_callback(lambda inner: _copy_outcome(inner, future))
+
+        def dep_done(_: Future) -> None:
+            with lock:
+                remaining[0] -= 1
+                ready = remaining[0] == 0
+            if ready:
+                start()
+
+        if not dep_futures:
+            start()
+        for dep in dep_futures:
+            dep.add_done_callback(dep_done)
+        return future
+
+    def __getitem__(self, name: str) -> Future:
+        return self.futures[name]
+
+    def result(self, name: str, timeout: float | None = None):
+        return self.futures[name].result(timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def __enter__(self) -> "StageScheduler":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
@@ -0,0 +1,85 @@
+# app/components/streaming.py
+from collections.abc import Iterable
+from .instrumentation import current_metrics
+from .text_compare import DIFF_CONTEXT_LINES, WindowedComparer
+
+DEFAULT_MEMORY_BUDGET_BYTES = 256 * 2**20
+# Working set outside the diff window: parser page state, NER model inputs, in-flight prompts
+FIXED_OVERHEAD_BYTES = 96 * 2**20
+# Per window line and side: the line and its lookahead line, hashes and interned ids,
+# alignment and Differ lines, and WindowedComparer's recovery hashes
+BYTES_PER_WINDOW_LINE = 4096
+MIN_WINDOW_LINES = 100
+MAX_WINDOW_LINES = 20_000
+MAX_ENTITY_VALUES = 50  # Entity values reported per label; prompts get each chunk's own entities
+
+def window_for_budget(memory_budget_bytes: int) -> int:
+    """Diff window (lines per side) whose working set fits the memory budget"""
+    lines = (memory_budget_bytes - FIXED_OVERHEAD_BYTES) // (2 * BYTES_PER_WINDOW_LINE)
+    if lines < MIN_WINDOW_LINES:
+        minimum = FIXED_OVERHEAD_BYTES + 2 * BYTES_PER_WINDOW_LINE * MIN_WINDOW_LINES
+        raise ValueError(f"memory budget must be at least {minimum // 2**20} MiB")
+    return min(lines, MAX_WINDOW_LINES)
+
+def iter_lines(pages: Iterable[str]) -> Iterable[str]:
+    """Lines of a page stream, e.g. PDFParser.iter_pages(), without joining the pages"""
+    for page in pages:
+        yield from page.splitlines()
+
+class StreamingAnalysis:
+    """Memory-bounded comparison for very large contracts.
+
+    Page text flows into a WindowedComparer, its hunks through NER one LLM chunk at a
+    time, and chunks to the analyzer as they fill up. Neither document, the full diff,
+    a side-by-side view nor a document-wide prompt is ever built, so peak memory follows
+    the window size (derived from memory_budget_bytes), not the page count.
+    """
+
+    def __init__(self, llm_analyzer, ner_extractor=None, memory_budget_bytes: int = DEFAULT_MEMORY_BUDGET_BYTES,
+                 context: int = DIFF_CONTEXT_LINES):
+        self.llm_analyzer = llm_analyzer
+        self.ner_extractor = ner_extractor
+        self.memory_budget_bytes = memory_budget_bytes
+        self.window_lines = window_for_budget(memory_budget_bytes)
+        self.context = context
+
+    def run(self, template_lines: Iterable[str], contract_lines: Iterable[str], on_chunk=None) -> dict:
+        """Compare and analyze two line streams; on_chunk(index, analysis) reports chunk findings"""
+        comparer = WindowedComparer(self.window_lines, self.context)
+        entities: dict[str, list] = {}
+        seen: dict[str, set] = {}  # Same values as entities, for constant-time membership checks
+        hunk_count = [0]
+
+        def count(hunks):
+            for hunk in hunks:
+                hunk_count[0] += 1
+                yield hunk
+
+        def entities_for(chunk_hunks: list) -> dict:
+            if self.ner_extractor is None:
+                return {}
+            _, contract_entities = self.ner_extractor.extract_hunk_entities(chunk_hunks)
+            chunk_entities = self.ner_extractor.merge_entities(contract_entities)
+            for label, values in chunk_entities.items():
+                bucket = entities.setdefault(label, [])
+                known = seen.setdefault(label, set())
+                for value in values:
+                    if len(bucket) >= MAX_ENTITY_VALUES:
+                        break
+                    if value not in known:
+                        known.add(value)
+                        bucket.append(value)
+            return chunk_entities
+
+        hunks = count(comparer.iter_hunks(template_lines, contract_lines))
+        analysis = self.llm_analyzer.analyze_hunk_stream(hunks, entities_for, on_chunk)
+        current_metrics().incr("stream_hunks", hunk_count[0])
+        return {
+            "similarity": comparer.similarity,
+            "entities": entities,
+            "analysis": analysis,
+            "hunks": hunk_count[0],
+            "lines": (comparer.left_lines, comparer.right_lines),
+            "window_lines": self.window_lines,
+            "memory_budget_bytes": self.memory_budget_bytes,
+        }
@@ -0,0 +1,216 @@
+# app/components/template_store.py
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from .clause_index import ClauseIndex
+from .diff_engine import line_hash
+from .minhash import LSHIndex, MinHash
+
+class TemplateFingerprint:
+    """Precomputed artifacts of one template: text, per-line hashes and MinHash sketch.
+
+    extractor is the PDF backend and version the text was extracted with (PDFParser.extractor).
+    """
+
+    def __init__(self, template_hash: str, text: str, line_hashes: list[int] | None = None,
+                 minhash: MinHash | None = None, name: str | None = None, extractor: str | None = None):
+        self.template_hash = template_hash
+        self.text = text
+        self.lines = text.splitlines()
+        self.line_hashes = line_hashes if line_hashes is not None else [line_hash(line) for line in self.lines]
+        self.minhash = minhash if minhash is not None else MinHash.from_text(text)
+        self.name = name  # Uploaded file name, shown when suggesting templates
+        self.extractor = extractor
+        self._clause_index = None
+
+    @property
+    def clause_index(self) -> ClauseIndex:
+        """Clause segmentation of the template, built on first use and kept in memory"""
+        if self._clause_index is None:
+            self._clause_index = ClauseIndex.from_text(self.text)
+        return self._clause_index
+
+    def to_dict(self) -> dict:
+        return {
+            "template_hash": self.template_hash,
+            "text": self.text,
+            "line_hashes": self.line_hashes,
+            "minhash": self.minhash.to_list(),
+            "name": self.name,
+            "extractor": self.extractor,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TemplateFingerprint":
+        minhash = MinHash.from_list(data["minhash"]) if data.get("minhash") else None
+        return cls(data["template_hash"], data["text"], data["line_hashes"], minhash, data.get("name"),
+                   data.get("extractor"))
+
+class TemplateStore:
+    """Persists template fingerprints on disk, keyed by template_key (PDF bytes plus extractor).
+
+    An LSH index over the fingerprints' MinHash sketches, built on first lookup, finds the
+    stored templates most similar to a contract without diffing against each of them.
+    Up to max_in_memory fingerprints are kept in memory, least recently used evicted first.
+    Without root_dir nothing is persisted: only those in-memory fingerprints are kept.
+    Each stored template also gets a small sketch file (MinHash and extractor), so building
+    the index does not parse every template's full text.
+    """
+
+    FORMAT_VERSION = 2
+
+    def __init__(self, root_dir: str | None, max_in_memory: int = 32):
+        if max_in_memory < 1:
+            raise ValueError("max_in_memory must be at least 1")
+        if root_dir is not None:
+            os.makedirs(root_dir, exist_ok=True)
+        self.root_dir = root_dir
+        self.max_in_memory = max_in_memory
+        self._memory: OrderedDict[str, TemplateFingerprint] = OrderedDict()
+        self._lock = threading.Lock()
+        self._index: LSHIndex | None = None
+        self._extractors: dict[str, str | None] = {}  # Template hash -> extractor, for indexed templates
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def template_key(pdf_bytes: bytes, pdf_parser) -> str:
+        """Store key of a template PDF as pdf_parser extracts it; another backend or version gets its own"""
+        return hashlib.sha256(pdf_parser.cache_key(pdf_bytes).encode("utf-8")).hexdigest()
+
+    def _remember(self, fingerprint: TemplateFingerprint) -> None:
+        # Caller holds self._lock
+        self._memory[fingerprint.template_hash] = fingerprint
+        self._memory.move_to_end(fingerprint.template_hash)
+        while len(self._memory) > self.max_in_memory:
+            self._memory.popitem(last=False)
+
+    def _path(self, template_hash: str) -> str:
+        return os.path.join(self.root_dir, f"{template_hash}.json")
+
+    def _sketch_path(self, template_hash: str) -> str:
+        return os.path.join(self.root_dir, f"{template_hash}.sketch")
+
+    @staticmethod
+    def _write_json(path: str, data: dict) -> None:
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def _read_sketch(self, template_hash: str) -> tuple[MinHash, str | None] | None:
+        """MinHash and extractor of a stored template; stores written before sketch files fall back to the full file"""
+        for path in (self._sketch_path(template_hash), self._path(template_hash)):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                continue
+            except (OSError, json.JSONDecodeError):
+                return None
+            if data.get("format_version") != self.FORMAT_VERSION:
+                return None
+            minhash = MinHash.from_list(data["minhash"]) if data.get("minhash") else MinHash.from_text(data["text"])
+            return minhash, data.get("extractor")
+        return None
+
+    def get(self, template_hash: str) -> TemplateFingerprint | None:
+        """Return the stored fingerprint, or None if the template has not been seen"""
+        with self._lock:
+            if template_hash in self._memory:
+                self._memory.move_to_end(template_hash)
+                return self._memory[template_hash]
+        if self.root_dir is None:
+            return None
+        try:
+            with open(self._path(template_hash), encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if data.get("format_version") != self.FORMAT_VERSION:
+            return None
+        fingerprint = TemplateFingerprint.from_dict(data)
+        with self._lock:
+            self._remember(fingerprint)
+        return fingerprint
+
+    def put(self, fingerprint: TemplateFingerprint) -> None:
+        """Persist a fingerprint, replacing any previous one for the same template"""
+        if self.root_dir is not None:
+            data = fingerprint.to_dict()
+            data["format_version"] = self.FORMAT_VERSION
+            self._write_json(self._path(fingerprint.template_hash), data)
+            self._write_json(self._sketch_path(fingerprint.template_hash), {
+                "format_version": self.FORMAT_VERSION,
+                "minhash": data["minhash"],
+                "extractor": fingerprint.extractor,
+            })
+        with self._lock:
+            self._remember(fingerprint)
+            if self._index is not None:
+                self._index.add(fingerprint.template_hash, fingerprint.minhash)
+                self._extractors[fingerprint.template_hash] = fingerprint.extractor
+
+    def _similarity_index(self) -> LSHIndex:
+        with self._lock:
+            if self._index is not None:
+                return self._index
+            index = LSHIndex()
+            if self.root_dir is None:
+                for template_hash, fingerprint in self._memory.items():
+                    index.add(template_hash, fingerprint.minhash)
+                    self._extractors[template_hash] = fingerprint.extractor
+                self._index = index
+                return index
+            for file_name in os.listdir(self.root_dir):
+                if not file_name.endswith(".json"):
+                    continue
+                template_hash = file_name[:-len(".json")]
+                fingerprint = self._memory.get(template_hash)
+                if fingerprint is not None:
+                    index.add(template_hash, fingerprint.minhash)
+                    self._extractors[template_hash] = fingerprint.extractor
+                    continue
+                # Full fingerprints load on demand through get()
+                sketch = self._read_sketch(template_hash)
+                if sketch is None:
+                    continue
+                index.add(template_hash, sketch[0])
+                self._extractors[template_hash] = sketch[1]
+            self._index = index
+            return index
+
+    def find_similar(self, text_or_minhash: str | MinHash, k: int = 5, min_similarity: float = 0.1,
+                     extractor: str | None = None) -> list[tuple[TemplateFingerprint, float]]:
+        """Stored templates most similar to a contract, with estimated (MinHash) Jaccard similarity.
+
+        With extractor, only templates extracted the same way are returned, so their text
+        is comparable with the contract's.
+        """
+        minhash = text_or_minhash if isinstance(text_or_minhash, MinHash) else MinHash.from_text(text_or_minhash)
+        index = self._similarity_index()
+        # Filtered inside the query, so templates from other extractors don't use up the k slots
+        where = None if extractor is None else lambda template_hash: self._extractors.get(template_hash) == extractor
+        results = []
+        for template_hash, score in index.query(minhash, k, min_similarity, where):
+            fingerprint = self.get(template_hash)
+            if fingerprint is not None:
+                results.append((fingerprint, score))
+        return results
+
+    def get_or_create(self, pdf_bytes: bytes, pdf_parser, name: str | None = None) -> TemplateFingerprint:
+        """Return the template's fingerprint, parsing the PDF only on first use with this extractor"""
+        template_hash = self.template_key(pdf_bytes, pdf_parser)
+        fingerprint = self.get(template_hash)
+        if fingerprint is not None:
+            return fingerprint
+
+        text = pdf_parser.extract_text(io.BytesIO(pdf_bytes))
+        fingerprint = TemplateFingerprint(template_hash, text, name=name, extractor=pdf_parser.extractor)
+        self.put(fingerprint)
+        return fingerprint
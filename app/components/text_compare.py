@@ -1,46 +1,325 @@
-import difflib
+import hashlib
+import re
+from collections.abc import Iterable, Iterator
+from .clause_index import ClauseIndex, match_clauses
+from .diff_engine import LineDiff, SideBySide
+from .instrumentation import current_metrics
+from .template_store import TemplateFingerprint
+
+DIFF_CONTEXT_LINES = 2  # Unchanged lines kept around each change in compact hunks
+CLAUSE_CONTEXT_SENTENCES = 1  # Unchanged sentences kept around each change inside a clause
+DEFAULT_WINDOW_LINES = 2000  # Lines per side aligned at once by WindowedComparer
+RECOVERY_WINDOWS = 16  # Windows of unanchored changes WindowedComparer can still realign after
+
+_LINE_HEADER = re.compile(r"^([ \t]*)@@ -\d+,\d+ \+\d+,\d+ @@$", re.MULTILINE)
+
+def strip_line_numbers(text: str) -> str:
+    """Text with line-number hunk headers reduced to "@@ @@"; labeled headers are kept"""
+    return _LINE_HEADER.sub(r"\1@@ @@", text)
+
+def hunk_key(lines: list[str]) -> str:
+    """Content address of a formatted hunk, stable across runs and revisions.
+
+    Line numbers are left out: an edit further up shifts them without changing the hunk.
+    """
+    return hashlib.sha256(strip_line_numbers("\n".join(lines)).encode("utf-8")).hexdigest()
+
+class DiffHunk:
+    """A run of changed lines plus limited context, with 1-based line numbers on both sides.
+
+    A labeled hunk (e.g. one clause) uses the label as its header instead of line numbers.
+    """
+
+    def __init__(self, left_start: int, right_start: int, label: str | None = None):
+        self.left_start = left_start
+        self.right_start = right_start
+        self.label = label
+        self.left_count = 0
+        self.right_count = 0
+        self.lines: list[str] = []
+
+    def add(self, line: str) -> None:
+        """Append a Differ-style line ("  ", "- " or "+ " prefixed)"""
+        if line[:2] != '+ ':
+            self.left_count += 1
+        if line[:2] != '- ':
+            self.right_count += 1
+        self.lines.append(line)
+
+    @property
+    def header(self) -> str:
+        if self.label is not None:
+            return f"@@ {self.label} @@"
+        return f"@@ -{self.left_start},{self.left_count} +{self.right_start},{self.right_count} @@"
+
+    def to_lines(self) -> list[str]:
+        return [self.header] + self.lines
+
+    @property
+    def key(self) -> str:
+        return hunk_key(self.to_lines())
+
+    def __repr__(self) -> str:
+        return f"DiffHunk({self.header!r}, {len(self.lines)} lines)"
+
+def _fill(buffer: list[str], lines: Iterator[str], size: int) -> bool:
+    """Top buffer up to size lines; True once the iterator is exhausted"""
+    while len(buffer) < size:
+        line = next(lines, None)
+        if line is None:
+            return True
+        buffer.append(line)
+    return False
+
+class WindowedComparer:
+    """Diffs two line streams a window at a time, emitting hunks as soon as they are settled.
+
+    Each window of up to window_lines lines per side is aligned, and everything up to its
+    last unchanged block long enough to separate two hunks is committed; the rest is
+    carried into the next window. A window without such a block (a change larger than the
+    window) reads up to window_lines more lines per side and realigns on the nearest run
+    of matching lines, so blocks inserted or removed within that lookahead are reported
+    exactly. Failing that, both windows are committed as changed and their line hashes
+    remembered: when the side that fell behind reaches lines already committed on the
+    other side, it is caught up and alignment resumes. Such a block is over-reported (the
+    lines skipped on the other side show as removed and added again); only blocks longer
+    than RECOVERY_WINDOWS windows leave the rest of the streams misaligned.
+    """
+
+    def __init__(self, window_lines: int = DEFAULT_WINDOW_LINES, context: int = DIFF_CONTEXT_LINES):
+        if window_lines < 1:
+            raise ValueError("window_lines must be at least 1")
+        self.window_lines = window_lines
+        self.context = context
+        self.matched = 0.0
+        self.total = 0
+        self.left_lines = 0  # Lines committed so far on each side
+        self.right_lines = 0
+        self._run = 2 * context + 1  # Unchanged lines that keep two hunks apart
+        self._tail: list[str] = []  # Last committed unchanged lines, context for the next window
+        self._emitted = 0  # Left lines up to which hunks have been emitted
+        # Hashes of lines committed as changed without an anchor, oldest first
+        self._dropped_left: dict[int, None] = {}
+        self._dropped_right: dict[int, None] = {}
+
+    @property
+    def similarity(self) -> float:
+        """Similarity of everything compared so far, as LineDiff.similarity() would report it"""
+        return min(self.matched / self.total, 1.0) if self.total else 1.0
+
+    def _commit(self, line_diff: LineDiff, opcodes: list) -> list[DiffHunk]:
+        matched, total = line_diff.weights(opcodes)
+        self.matched += matched
+        self.total += total
+        hunks = TextComparer.compact_diff(line_diff.differ_lines(opcodes), self.context)
+        # Tail lines not yet part of an emitted hunk
+        available = min(len(self._tail), self.left_lines - self._emitted)
+        if hunks and hunks[0].left_start == 1 and hunks[0].right_start == 1 and available > 0:
+            # A change at the window start: take its leading context from the previous window
+            first = hunks[0]
+            leading = next((index for index, line in enumerate(first.lines) if line[:2] != '  '), 0)
+            missing = self._tail[len(self._tail) - min(self.context - leading, available):]
+            if leading < self.context and missing:
+                first.lines[:0] = ['  ' + line for line in missing]
+                first.left_count += len(missing)
+                first.right_count += len(missing)
+                first.left_start -= len(missing)
+                first.right_start -= len(missing)
+        for hunk in hunks:
+            hunk.left_start += self.left_lines
+            hunk.right_start += self.right_lines
+        if hunks:
+            self._emitted = hunks[-1].left_start + hunks[-1].left_count - 1
+        if opcodes:
+            tag, i1, i2, _, _ = opcodes[-1]
+            self._tail = line_diff.left_lines[max(i1, i2 - self.context):i2] if tag == 'equal' else []
+            self.left_lines += i2
+            self.right_lines += opcodes[-1][4]
+        return hunks
+
+    def _settled(self, opcodes: list) -> int:
+        """Number of opcodes up to the last unchanged block that separates hunks; 0 if none"""
+        return next((index + 1 for index in range(len(opcodes) - 1, -1, -1)
+                     if opcodes[index][0] == 'equal' and opcodes[index][2] - opcodes[index][1] >= self._run), 0)
+
+    def _anchor(self, left: list[str], right: list[str]) -> tuple[int, int] | None:
+        """(i, j) of the first run of matching lines, scanning the left buffer in order"""
+        positions: dict[str, int] = {}
+        for j in range(len(right) - self._run + 1):
+            positions.setdefault(right[j], j)
+        for i in range(len(left) - self._run + 1):
+            j = positions.get(left[i])
+            if j is not None and left[i:i + self._run] == right[j:j + self._run]:
+                return i, j
+        return None
+
+    def _remember(self, dropped: dict[int, None], lines: list[str]) -> None:
+        for line in lines:
+            dropped[hash(line)] = None
+        while len(dropped) > RECOVERY_WINDOWS * self.window_lines:
+            del dropped[next(iter(dropped))]
+
+    @staticmethod
+    def _behind(lines: list[str], dropped: dict[int, None]) -> int:
+        """Leading lines already committed as changed on the other side"""
+        return next((index for index, line in enumerate(lines) if hash(line) not in dropped), len(lines))
+
+    def _realign(self, left: list[str], right: list[str]) -> LineDiff:
+        """Alignment to commit when a window has no settled prefix; it consumes at least one line"""
+        anchor = self._anchor(left, right)
+        if anchor is not None:
+            self._dropped_left.clear()
+            self._dropped_right.clear()
+            i, j = anchor
+            return LineDiff(left[:i + self._run], right[:j + self._run])
+        behind = self._behind(right, self._dropped_left)
+        if behind:
+            return LineDiff([], right[:behind])
+        behind = self._behind(left, self._dropped_right)
+        if behind:
+            return LineDiff(left[:behind], [])
+        current_metrics().incr("window_forced_commits")
+        self._remember(self._dropped_left, left[:self.window_lines])
+        self._remember(self._dropped_right, right[:self.window_lines])
+        return LineDiff(left[:self.window_lines], right[:self.window_lines])
+
+    def iter_hunks(self, left_lines: Iterable[str], right_lines: Iterable[str]) -> Iterator[DiffHunk]:
+        metrics = current_metrics()
+        left_iter, right_iter = iter(left_lines), iter(right_lines)
+        left, right = [], []
+        left_done = right_done = False
+        window = self.window_lines
+        while True:
+            left_done = _fill(left, left_iter, window) or left_done
+            right_done = _fill(right, right_iter, window) or right_done
+            if not left and not right:
+                return
+            with metrics.stage("diff"):
+                line_diff = LineDiff(left[:window], right[:window])
+                opcodes = line_diff.opcodes
+                if left_done and right_done and len(left) <= window and len(right) <= window:
+                    cut = len(opcodes)
+                else:
+                    # Stop after the last unchanged block that separates hunks: a change at
+                    # the window edge may continue in lines not read yet
+                    cut = self._settled(opcodes)
+                if cut:
+                    self._dropped_left.clear()
+                    self._dropped_right.clear()
+                else:
+                    # A change larger than the window: look ahead for where the sides meet again
+                    left_done = _fill(left, left_iter, 2 * window) or left_done
+                    right_done = _fill(right, right_iter, 2 * window) or right_done
+                    line_diff = self._realign(left, right)
+                    opcodes = line_diff.opcodes
+                    cut = len(opcodes)
+                    metrics.incr("window_realignments")
+                hunks = self._commit(line_diff, opcodes[:cut])
+                metrics.incr("window_diffs")
+                del left[:opcodes[cut - 1][2]]
+                del right[:opcodes[cut - 1][4]]
+            yield from hunks
 
 class TextComparer:
     @staticmethod
-    def compare_texts(text1: str, text2: str) -> tuple[list[str], float, dict[str, list[str]]]:
-        """Compare two texts and return differences, similarity ratio and side-by-side view"""
-        # Original diff
-        d = difflib.Differ()
-        diff = list(d.compare(text1.splitlines(), text2.splitlines()))
-        
-        # Calculate similarity ratio
-        similarity = difflib.SequenceMatcher(None, text1, text2).ratio()
-        
-        # Generate side by side view
-        d = difflib.HtmlDiff()
-        side_by_side = {
-            'left': [],
-            'right': []
-        }
-        
-        left_lines = text1.splitlines()
-        right_lines = text2.splitlines()
-        matcher = difflib.SequenceMatcher(None, left_lines, right_lines)
-        
-        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-            if tag == 'equal':
-                for i in range(i1, i2):
-                    side_by_side['left'].append(('equal', left_lines[i]))
-                    side_by_side['right'].append(('equal', right_lines[j1 + (i - i1)]))
-                    
-            elif tag == 'replace':
-                for i, j in zip(range(i1, i2), range(j1, j2)):
-                    if i < len(left_lines):
-                        side_by_side['left'].append(('delete', left_lines[i]))
-                    if j < len(right_lines):
-                        side_by_side['right'].append(('insert', right_lines[j]))
-                        
-            elif tag == 'delete':
-                for i in range(i1, i2):
-                    side_by_side['left'].append(('delete', left_lines[i]))
-                    
-            elif tag == 'insert':
-                for j in range(j1, j2):
-                    side_by_side['right'].append(('insert', right_lines[j]))
-        
-        return diff, similarity, side_by_side
\ No newline at end of file
+    def compact_diff(diff: list[str], context: int = DIFF_CONTEXT_LINES) -> list[DiffHunk]:
+        """Reduce Differ output to hunks of changed lines with `context` unchanged lines around them"""
+        entries = []  # (line, left line number, right line number)
+        left_no = right_no = 1
+        for line in diff:
+            prefix = line[:2]
+            if prefix == '? ':
+                continue
+            entries.append((line, left_no, right_no))
+            if prefix != '+ ':
+                left_no += 1
+            if prefix != '- ':
+                right_no += 1
+
+        changed = [i for i, (line, _, _) in enumerate(entries) if line[:2] in ('- ', '+ ')]
+        hunks = []
+        end = -1
+        for i in changed:
+            start = max(i - context, 0)
+            if hunks and start <= end:
+                hunk = hunks[-1]
+            else:
+                _, left, right = entries[start]
+                hunk = DiffHunk(left, right)
+                hunks.append(hunk)
+                end = start
+            stop = min(i + context + 1, len(entries))
+            for line, _, _ in entries[max(end, start):stop]:
+                hunk.add(line)
+            end = max(end, stop)
+        return hunks
+
+    @staticmethod
+    def clause_hunks(old: str | ClauseIndex, new: str | ClauseIndex,
+                     context: int = CLAUSE_CONTEXT_SENTENCES) -> list[DiffHunk]:
+        """Hunks for clauses that really changed, matched across versions by the clause index.
+
+        Re-wrapped, renumbered and moved-but-identical clauses produce no sentence lines;
+        modified clauses are diffed sentence by sentence. Moved clauses get a header-only
+        hunk so the move is still reported.
+        """
+        metrics = current_metrics()
+        with metrics.stage("clause_diff"):
+            old_index = old if isinstance(old, ClauseIndex) else ClauseIndex.from_text(old)
+            new_index = new if isinstance(new, ClauseIndex) else ClauseIndex.from_text(new)
+            changes = match_clauses(old_index, new_index)
+            hunks = []
+            for change in changes:
+                old_sentences = change.old.sentences() if change.old is not None else []
+                new_sentences = change.new.sentences() if change.new is not None else []
+                start = (change.old or change.new).start_line + 1
+                hunk = DiffHunk(start, (change.new or change.old).start_line + 1, label=change.label)
+                if change.kind == "modified":
+                    diff = LineDiff(old_sentences, new_sentences).differ_lines()
+                    for sentence_hunk in TextComparer.compact_diff(diff, context):
+                        for line in sentence_hunk.lines:
+                            hunk.add(line)
+                elif change.kind == "removed":
+                    for sentence in old_sentences:
+                        hunk.add('- ' + sentence)
+                elif change.kind == "added":
+                    for sentence in new_sentences:
+                        hunk.add('+ ' + sentence)
+                elif not change.moved:
+                    continue
+                hunks.append(hunk)
+        metrics.incr("clauses_compared", len(changes))
+        metrics.incr("clauses_changed", len(hunks))
+        return hunks
+
+    @staticmethod
+    def format_hunks(hunks: list[DiffHunk]) -> list[str]:
+        """Flatten hunks into header-delimited lines for the LLM"""
+        return [line for hunk in hunks for line in hunk.to_lines()]
+
+    @staticmethod
+    def compare_texts(text1: str, text2: str, with_diff: bool = True) -> tuple[list[str] | None, float, SideBySide]:
+        """Compare two texts and return differences, similarity ratio and side-by-side view.
+
+        All three results come from one line alignment computed by the diff engine. The
+        side-by-side view references the split lines instead of copying them; index it
+        with 'left' / 'right' for (tag, line) lists. Differences are None without with_diff,
+        e.g. when clause hunks replace the line diff.
+        """
+        metrics = current_metrics()
+        with metrics.stage("diff"):
+            line_diff = LineDiff(text1.splitlines(), text2.splitlines())
+            metrics.incr("lines_diffed", len(line_diff.left_lines) + len(line_diff.right_lines))
+            differences = line_diff.differ_lines() if with_diff else None
+            return differences, line_diff.similarity(), line_diff.side_by_side()
+
+    @staticmethod
+    def compare_with_template(fingerprint: TemplateFingerprint, text: str,
+                              with_diff: bool = True) -> tuple[list[str] | None, float, SideBySide]:
+        """Like compare_texts, reusing the template's stored lines and line hashes"""
+        metrics = current_metrics()
+        with metrics.stage("diff"):
+            line_diff = LineDiff(fingerprint.lines, text.splitlines(), left_hashes=fingerprint.line_hashes)
+            metrics.incr("lines_diffed", len(line_diff.left_lines) + len(line_diff.right_lines))
+            differences = line_diff.differ_lines() if with_diff else None
+            return differences, line_diff.similarity(), line_diff.side_by_side()
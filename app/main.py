@@ -1,78 +1,331 @@
+import os
+import time
+import uuid
+_import_started = time.perf_counter()
 import streamlit as st
-import pandas as pd
-from components.pdf_parser import PDFParser
-from components.text_compare import TextComparer
+from components.cache import DiskCache, MemoryCache, TieredCache
+from components.comparison_view import DEFAULT_CONTEXT_LINES, ComparisonView
+from components.job_runner import Job, JobRunner
+from components.lazy import import_report, lazy_import, record_timing, warm_up
 from components.ner_extractor import NERExtractor
-from components.llm_analyzer import LLMAnalyzer
+from components.pdf_parser import PDFParser
+from components.pipeline import ContractPipeline, analysis_key
+from components.revision_store import RevisionStore, contract_identity, scoped_contract_id
+from components.template_store import TemplateStore
 from utils.helpers import validate_file_type
 
+# Heavy modules load on first use (or during warm-up), not on the first screen
+pd = lazy_import("pandas")
+http_client = lazy_import("components.http_client")  # httpx
+llm_analyzer = lazy_import("components.llm_analyzer")  # groq
+STARTUP_IMPORT_SECONDS = time.perf_counter() - _import_started
+record_timing("main (eager imports)", STARTUP_IMPORT_SECONDS)
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_responses.sqlite"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", DiskCache.DEFAULT_MAX_BYTES))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "0") == "1"  # Needs the h2 package; ignored without it
+# Account-level Groq limits shared by every session of this server ("" means unlimited)
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "") or 0) or None
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "") or 0) or None
+
+PDF_BACKEND = os.getenv("PDF_BACKEND", "pdfplumber")
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "1"))
+
+PDF_CACHE_ENTRIES = int(os.getenv("PDF_CACHE_ENTRIES", "64"))
+PDF_CACHE_PATH = os.getenv("PDF_CACHE_PATH", os.path.join(".cache", "pdf_text.sqlite"))  # "" disables the disk tier
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", DiskCache.DEFAULT_MAX_BYTES))
+
+TEMPLATE_STORE_DIR = os.getenv("TEMPLATE_STORE_DIR", os.path.join(".cache", "templates"))
+REVISION_STORE_DIR = os.getenv("REVISION_STORE_DIR", os.path.join(".cache", "revisions"))
+CLAUSE_DIFF = os.getenv("CLAUSE_DIFF", "1") == "1"  # "0" sends line hunks to NER and the LLM instead
+
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))  # Analyses running at once, across all sessions
+MAX_SESSION_ANALYSES = 10  # Completed results kept per browser session
+PROGRESS_POLL_SECONDS = 1.0
+PIPELINE_STAGES = ["pdf_extract", "diff", "clause_diff", "ner", "llm_analysis"]
+
+# Contracts with at least this many pages use the memory-bounded streaming mode ("0" disables it)
+STREAMING_MODE_PAGES = int(os.getenv("STREAMING_MODE_PAGES", "300"))
+MEMORY_BUDGET_MB = int(os.getenv("MEMORY_BUDGET_MB", "256"))  # Per streaming analysis
+
+WARM_UP = os.getenv("WARM_UP", "0") == "1"  # Load heavy modules and the spaCy model in the background at start
+WARM_UP_MODULES = ["pandas", "components.llm_analyzer", "pdfplumber", "spacy"]
+STARTUP_IMPORT_BUDGET_SECONDS = float(os.getenv("STARTUP_IMPORT_BUDGET_SECONDS", "1.0"))
+
+@st.cache_resource
+def start_warm_up() -> None:
+    """Once per server process: warm the modules and model the first analysis needs"""
+    warm_up(WARM_UP_MODULES, {"spacy model": NERExtractor.shared})
+
+def render_import_report() -> None:
+    """Start-up import cost and what has been loaded on demand since"""
+    over_budget = STARTUP_IMPORT_SECONDS > STARTUP_IMPORT_BUDGET_SECONDS
+    with st.sidebar.expander("Start-up imports", expanded=over_budget):
+        if over_budget:
+            st.warning(f"Eager imports took {STARTUP_IMPORT_SECONDS:.2f}s "
+                       f"(budget {STARTUP_IMPORT_BUDGET_SECONDS:.2f}s)")
+        # Plain markdown: a table widget would import pandas just to show this
+        st.markdown("\n".join(f"- `{name}`: {seconds:.3f}s" for name, seconds in import_report()))
+
+@st.cache_resource
+def get_pdf_cache() -> TieredCache:
+    """Extracted PDF text keyed by upload hash, shared by every session of this server"""
+    disk = DiskCache(PDF_CACHE_PATH, max_bytes=PDF_CACHE_MAX_BYTES) if PDF_CACHE_PATH else None
+    return TieredCache(MemoryCache(max_entries=PDF_CACHE_ENTRIES), disk)
+
+@st.cache_resource
+def get_template_store() -> TemplateStore:
+    """Template fingerprints shared by every session of this server"""
+    return TemplateStore(TEMPLATE_STORE_DIR)
+
+@st.cache_resource
+def get_revision_store() -> RevisionStore:
+    """Revision histories shared by every session of this server"""
+    return RevisionStore(REVISION_STORE_DIR)
+
+@st.cache_resource
+def get_job_runner() -> JobRunner:
+    """Background analysis jobs shared by every session of this server"""
+    return JobRunner(max_workers=ANALYSIS_WORKERS)
+
+@st.cache_resource
+def get_llm_cache() -> DiskCache:
+    """Response cache shared by every session of this server"""
+    return DiskCache(LLM_CACHE_PATH, max_bytes=LLM_CACHE_MAX_BYTES)
+
+def render_metrics(report: dict) -> None:
+    """Per-stage timings, counters and optional profiles of one analysis"""
+    st.subheader("Performance")
+    stage_rows = [
+        {"Stage": name, "Calls": stats["calls"], "Wall (s)": round(stats["wall_seconds"], 3),
+         "CPU (s)": round(stats["cpu_seconds"], 3)}
+        for name, stats in report["stages"].items()
+    ]
+    if stage_rows:
+        st.markdown(pd.DataFrame(stage_rows).to_markdown(index=False))
+    st.json(report["counters"], expanded=False)
+    for name, profile in report.get("profiles", {}).items():
+        overlapped = " - overlapped another stage, not reliable" if profile.get("overlapped") else ""
+        with st.expander(f"Profile: {name} (peak traced memory {profile['peak_traced_bytes'] / 2**20:.1f} MiB){overlapped}"):
+            st.code(profile.get("top_functions", "Profiler unavailable for this stage"))
+
+@st.fragment
+def render_comparison(view: ComparisonView) -> None:
+    """Two-column comparison as one HTML block per page.
+
+    Runs as a fragment: changing the context or page reruns only this view, and only
+    the visible page is sent to the browser.
+    """
+    expand = st.toggle("Expand all unchanged lines")
+    context = None
+    if not expand:
+        context = st.slider("Context lines", 0, 20, DEFAULT_CONTEXT_LINES)
+    pages = view.page_count(context)
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1)
+    left_header, right_header = st.columns(2)
+    left_header.markdown("**Original Document**")
+    right_header.markdown("**Modified Document**")
+    st.html(view.render(page - 1, context))
+
+def render_results(entry: dict) -> None:
+    """Results of one completed analysis; entry caches the comparison view across reruns"""
+    result = entry["result"]
+    streaming = result.get("streaming")
+    if streaming:
+        st.caption(f"Streaming mode: {streaming['lines'][1]} contract lines compared "
+                   f"{streaming['window_lines']} at a time, {streaming['hunks']} changed regions")
+    else:
+        st.caption(f"Estimated similarity (shared wording): {result['estimate']:.0%}")
+
+    st.subheader("Similarity Score")
+    st.info(f"{result['similarity']:.2%}")
+
+    if result["previous_revision"] is not None:
+        changes = result["revision_changes"]
+        clauses = sum(line.startswith("@@") for line in changes)
+        with st.expander(f"Changes since revision {result['previous_revision']} ({clauses} clauses)"):
+            st.code("\n".join(changes) or "No changes")
+
+    entities = result["entities"]
+    st.subheader("Named Entities")
+    # types of named entities in the changed regions
+    st.write("Types of named entities found in changes:" , " ,".join(entities.keys()))
+    if entities:
+        # Convert entities to a list of dictionaries for DataFrame
+        entities_list = [{k: v[i] if i < len(v) else '' for k, v in entities.items()} for i in range(max(map(len, entities.values())))]
+        st.markdown(pd.DataFrame(entities_list).to_markdown())
+
+    entity_delta = result["entity_delta"]
+    if entity_delta is not None:
+        render_entity_delta(entity_delta)
+
+    st.subheader("AI Analysis")
+    render_findings(result["findings"])
+    st.write(result["analysis"])
+    if result["cache_stats"]:
+        st.caption(f"LLM cache: {result['cache_stats']['hits']} hits, {result['cache_stats']['misses']} misses")
+    if result["revision"] is not None:
+        st.caption(f"Saved as revision {result['revision']}")
+
+    # Display side by side comparison
+    st.subheader("Document Comparison")
+    if result["side_by_side"] is None:
+        st.info("Not built in streaming mode; the findings above cover every changed region.")
+    else:
+        if "view" not in entry:
+            entry["view"] = ComparisonView(result["side_by_side"])
+        render_comparison(entry["view"])
+
+    render_metrics(result["metrics"])
+
+def render_entity_delta(entity_delta: dict) -> None:
+    st.subheader("Entity Changes")
+    delta_rows = [
+        {"Change": "changed", "Type": label, "Template": old, "Edited": new}
+        for label, pairs in entity_delta["changed"].items() for old, new in pairs
+    ] + [
+        {"Change": "removed", "Type": label, "Template": value, "Edited": ""}
+        for label, values in entity_delta["removed"].items() for value in values
+    ] + [
+        {"Change": "added", "Type": label, "Template": "", "Edited": value}
+        for label, values in entity_delta["added"].items() for value in values
+    ]
+    if delta_rows:
+        st.markdown(pd.DataFrame(delta_rows).to_markdown())
+    else:
+        st.write("No money, date, organization or person values changed.")
+
+def render_findings(findings: list[dict]) -> None:
+    for finding in findings:
+        reused = " (unchanged since last revision)" if finding["reused"] else ""
+        # Streaming mode does not know the chunk count up front
+        of_total = f" of {finding['total']}" if finding["total"] else ""
+        with st.expander(f"Findings {finding['index'] + 1}{of_total}{reused}"):
+            st.write(finding["text"])
+
+@st.fragment(run_every=PROGRESS_POLL_SECONDS)
+def render_progress(job: Job) -> None:
+    """Live stage progress, chunk findings and streamed summary of a running job.
+
+    Polls as a fragment so only this block reruns; once the job finishes the whole
+    script reruns to show the results.
+    """
+    if job.finished:
+        st.rerun()
+    progress = job.snapshot()
+    started = [PIPELINE_STAGES.index(stage) for stage in progress["stages"] if stage in PIPELINE_STAGES]
+    current = max(started, default=None)
+    label = PIPELINE_STAGES[current] if current is not None else progress["status"]
+    st.progress((current or 0) / len(PIPELINE_STAGES), text=f"{label}...")
+    if progress["estimate"] is not None:
+        st.caption(f"Estimated similarity (shared wording): {progress['estimate']:.0%}")
+    render_findings(progress["findings"])
+    if progress["partial"]:
+        st.write(progress["partial"])
+
+def submit_analysis(template_file, matched_template, edited_file, contract_id: str, profile: bool) -> str:
+    """Start (or join) the background job for these inputs and return its key"""
+    analyses = st.session_state["analyses"]
+    contract_bytes = edited_file.getvalue()
+    template_bytes = template_file.getvalue() if template_file else None
+    template_hash = TemplateStore.hash_bytes(template_bytes) if template_file else matched_template.template_hash
+    key = analysis_key(template_hash, TemplateStore.hash_bytes(contract_bytes), contract_id, CLAUSE_DIFF, profile)
+    entry = analyses.get(key)
+    if entry is not None and (entry["result"] is not None or get_job_runner().get(entry["job_id"]) is not None):
+        analyses[key] = analyses.pop(key)  # Most recent last
+        return key
+
+    pipeline = ContractPipeline(
+        get_template_store(),
+        llm_analyzer.LLMAnalyzer(
+            max_concurrency=4,
+            cache=get_llm_cache(),
+            scope_entities=True,
+            http_client=http_client.get_shared_http_client(http2=LLM_HTTP2),
+            rate_limiter=http_client.get_shared_rate_limiter(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE),
+        ),
+        get_revision_store(),
+        pdf_backend=PDF_BACKEND, pdf_workers=PDF_WORKERS, pdf_cache=get_pdf_cache(), clause_diff=CLAUSE_DIFF,
+        streaming_pages=STREAMING_MODE_PAGES or None, memory_budget_bytes=MEMORY_BUDGET_MB * 2**20,
+    )
+    template_name = template_file.name if template_file else matched_template.name
+
+    def run(job: Job) -> dict:
+        return pipeline.run(contract_bytes, template_bytes, template_hash, template_name, contract_id, job, profile)
+
+    label = f"{edited_file.name} vs {template_name or template_hash[:12]}"
+    job = get_job_runner().submit(key, run, label=label)
+    analyses[key] = {"label": label, "job_id": job.id, "result": None}
+    while len(analyses) > MAX_SESSION_ANALYSES:
+        del analyses[next(iter(analyses))]
+    return key
+
 def main():
     st.set_page_config(page_title="Business Contract Validator", layout="wide")
     st.title("Business Contract Validator")
+    # Input key -> {"label", "job_id", "result"}; survives reruns caused by widget interaction
+    analyses = st.session_state.setdefault("analyses", {})
     
     # File uploaders
     template_file = st.file_uploader("Upload Template Contract", type=['pdf'])
     edited_file = st.file_uploader("Upload Edited Contract", type=['pdf'])
+    profile_stages = st.sidebar.checkbox("Profile stages (cProfile + tracemalloc)")
+    # Revision histories live in a server-wide store: each session gets its own workspace
+    st.session_state.setdefault("workspace", uuid.uuid4().hex[:12])
+    workspace = st.sidebar.text_input(
+        "Workspace (revision history)", key="workspace",
+        help="Only analyses in the same workspace share revision history; enter a name to continue it later.")
+    if WARM_UP:
+        start_warm_up()
+    render_import_report()
     
-    if template_file and edited_file:
+    # Without a template upload, offer the stored templates the contract most resembles
+    matched_template = None
+    if edited_file and not template_file:
+        pdf_parser = PDFParser(backend=PDF_BACKEND, workers=PDF_WORKERS, cache=get_pdf_cache())
+        candidates = get_template_store().find_similar(pdf_parser.extract_text(edited_file),
+                                                       extractor=pdf_parser.extractor)
+        if candidates:
+            options = {
+                f"{fingerprint.name or fingerprint.template_hash[:12]} (~{score:.0%} shared wording)": fingerprint
+                for fingerprint, score in candidates
+            }
+            matched_template = options[st.selectbox("Matching stored templates", list(options))]
+        else:
+            st.info("No stored template resembles this contract; upload its template.")
+    
+    if edited_file and (template_file or matched_template):
+        # Revisions of the same contract reuse the previous revision's entities and findings
+        contract_id = st.text_input("Contract ID (revision history)", value=contract_identity(edited_file.name))
         if st.button("Analyze Contracts"):
-            with st.spinner("Analyzing..."):
-                # Initialize components
-                pdf_parser = PDFParser()
-                text_comparer = TextComparer()
-                ner_extractor = NERExtractor()
-                llm_analyzer = LLMAnalyzer()
-                
-                # Extract text
-                template_text = pdf_parser.extract_text(template_file)
-                edited_text = pdf_parser.extract_text(edited_file)
-                
-                # Compare texts
-                differences, similarity, side_by_side = text_comparer.compare_texts(template_text, edited_text)
-                
-                # Extract entities
-                entities = ner_extractor.extract_entities(edited_text)
-                
-                # Analyze with LLM
-                analysis = llm_analyzer.analyze_differences(differences, entities)
-                
-                # Display results
-                st.subheader("Similarity Score")
-                st.info(f"{similarity:.2%}")
-                
-                st.subheader("Named Entities")
-                # types of named entities
-                st.write("Types of named entities found:" , " ,".join(entities.keys()))
-                # Convert entities to a list of dictionaries for DataFrame
-                entities_list = [{k: v[i] if i < len(v) else '' for k, v in entities.items()} for i in range(max(map(len, entities.values())))]
-                st.markdown(pd.DataFrame(entities_list).to_markdown())
-                
-            
-                
-                st.subheader("AI Analysis")
-                st.write(analysis)
-
-                # Display side by side comparison
-                st.subheader("Document Comparison")
-                col1, col2 = st.columns(2)
-
-                with col1:
-                    st.markdown("**Original Document**")
-                    for tag, line in side_by_side['left']:
-                        if tag == 'delete':
-                            st.markdown(f'<p style="color: orange">{line}</p>', unsafe_allow_html=True)
-                        else:
-                            st.text(line)
-
-                with col2:
-                    st.markdown("**Modified Document**")
-                    for tag, line in side_by_side['right']:
-                        if tag == 'insert':
-                            st.markdown(f'<p style="color: green">{line}</p>', unsafe_allow_html=True)
-                        else:
-                            st.text(line)
-                
-                
+            # Runs in the background: reruns from other widgets don't interrupt or repeat it
+            st.session_state["selected_analysis"] = submit_analysis(
+                template_file, matched_template, edited_file, scoped_contract_id(workspace, contract_id),
+                profile_stages)
+
+    if not analyses:
+        return
+    keys = list(analyses)[::-1]
+    if st.session_state.get("selected_analysis") not in analyses:
+        st.session_state["selected_analysis"] = keys[0]
+    selected = st.selectbox("Analyses", keys, key="selected_analysis", format_func=lambda key: analyses[key]["label"])
+    entry = analyses[selected]
+    if entry["result"] is None:
+        job = get_job_runner().get(entry["job_id"])
+        if job is None:
+            del analyses[selected]
+            st.warning("This analysis is no longer available; run it again.")
+            return
+        if job.status == "failed":
+            st.error(f"Analysis failed: {job.error}")
+            return
+        if job.status != "done":
+            render_progress(job)
+            return
+        entry["result"] = job.result
+    render_results(entry)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
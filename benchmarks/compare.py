@@ -0,0 +1,49 @@
+# benchmarks/compare.py
+"""Compare two benchmark reports written by benchmarks.run.
+
+    python -m benchmarks.compare baseline.json current.json --fail-above 1.25
+"""
+import argparse
+import json
+import sys
+
+def load(path: str) -> dict[tuple[str, str], dict]:
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    return {(record["case"], record["stage"]): record for record in report["results"]}
+
+def compare(baseline: dict, current: dict) -> list[dict]:
+    rows = []
+    for key in sorted(baseline.keys() & current.keys()):
+        before, after = baseline[key], current[key]
+        if "median_seconds" not in before or "median_seconds" not in after:
+            continue
+        rows.append({
+            "case": key[0],
+            "stage": key[1],
+            "baseline_seconds": before["median_seconds"],
+            "current_seconds": after["median_seconds"],
+            "time_ratio": after["median_seconds"] / before["median_seconds"] if before["median_seconds"] else None,
+            # Subprocess stages such as cold_start report no RSS
+            "rss_ratio": after["peak_rss_bytes"] / before["peak_rss_bytes"] if before.get("peak_rss_bytes") and "peak_rss_bytes" in after else None,
+        })
+    return rows
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--fail-above", type=float, help="Exit 1 if any stage's time ratio exceeds this")
+    args = parser.parse_args(argv)
+
+    rows = compare(load(args.baseline), load(args.current))
+    print(f"{'case':>24} {'stage':<10} {'before':>10} {'after':>10} {'time x':>7} {'rss x':>7}")
+    for row in rows:
+        print(f"{row['case']:>24} {row['stage']:<10} {row['baseline_seconds']:10.4f} "
+              f"{row['current_seconds']:10.4f} {row['time_ratio'] or 0:7.2f} {row['rss_ratio'] or 0:7.2f}")
+    if args.fail_above and any((row["time_ratio"] or 0) > args.fail_above for row in rows):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+# benchmarks/mock_llm.py
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class MockCompletionServer:
+    """Local OpenAI/Groq-compatible chat completion endpoint with a fixed response latency.
+
+    Point the Groq client at it with GROQ_BASE_URL=server.base_url. Requests with
+    "stream": true get server-sent events, one word per chunk.
+    """
+
+    def __init__(self, latency: float = 0.05, completion_tokens: int = 200):
+        self.latency = latency
+        self.completion_tokens = completion_tokens
+        self.requests = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                time.sleep(server.latency)
+                prompt_chars = sum(len(message.get("content", "")) for message in payload.get("messages", []))
+                usage = {
+                    "prompt_tokens": prompt_chars // 4,
+                    "completion_tokens": server.completion_tokens,
+                    "total_tokens": prompt_chars // 4 + server.completion_tokens,
+                }
+                if payload.get("stream"):
+                    self._stream(payload, usage)
+                    return
+                body = json.dumps({
+                    "id": f"mock-{server.requests}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": payload.get("model", "mock"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "word " * server.completion_tokens},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": usage,
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self, payload, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for i in range(server.completion_tokens):
+                    chunk = {
+                        "id": f"mock-{server.requests}",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": payload.get("model", "mock"),
+                        "choices": [{"index": 0, "delta": {"content": "word "}, "finish_reason": None}],
+                    }
+                    if i == server.completion_tokens - 1:
+                        chunk["choices"][0]["finish_reason"] = "stop"
+                        chunk["x_groq"] = {"id": chunk["id"], "usage": usage}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "MockCompletionServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
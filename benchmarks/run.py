@@ -0,0 +1,207 @@
+# benchmarks/run.py
+"""End-to-end benchmark of the validation pipeline.
+
+Usage (from the repository root):
+
+    python -m benchmarks.run --sizes 10 100 1000 --edit-rate 0.02 --output bench_results.json
+    python -m benchmarks.compare baseline.json bench_results.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from app.components.llm_analyzer import LLMAnalyzer
+from app.components.pdf_parser import PDFParser
+from app.components.text_compare import TextComparer
+from benchmarks.mock_llm import MockCompletionServer
+from benchmarks.synthetic import generate_pair
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "sample_contracts")
+SAMPLE_PAIRS = {
+    "employment": ("Employment_Template_1.pdf", "Employment_Contract_1.pdf"),
+    "lease": ("Lease_Contract_Template.pdf", "Lease_Contract.pdf"),
+    "investment": ("Investment_Template.pdf", "Investment_Contract.pdf"),
+    "service": ("Service_Contract_Template.pdf", "Service_Contract.pdf"),
+}
+
+def _proc_status_bytes(field: str) -> int | None:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def reset_peak_rss() -> bool:
+    """Reset the kernel's peak RSS counter (Linux); False if only the lifetime peak is available"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def peak_rss_bytes() -> int:
+    peak = _proc_status_bytes("VmHWM")
+    if peak is not None:
+        return peak
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def current_rss_bytes() -> int:
+    return _proc_status_bytes("VmRSS") or 0
+
+def measure(func, repeat: int) -> tuple[dict, object]:
+    """Run func `repeat` times; wall/CPU seconds and peak RSS of the stage"""
+    wall, cpu, peaks, growth = [], [], [], []
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        resettable = reset_peak_rss()
+        baseline = current_rss_bytes()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        result = func()
+        wall.append(time.perf_counter() - wall_start)
+        cpu.append(time.process_time() - cpu_start)
+        peak = peak_rss_bytes()
+        peaks.append(peak)
+        growth.append(max(peak - baseline, 0))
+    return {
+        "wall_seconds": wall,
+        "median_seconds": statistics.median(wall),
+        "min_seconds": min(wall),
+        "cpu_seconds": statistics.median(cpu),
+        "peak_rss_bytes": max(peaks),
+        "rss_growth_bytes": max(growth),
+        "peak_rss_is_per_stage": resettable,
+    }, result
+
+def _load_ner():
+    try:
+        from app.components.ner_extractor import NERExtractor
+        return NERExtractor.shared()
+    except (ImportError, OSError) as e:
+        return f"{type(e).__name__}: {e}"
+
+def benchmark_case(name: str, template_path: str, edited_path: str, args, server, ner) -> list[dict]:
+    records = []
+
+    def record(stage: str, stats: dict, **extra) -> None:
+        records.append({"case": name, "stage": stage, **stats, **extra})
+        timing = f"{stats['median_seconds']:9.4f}s" if "median_seconds" in stats else f"skipped ({stats['skipped']})"
+        print(f"{name:>24} {stage:<10} {timing}", flush=True)
+
+    parser = PDFParser(backend=args.pdf_backend)
+    pages = sum(1 for _ in parser.iter_pages(template_path)) + sum(1 for _ in parser.iter_pages(edited_path))
+    stats, texts = measure(
+        lambda: (parser.extract_text(template_path), parser.extract_text(edited_path)), args.repeat)
+    record("extract", stats, pages=pages, pages_per_second=pages / stats["median_seconds"])
+    template_text, edited_text = texts
+
+    lines = len(template_text.splitlines()) + len(edited_text.splitlines())
+    stats, comparison = measure(lambda: TextComparer.compare_texts(template_text, edited_text), args.repeat)
+    differences, similarity, _ = comparison
+    record("compare", stats, lines=lines, lines_per_second=lines / stats["median_seconds"], similarity=similarity)
+
+    entities = {}
+    if isinstance(ner, str):
+        record("ner", {"skipped": ner})
+    else:
+        stats, entities = measure(lambda: ner.extract_entities(edited_text), args.repeat)
+        record("ner", stats, chars=len(edited_text), entities=sum(len(v) for v in entities.values()),
+               chars_per_second=len(edited_text) / stats["median_seconds"])
+
+    changes = TextComparer.format_hunks(TextComparer.compact_diff(differences))
+    analyzer = LLMAnalyzer(max_concurrency=args.llm_concurrency, scope_entities=True)
+    requests_before = server.requests
+    stats, _ = measure(lambda: analyzer.analyze_differences(changes, entities), args.repeat)
+    requests = (server.requests - requests_before) // args.repeat
+    record("llm", stats, change_lines=len(changes), requests=requests,
+           requests_per_second=requests / stats["median_seconds"], mock_latency_seconds=args.llm_latency)
+
+    first_events = []
+
+    def stream():
+        started = time.perf_counter()
+        events = analyzer.stream_analysis(changes, entities)
+        next(events)
+        first_events.append(time.perf_counter() - started)
+        for _ in events:
+            pass
+    stats, _ = measure(stream, args.repeat)
+    record("llm_stream", stats, time_to_first_event_seconds=statistics.median(first_events))
+    return records
+
+def benchmark_cold_start(repeat: int) -> dict:
+    """Time to import the Streamlit app in a fresh interpreter (what each worker spawn pays)"""
+    app_dir = os.path.join(os.path.dirname(__file__), "..", "app")
+    wall = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import main"], cwd=app_dir, check=True, capture_output=True)
+        wall.append(time.perf_counter() - started)
+    print(f"{'app':>24} {'cold_start':<10} {statistics.median(wall):9.4f}s", flush=True)
+    return {"case": "app", "stage": "cold_start", "wall_seconds": wall,
+            "median_seconds": statistics.median(wall), "min_seconds": min(wall)}
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10, 100], help="Synthetic contract sizes in pages")
+    parser.add_argument("--edit-rate", type=float, default=0.02, help="Fraction of synthetic lines edited")
+    parser.add_argument("--no-samples", action="store_true", help="Skip the PDFs in data/sample_contracts")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the median is reported")
+    parser.add_argument("--pdf-backend", default="pdfplumber")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Mock completion latency in seconds")
+    parser.add_argument("--llm-concurrency", type=int, default=4)
+    parser.add_argument("--output", default="bench_results.json")
+    return parser.parse_args(argv)
+
+def main(argv: list[str] | None = None) -> dict:
+    args = parse_args(argv)
+    ner = _load_ner()
+    records = [benchmark_cold_start(args.repeat)]
+    with MockCompletionServer(latency=args.llm_latency) as server, tempfile.TemporaryDirectory() as tmp:
+        os.environ["GROQ_BASE_URL"] = server.base_url
+        os.environ.setdefault("GROQ_API_KEY", "benchmark")
+        cases = []
+        if not args.no_samples:
+            cases += [(name, os.path.join(SAMPLE_DIR, template), os.path.join(SAMPLE_DIR, edited))
+                      for name, (template, edited) in SAMPLE_PAIRS.items()]
+        for pages in args.sizes:
+            cases.append((f"synthetic_{pages}p", *generate_pair(tmp, pages, args.edit_rate)))
+        for name, template_path, edited_path in cases:
+            records.extend(benchmark_case(name, template_path, edited_path, args, server, ner))
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": records,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+    return report
+
+if __name__ == "__main__":
+    main()
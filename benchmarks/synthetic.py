@@ -0,0 +1,136 @@
+# benchmarks/synthetic.py
+import random
+
+LINES_PER_PAGE = 50
+LINE_WIDTH = 90
+
+CLAUSE_TITLES = [
+    "Definitions", "Term", "Compensation", "Payment Terms", "Confidentiality", "Termination",
+    "Indemnification", "Limitation of Liability", "Governing Law", "Assignment", "Notices",
+    "Force Majeure", "Warranties", "Insurance", "Dispute Resolution", "Entire Agreement",
+]
+PARTIES = ["ACME Corporation", "Globex Industries", "Initech LLC", "Umbrella Holdings", "Stark Partners"]
+PEOPLE = ["John Doe", "Jane Smith", "Maria Garcia", "Wei Chen", "Amit Patel"]
+PHRASES = [
+    "the Parties agree that", "subject to the provisions of this Agreement", "in accordance with applicable law",
+    "upon written notice to the other Party", "within thirty (30) days of receipt", "without prior written consent",
+    "shall remain in full force and effect", "including but not limited to", "at its sole discretion",
+    "for the avoidance of doubt", "notwithstanding anything to the contrary", "as set forth in Schedule A",
+]
+
+def _sentence(rng: random.Random) -> str:
+    parts = [rng.choice(PHRASES) for _ in range(rng.randint(2, 4))]
+    if rng.random() < 0.3:
+        parts.append(f"an amount of ${rng.randint(1, 500) * 1000:,}")
+    if rng.random() < 0.2:
+        parts.append(f"{rng.choice(PARTIES)} represented by {rng.choice(PEOPLE)}")
+    if rng.random() < 0.2:
+        parts.append(f"on or before {rng.randint(1, 28)} {rng.choice(['January', 'March', 'June', 'October'])} 2025")
+    sentence = ", ".join(parts)
+    return sentence[0].upper() + sentence[1:] + "."
+
+def _wrap(text: str, width: int = LINE_WIDTH) -> list[str]:
+    lines, current = [], ""
+    for word in text.split():
+        if current and len(current) + 1 + len(word) > width:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        lines.append(current)
+    return lines
+
+def generate_contract_lines(pages: int, seed: int = 0) -> list[str]:
+    """Deterministic contract-like text of roughly `pages` pages of numbered clauses"""
+    rng = random.Random(seed)
+    target = pages * LINES_PER_PAGE
+    lines = ["MASTER SERVICES AGREEMENT", f"Between {PARTIES[0]} and {PARTIES[1]}", ""]
+    clause = 1
+    while len(lines) < target:
+        lines.append(f"{clause}. {rng.choice(CLAUSE_TITLES)}")
+        paragraph = " ".join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+        lines.extend(_wrap(paragraph))
+        lines.append("")
+        clause += 1
+    return lines[:target]
+
+def apply_edits(lines: list[str], edit_rate: float, seed: int = 1) -> list[str]:
+    """Edit about edit_rate of the lines: reword, change amounts, insert or delete lines"""
+    rng = random.Random(seed)
+    edited = []
+    for line in lines:
+        if not line or rng.random() >= edit_rate:
+            edited.append(line)
+            continue
+        action = rng.random()
+        if action < 0.4:
+            words = line.split()
+            words[rng.randrange(len(words))] = rng.choice(["solely", "promptly", "jointly", "exclusively"])
+            edited.append(" ".join(words))
+        elif action < 0.6:
+            edited.append(line.replace("0,000", "5,000") if "0,000" in line else line + f" Fee: ${rng.randint(1, 99)},000.")
+        elif action < 0.8:
+            edited.append(line)
+            edited.append(_wrap(_sentence(rng))[0])
+        # else: line deleted
+    return edited
+
+def page_texts(lines: list[str], lines_per_page: int = LINES_PER_PAGE) -> list[str]:
+    """Group lines into page strings"""
+    return ["\n".join(lines[i:i + lines_per_page]) for i in range(0, len(lines), lines_per_page)]
+
+def _pdf_escape(text: str) -> str:
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(path: str, pages: list[str], font_size: int = 9) -> None:
+    """Write a minimal text-only PDF (Helvetica, one content stream per page)"""
+    objects: list[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")  # Filled in once the page tree exists
+    pages_obj = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids = []
+    leading = font_size + 3
+    for text in pages:
+        commands = [f"BT /F1 {font_size} Tf {leading} TL 40 800 Td"]
+        for line in text.split("\n"):
+            commands.append(f"({_pdf_escape(line)}) Tj T*")
+        commands.append("ET")
+        stream = "\n".join(commands).encode("latin-1")
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_obj, font, content)
+        ))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    objects[pages_obj - 1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_obj
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+def generate_pair(directory: str, pages: int, edit_rate: float, seed: int = 0) -> tuple[str, str]:
+    """Write a synthetic template PDF and an edited copy; returns their paths"""
+    template_lines = generate_contract_lines(pages, seed)
+    edited_lines = apply_edits(template_lines, edit_rate, seed + 1)
+    template_path = f"{directory}/synthetic_{pages}p_template.pdf"
+    edited_path = f"{directory}/synthetic_{pages}p_edited_{edit_rate:g}.pdf"
+    write_pdf(template_path, page_texts(template_lines))
+    write_pdf(edited_path, page_texts(edited_lines))
+    return template_path, edited_path
@@ -0,0 +1,101 @@
+import json
+import os
+import pytest
+from unittest.mock import Mock
+from app.components.batch_runner import BatchRunner, discover_pairs, load_manifest
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "sample_contracts")
+
+def read_results(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+@pytest.fixture
+def pairs():
+    return [
+        {"id": "lease", "template": os.path.join(SAMPLE_DIR, "Lease_Contract_Template.pdf"),
+         "contract": os.path.join(SAMPLE_DIR, "Lease_Contract.pdf")},
+        {"id": "service", "template": os.path.join(SAMPLE_DIR, "Service_Contract_Template.pdf"),
+         "contract": os.path.join(SAMPLE_DIR, "Service_Contract.pdf")},
+    ]
+
+@pytest.fixture
+def analyzer():
+    analyzer = Mock()
+    analyzer.analyze_differences.return_value = "Test analysis response"
+    return analyzer
+
+class TestPairDiscovery:
+    def test_discover_pairs(self):
+        pairs = {pair["id"]: pair for pair in discover_pairs(SAMPLE_DIR)}
+        assert os.path.basename(pairs["Lease_Contract"]["template"]) == "Lease_Contract_Template.pdf"
+        assert os.path.basename(pairs["Employment_Contract_2"]["template"]) == "Employment_Template_2.pdf"
+        # No template shares its name and the directory has several templates
+        assert "Marketing_Capaign_Contract" not in pairs
+
+    def test_load_jsonl_manifest(self, tmp_path):
+        manifest = tmp_path / "pairs.jsonl"
+        manifest.write_text(json.dumps({"id": "a", "template": "t.pdf", "contract": "c.pdf"}) + "\n")
+        assert load_manifest(str(manifest)) == [
+            {"id": "a", "template": str(tmp_path / "t.pdf"), "contract": str(tmp_path / "c.pdf")}
+        ]
+
+    def test_load_csv_manifest(self, tmp_path):
+        manifest = tmp_path / "pairs.csv"
+        manifest.write_text("template,contract\nt.pdf,deal_42.pdf\n")
+        assert load_manifest(str(manifest))[0]["id"] == "deal_42"
+
+class TestBatchRunner:
+    def test_invalid_concurrency(self, tmp_path):
+        with pytest.raises(ValueError):
+            BatchRunner(str(tmp_path / "out.jsonl"), llm_concurrency=0)
+
+    def test_run_writes_jsonl(self, tmp_path, pairs, analyzer):
+        output = str(tmp_path / "out.jsonl")
+        summary = BatchRunner(output, analyzer=analyzer, workers=2, run_ner=False).run(pairs)
+
+        assert {key: summary[key] for key in ("total", "skipped", "ok", "error")} == \
+            {"total": 2, "skipped": 0, "ok": 2, "error": 0}
+        assert summary["metrics"]["counters"]["pages_parsed"] > 0
+        results = {record["id"]: record for record in read_results(output)}
+        assert set(results) == {"lease", "service"}
+        assert results["lease"]["status"] == "ok"
+        assert results["lease"]["analysis"] == "Test analysis response"
+        assert 0 < results["lease"]["similarity"] < 1
+        assert results["lease"]["metrics"]["stages"]["pdf_extract"]["calls"] == 2
+        assert analyzer.analyze_differences.call_count == 2
+        changes = analyzer.analyze_differences.call_args.args[0]
+        assert changes[0].startswith("@@")
+
+    def test_resume_skips_completed(self, tmp_path, pairs, analyzer):
+        output = str(tmp_path / "out.jsonl")
+        BatchRunner(output, analyzer=analyzer, workers=1, run_ner=False).run(pairs[:1])
+
+        summary = BatchRunner(output, analyzer=analyzer, workers=1, run_ner=False).run(pairs)
+        assert summary["skipped"] == 1
+        assert summary["ok"] == 1
+        assert [record["id"] for record in read_results(output)] == ["lease", "service"]
+
+    def test_errors_recorded_and_retried(self, tmp_path, pairs):
+        output = str(tmp_path / "out.jsonl")
+        broken = {"id": "broken", "template": pairs[0]["template"], "contract": str(tmp_path / "missing.pdf")}
+        runner = BatchRunner(output, workers=1, run_ner=False)
+
+        summary = runner.run([broken])
+        assert summary["error"] == 1
+        record = read_results(output)[0]
+        assert record["status"] == "error"
+        assert record["stage"] == "prepare"
+        assert "broken" not in runner.completed_ids()
+
+    def test_interrupted_line_ignored(self, tmp_path):
+        output = tmp_path / "out.jsonl"
+        output.write_text('{"id": "a", "status": "ok"}\n{"id": "b", "sta')
+        assert BatchRunner(str(output)).completed_ids() == {"a"}
+
+    def test_resume_after_interrupted_line(self, tmp_path, pairs, analyzer):
+        output = tmp_path / "out.jsonl"
+        output.write_text('{"id": "lease", "status": "ok"}\n{"id": "service", "sta')
+        summary = BatchRunner(str(output), analyzer=analyzer, workers=1, run_ner=False).run(pairs)
+        assert (summary["skipped"], summary["ok"]) == (1, 1)
+        assert [record["id"] for record in read_results(output)] == ["lease", "service"]
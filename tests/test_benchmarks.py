@@ -0,0 +1,55 @@
+import pytest
+from unittest.mock import patch
+from app.components.llm_analyzer import LLMAnalyzer
+from app.components.pdf_parser import PDFParser
+from benchmarks.compare import compare
+from benchmarks.mock_llm import MockCompletionServer
+from benchmarks.synthetic import apply_edits, generate_contract_lines, generate_pair, page_texts, write_pdf
+
+class TestSyntheticContracts:
+    def test_deterministic(self):
+        assert generate_contract_lines(2, seed=3) == generate_contract_lines(2, seed=3)
+        assert generate_contract_lines(2, seed=3) != generate_contract_lines(2, seed=4)
+
+    def test_edit_rate(self):
+        lines = generate_contract_lines(20)
+        assert apply_edits(lines, 0.0) == lines
+        edited = apply_edits(lines, 0.1)
+        changed = len(set(edited) ^ set(lines))
+        assert 0 < changed < len(lines) * 0.5
+
+    def test_pdf_roundtrip(self, tmp_path):
+        lines = ["1. Fees (monthly)", "Payment of $5,000 \\ net 30"]
+        path = str(tmp_path / "doc.pdf")
+        write_pdf(path, page_texts(lines, lines_per_page=1))
+        parser = PDFParser()
+        assert list(parser.iter_pages(path)) == lines
+
+    def test_generate_pair(self, tmp_path):
+        template_path, edited_path = generate_pair(str(tmp_path), pages=2, edit_rate=0.05)
+        assert len(list(PDFParser().iter_pages(template_path))) == 2
+
+class TestMockCompletionServer:
+    def test_analyzer_against_mock(self):
+        with MockCompletionServer(latency=0, completion_tokens=3) as server:
+            with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key', 'GROQ_BASE_URL': server.base_url}):
+                result = LLMAnalyzer().analyze_differences(["+ added clause"], {})
+            assert result == "word word word "
+            assert server.requests == 1
+
+    def test_streaming_against_mock(self):
+        with MockCompletionServer(latency=0, completion_tokens=3) as server:
+            with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key', 'GROQ_BASE_URL': server.base_url}):
+                events = list(LLMAnalyzer().stream_analysis(["+ added clause"], {}))
+            assert [event["text"] for event in events if event["type"] == "token"] == ["word "] * 3
+            assert events[-1] == {"type": "done", "text": "word word word "}
+
+def test_compare_reports():
+    baseline = {("lease", "compare"): {"median_seconds": 0.2, "peak_rss_bytes": 100},
+                ("lease", "ner"): {"skipped": "no model"}}
+    current = {("lease", "compare"): {"median_seconds": 0.1, "peak_rss_bytes": 150},
+               ("lease", "ner"): {"skipped": "no model"}}
+    rows = compare(baseline, current)
+    assert len(rows) == 1
+    assert rows[0]["time_ratio"] == pytest.approx(0.5)
+    assert rows[0]["rss_ratio"] == pytest.approx(1.5)
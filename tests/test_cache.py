@@ -0,0 +1,111 @@
+import pytest
+from app.components.cache import DiskCache, MemoryCache, TieredCache
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite"), max_bytes=100)
+    yield cache
+    cache.close()
+
+class TestDiskCache:
+    def test_invalid_max_bytes(self, tmp_path):
+        with pytest.raises(ValueError):
+            DiskCache(str(tmp_path / "cache.sqlite"), max_bytes=0)
+
+    def test_get_set(self, cache):
+        assert cache.get("missing") is None
+        cache.set("key", "value")
+        assert cache.get("key") == "value"
+        assert "key" in cache
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_persistence(self, tmp_path):
+        path = str(tmp_path / "cache.sqlite")
+        first = DiskCache(path)
+        first.set("key", "value")
+        first.close()
+
+        second = DiskCache(path)
+        assert second.get("key") == "value"
+        second.close()
+
+    def test_lru_eviction_by_size(self, cache):
+        cache.set("a", "x" * 40)
+        cache.set("b", "x" * 40)
+        # Touch "a" so "b" becomes least recently used
+        assert cache.get("a") is not None
+        cache.set("c", "x" * 40)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert cache.size_bytes() <= 100
+
+    def test_oversized_value_not_stored(self, cache):
+        cache.set("big", "x" * 101)
+        assert "big" not in cache
+
+    def test_stats_and_clear(self, cache):
+        cache.set("key", "value")
+        cache.get("key")
+        cache.get("other")
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["entries"] == 1
+        assert stats["size_bytes"] == 5
+
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.hits == 0
+
+class TestMemoryCache:
+    def test_invalid_limits(self):
+        with pytest.raises(ValueError):
+            MemoryCache(max_entries=0)
+        with pytest.raises(ValueError):
+            MemoryCache(max_bytes=0)
+
+    def test_entry_limit_evicts_lru(self):
+        cache = MemoryCache(max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+        assert "a" in cache
+        assert "b" not in cache
+        assert len(cache) == 2
+
+    def test_size_limit(self):
+        cache = MemoryCache(max_bytes=10)
+        cache.set("a", "x" * 6)
+        cache.set("b", "x" * 6)
+        assert "a" not in cache
+        assert cache.size_bytes() == 6
+
+    def test_replace_updates_size(self):
+        cache = MemoryCache()
+        cache.set("a", "x" * 6)
+        cache.set("a", "x" * 2)
+        assert cache.size_bytes() == 2
+        assert cache.get("a") == "xx"
+
+class TestTieredCache:
+    def test_memory_only(self):
+        cache = TieredCache(MemoryCache())
+        assert cache.get("a") is None
+        cache.set("a", "1")
+        assert cache.get("a") == "1"
+        assert cache.stats()["disk"] is None
+
+    def test_disk_hit_promoted(self, tmp_path):
+        disk = DiskCache(str(tmp_path / "cache.sqlite"))
+        disk.set("a", "1")
+        cache = TieredCache(MemoryCache(), disk)
+
+        assert cache.get("a") == "1"
+        assert "a" in cache.memory
+        assert cache.get("a") == "1"
+        assert disk.hits == 1
+        assert cache.memory.hits == 1
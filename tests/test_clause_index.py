@@ -0,0 +1,95 @@
+# tests/test_clause_index.py
+from app.components.clause_index import ClauseIndex, match_clauses, normalize_text, segment_clauses
+
+TEMPLATE = """Service Agreement
+between the parties below.
+1. Term
+The term is twelve months.
+2. Fees
+Fees are $1,000 per month. Payment is due
+within 30 days.
+3. Confidentiality
+Each party keeps the other's information confidential.
+"""
+
+def _kinds(changes):
+    return [(change.kind, change.label) for change in changes]
+
+class TestSegmentation:
+    def test_numbered_clauses(self):
+        clauses = segment_clauses(TEMPLATE.splitlines())
+        assert [clause.number for clause in clauses] == [None, "1", "2", "3"]
+        assert clauses[2].text == "Fees Fees are $1,000 per month. Payment is due within 30 days."
+        assert clauses[2].title == "fees"
+        assert (clauses[2].start_line, clauses[2].end_line) == (4, 7)
+
+    def test_heading_styles(self):
+        lines = ["ARTICLE IV Payment", "text", "Section 5: Notices", "text", "2.1 Duties: work", "12) Misc"]
+        assert [clause.number for clause in segment_clauses(lines)] == ["iv", "5", "2.1", "12"]
+
+    def test_wrapping_and_page_numbers_ignored(self):
+        rewrapped = TEMPLATE.replace("Payment is due\nwithin 30 days.", "Payment\n7\nis due within 30\nPage 2 of 3\ndays.")
+        old = segment_clauses(TEMPLATE.splitlines())
+        new = segment_clauses(rewrapped.splitlines())
+        assert [clause.key for clause in old] == [clause.key for clause in new]
+
+    def test_years_are_not_headings(self):
+        clauses = segment_clauses(["1. Term", "ends on 31 March", "2024. Renewal is automatic."])
+        assert len(clauses) == 1
+
+    def test_sentences(self):
+        clause = segment_clauses(["1. Parties", "Signed by Mr. Smith. He agrees; The fee is due."])[0]
+        assert clause.sentences() == ["Parties Signed by Mr. Smith.", "He agrees;", "The fee is due."]
+
+    def test_normalize_text(self):
+        assert normalize_text("  a\n b\t\tc ") == "a b c"
+        assert normalize_text("Fees are\n- 3 -\ndue\nPage 3 of 9") == "Fees are due"
+
+class TestMatchClauses:
+    def test_identical(self):
+        index = ClauseIndex.from_text(TEMPLATE)
+        assert {change.kind for change in match_clauses(index, index)} == {"unchanged"}
+
+    def test_modified_by_number(self):
+        edited = TEMPLATE.replace("$1,000", "$2,000")
+        changes = match_clauses(ClauseIndex.from_text(TEMPLATE), ClauseIndex.from_text(edited))
+        assert [change.kind for change in changes] == ["unchanged", "unchanged", "modified", "unchanged"]
+
+    def test_renumbered_after_insert(self):
+        edited = TEMPLATE.replace("1. Term", "1. Scope\nServices as described.\n2. Term") \
+            .replace("2. Fees", "3. Fees").replace("3. Confidentiality", "4. Confidentiality")
+        changes = match_clauses(ClauseIndex.from_text(TEMPLATE), ClauseIndex.from_text(edited))
+        assert _kinds(changes) == [
+            ("unchanged", "preamble"),
+            ("added", "clause 1 added"),
+            ("unchanged", "clause 2 (was clause 1)"),
+            ("unchanged", "clause 3 (was clause 2)"),
+            ("unchanged", "clause 4 (was clause 3)"),
+        ]
+        assert not any(change.moved for change in changes)
+
+    def test_moved_clause(self):
+        edited = """Service Agreement
+between the parties below.
+1. Confidentiality
+Each party keeps the other's information confidential.
+2. Term
+The term is twelve months.
+3. Fees
+Fees are $1,000 per month. Payment is due within 30 days.
+"""
+        changes = match_clauses(ClauseIndex.from_text(TEMPLATE), ClauseIndex.from_text(edited))
+        moved = [change for change in changes if change.moved]
+        assert len(moved) == 1
+        assert moved[0].old.number == "3" and moved[0].new.number == "1"
+        assert all(change.kind == "unchanged" for change in changes)
+
+    def test_removed_clause_kept_in_place(self):
+        edited = TEMPLATE.replace("2. Fees\nFees are $1,000 per month. Payment is due\nwithin 30 days.\n", "")
+        changes = match_clauses(ClauseIndex.from_text(TEMPLATE), ClauseIndex.from_text(edited))
+        assert _kinds(changes)[2] == ("removed", "clause 2 removed")
+
+    def test_modified_and_renumbered_matched_by_title(self):
+        edited = TEMPLATE.replace("3. Confidentiality\nEach party", "7. Confidentiality\nNeither party")
+        changes = match_clauses(ClauseIndex.from_text(TEMPLATE), ClauseIndex.from_text(edited))
+        assert _kinds(changes)[-1] == ("modified", "clause 7 (was clause 3)")
@@ -0,0 +1,66 @@
+# tests/test_comparison_view.py
+import pytest
+from app.components.comparison_view import ComparisonView, collapse_segments, render_rows
+from app.components.diff_engine import LineDiff
+
+def _view(left: list[str], right: list[str]):
+    return LineDiff(left, right).side_by_side()
+
+class TestCollapseSegments:
+    def test_long_unchanged_runs_collapsed(self):
+        left = [f"line {i}" for i in range(100)]
+        right = list(left)
+        right[50] = "changed"
+        segments = collapse_segments(_view(left, right), context=2)
+        assert segments == [("skip", 48), ("rows", 48, 50), ("rows", 50, 51), ("rows", 51, 53), ("skip", 47)]
+
+    def test_identical_documents_show_head(self):
+        lines = [f"line {i}" for i in range(10)]
+        assert collapse_segments(_view(lines, lines), context=3) == [("rows", 0, 3), ("skip", 7)]
+
+    def test_single_hidden_row_kept(self):
+        left = ["a", "b", "c", "d", "e"]
+        right = ["x", "b", "c", "d", "y"]
+        segments = collapse_segments(_view(left, right), context=1)
+        assert all(segment[0] != "skip" for segment in segments)
+
+class TestRender:
+    def test_html_escaped(self):
+        html = render_rows(_view(["<b>fee</b>"], ["<script>x</script>"]).iter_rows())
+        assert "<script>" not in html
+        assert "&lt;script&gt;" in html
+        assert html.count("<table") == 1
+
+    def test_pagination_and_memoization(self):
+        left = [f"line {i}" for i in range(30)]
+        right = [f"edited {i}" if i % 2 else f"line {i}" for i in range(30)]
+        view = ComparisonView(_view(left, right), page_rows=10)
+        assert view.page_count(None) == 3
+        assert view.render(1, None) is view.render(1, None)
+        assert "line 10" in view.render(1, None)
+        with pytest.raises(IndexError):
+            view.render(3, None)
+
+    def test_collapsed_view_is_shorter(self):
+        left = [f"line {i}" for i in range(1000)]
+        right = list(left)
+        right[500] = "changed"
+        view = ComparisonView(_view(left, right))
+        assert view.changed_rows == 1
+        assert view.page_count(None) == 2
+        assert view.display_row_count(3) == 9
+        assert "497 unchanged lines" in view.render(0, 3)
+
+    def test_pages_split_collapsed_segments(self):
+        left = [f"line {i}" for i in range(200)]
+        right = list(left)
+        right[20] = right[150] = "changed"
+        view = ComparisonView(_view(left, right), page_rows=4)
+        rows = [row for page in range(view.page_count(1)) for row in view.page_rows_of(page, 1)]
+        assert len(rows) == view.display_row_count(1)
+        assert [row for row in rows if row[0] == "skip"] == [("skip", 19), ("skip", 127), ("skip", 48)]
+
+    def test_legacy_dict_accepted(self):
+        side_by_side = _view(["a", "b", "c"], ["a", "B", "c", "d"])
+        legacy = {'left': side_by_side['left'], 'right': side_by_side['right']}
+        assert ComparisonView(legacy).render(0, None) == ComparisonView(side_by_side).render(0, None)
@@ -0,0 +1,167 @@
+import difflib
+import random
+import time
+import pytest
+from app.components.diff_engine import LineDiff, LineInterner, SideBySide
+
+def apply_opcodes(left, right, opcodes):
+    """Rebuild the right side from the left side and opcodes"""
+    result = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            assert left[i1:i2] == right[j1:j2]
+            result.extend(left[i1:i2])
+        else:
+            result.extend(right[j1:j2])
+    return result
+
+class TestLineInterner:
+    def test_same_lines_same_ids(self):
+        interner = LineInterner()
+        left = interner.intern(["a", "b", "a"])
+        right = interner.intern(["b", "c"])
+        assert left == [0, 1, 0]
+        assert right == [1, 2]
+
+class TestLineDiff:
+    def test_empty(self):
+        line_diff = LineDiff([], [])
+        assert line_diff.opcodes == []
+        assert line_diff.similarity() == 1.0
+
+    def test_weights_add_up_across_opcodes(self):
+        left = ["alpha", "beta", "gamma", "delta"]
+        right = ["alpha", "beta!", "gamma", "epsilon", "zeta"]
+        line_diff = LineDiff(left, right)
+        matched, total = line_diff.weights()
+        assert matched / total == line_diff.similarity()
+        parts = [line_diff.weights([opcode]) for opcode in line_diff.opcodes]
+        assert sum(part[0] for part in parts) == pytest.approx(matched)
+        assert sum(part[1] for part in parts) == total
+
+    def test_opcodes_cover_both_sides(self):
+        left = ["a", "b", "c", "d"]
+        right = ["a", "x", "c", "d", "e"]
+        opcodes = LineDiff(left, right).opcodes
+        assert opcodes[0][1] == 0 and opcodes[0][3] == 0
+        assert opcodes[-1][2] == len(left) and opcodes[-1][4] == len(right)
+        assert apply_opcodes(left, right, opcodes) == right
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_random_edits_roundtrip(self, seed):
+        rng = random.Random(seed)
+        left = [f"line {rng.randint(0, 30)}" for _ in range(rng.randint(0, 80))]
+        right = list(left)
+        for _ in range(rng.randint(0, 10)):
+            op = rng.choice(["insert", "delete", "replace"])
+            pos = rng.randint(0, len(right))
+            if op == "insert":
+                right.insert(pos, f"new {rng.randint(0, 5)}")
+            elif right and pos < len(right):
+                if op == "delete":
+                    del right[pos]
+                else:
+                    right[pos] = f"changed {rng.randint(0, 5)}"
+        line_diff = LineDiff(left, right)
+        assert apply_opcodes(left, right, line_diff.opcodes) == right
+        assert 0.0 <= line_diff.similarity() <= 1.0
+
+    def test_rare_lines_anchor_alignment(self):
+        left = ["", "1. Term", "", "2. Salary", ""]
+        right = ["", "2. Salary", "", "1. Term", ""]
+        opcodes = LineDiff(left, right).opcodes
+        equal_lines = sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag == 'equal')
+        assert equal_lines >= 3
+
+    def test_repeated_lines_fall_back(self):
+        left = ["-"] * 200 + ["a"]
+        right = ["-"] * 150 + ["b"]
+        line_diff = LineDiff(left, right)
+        assert apply_opcodes(left, right, line_diff.opcodes) == right
+
+    def test_evenly_spread_edits_scale(self):
+        # Leftmost anchors made this quadratic (minutes); middle anchors split regions in half
+        left = [f"line {i}" for i in range(100000)]
+        right = [f"changed {i}" if i % 10 == 0 else line for i, line in enumerate(left)]
+        started = time.perf_counter()
+        line_diff = LineDiff(left, right)
+        assert time.perf_counter() - started < 10
+        assert sum(tag != 'equal' for tag, *_ in line_diff.opcodes) == 10000
+
+    def test_partial_credit_for_edited_lines(self):
+        left = ["The salary shall be $50,000 per year payable monthly."]
+        right = ["The salary shall be $60,000 per year payable monthly."]
+        assert LineDiff(left, right).similarity() > 0.9
+
+    def test_rewrapped_paragraph_keeps_credit(self):
+        paragraph = ("The Employee shall devote full working time and attention to the business of the "
+                     "Company and shall not engage in any other employment without prior written consent.")
+        words = paragraph.split()
+        left = ["1. Duties"] + [' '.join(words[i:i + 7]) for i in range(0, len(words), 7)]
+        right = ["1. Duties"] + [' '.join(words[i:i + 11]) for i in range(0, len(words), 11)]
+        line_diff = LineDiff(left, right)
+        assert any(tag == 'replace' for tag, *_ in line_diff.opcodes)
+        assert line_diff.similarity() > 0.95
+
+    def test_views_share_alignment(self):
+        left = ["a", "b", "c"]
+        right = ["a", "B", "c", "d"]
+        line_diff = LineDiff(left, right)
+        assert line_diff.differ_lines() == ["  a", "- b", "+ B", "  c", "+ d"]
+        view = line_diff.side_by_side()
+        assert view['left'] == [('equal', 'a'), ('delete', 'b'), ('equal', 'c')]
+        assert view['right'] == [('equal', 'a'), ('insert', 'B'), ('equal', 'c'), ('insert', 'd')]
+
+class TestSideBySide:
+    @pytest.fixture
+    def view(self):
+        return LineDiff(["a", "b", "c", "x"], ["a", "B", "B2", "c"]).side_by_side()
+
+    def test_references_line_lists(self):
+        left, right = ["a", "b"], ["a", "c"]
+        view = LineDiff(left, right).side_by_side()
+        assert view.left_lines is left
+        assert view.right_lines is right
+
+    def test_legacy_access(self, view):
+        assert view['left'] == [('equal', 'a'), ('delete', 'b'), ('equal', 'c'), ('delete', 'x')]
+        assert list(view.keys()) == ['left', 'right']
+        with pytest.raises(KeyError):
+            view['middle']
+
+    def test_aligned_rows(self, view):
+        assert len(view) == 5
+        assert view.rows(0, 5) == [
+            (1, 'equal', 'a', 1, 'equal', 'a'),
+            (2, 'delete', 'b', 2, 'insert', 'B'),
+            (None, 'delete', None, 3, 'insert', 'B2'),
+            (3, 'equal', 'c', 4, 'equal', 'c'),
+            (4, 'delete', 'x', None, 'insert', None),
+        ]
+
+    def test_row_slices(self, view):
+        rows = view.rows(0, 5)
+        for start in range(6):
+            for stop in range(start, 7):
+                assert view.rows(start, stop) == rows[start:stop]
+
+    def test_hunks_match_difflib(self):
+        left = [f"line {i}" for i in range(40)]
+        right = list(left)
+        right[5] = "changed"
+        right[30:32] = ["new"]
+        view = LineDiff(left, right).side_by_side()
+        expected = difflib.SequenceMatcher(None, left, right).get_grouped_opcodes(3)
+        assert list(view.iter_hunks(3)) == list(expected)
+        assert list(LineDiff(left, left).side_by_side().iter_hunks()) == []
+
+    def test_from_columns_roundtrip(self, view):
+        rebuilt = SideBySide.from_columns({'left': view['left'], 'right': view['right']})
+        assert rebuilt.rows(0, len(rebuilt)) == view.rows(0, len(view))
+        with pytest.raises(ValueError):
+            SideBySide.from_columns({'left': [('equal', 'a')], 'right': []})
+
+    def test_equality(self, view):
+        assert view == LineDiff(["a", "b", "c", "x"], ["a", "B", "B2", "c"]).side_by_side()
+        assert view == {'left': view['left'], 'right': view['right']}
+        assert view != LineDiff(["a"], ["b"]).side_by_side()
@@ -0,0 +1,94 @@
+# tests/test_http_client.py
+import pytest
+from app.components.http_client import (
+    RateLimiter,
+    TokenBucket,
+    backoff_delay,
+    get_shared_http_client,
+    get_shared_rate_limiter,
+    parse_retry_after,
+)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class TestTokenBucket:
+    def test_invalid_rate(self):
+        with pytest.raises(ValueError):
+            TokenBucket(0)
+
+    def test_burst_then_wait(self):
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock=clock, sleep=clock.sleep)  # One unit per second
+        for _ in range(60):
+            assert bucket.acquire() == 0
+        assert bucket.acquire() == pytest.approx(1.0)
+        assert clock.sleeps == [pytest.approx(1.0)]
+
+    def test_refills_over_time(self):
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock=clock, sleep=clock.sleep)
+        bucket.acquire(60)
+        clock.now += 30
+        assert bucket.acquire(30) == 0
+        assert clock.sleeps == []
+
+    def test_amount_clamped_to_capacity(self):
+        clock = FakeClock()
+        bucket = TokenBucket(100, clock=clock, sleep=clock.sleep)
+        assert bucket.acquire(500) == 0
+
+class TestRateLimiter:
+    def test_unlimited(self):
+        limiter = RateLimiter()
+        assert limiter.acquire(10_000) == 0
+
+    def test_token_limit(self):
+        clock = FakeClock()
+        limiter = RateLimiter(tokens_per_minute=600, clock=clock, sleep=clock.sleep)  # 10 tokens/s
+        limiter.acquire(600)
+        assert limiter.acquire(100) == pytest.approx(10.0)
+
+    def test_shared_per_limits(self):
+        assert get_shared_rate_limiter(30, 1000) is get_shared_rate_limiter(30, 1000)
+        assert get_shared_rate_limiter(30, 1000) is not get_shared_rate_limiter(60, 1000)
+
+class TestRetryHelpers:
+    def test_parse_retry_after_seconds(self):
+        assert parse_retry_after({"retry-after": "2.5"}) == 2.5
+
+    def test_parse_retry_after_ms(self):
+        assert parse_retry_after({"retry-after-ms": "1500", "retry-after": "9"}) == 1.5
+
+    def test_parse_retry_after_http_date_in_past(self):
+        assert parse_retry_after({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0.0
+
+    def test_parse_retry_after_missing_or_invalid(self):
+        assert parse_retry_after(None) is None
+        assert parse_retry_after({}) is None
+        assert parse_retry_after({"retry-after": "soon"}) is None
+
+    def test_backoff_is_jittered_and_capped(self):
+        delays = [backoff_delay(10, base=0.5, cap=4.0) for _ in range(50)]
+        assert all(0 <= delay <= 4.0 for delay in delays)
+        assert len(set(delays)) > 1
+
+    def test_backoff_honors_retry_after(self):
+        assert backoff_delay(0, base=0.5, retry_after=3.0) >= 3.0
+
+class TestSharedClient:
+    def test_client_reused(self):
+        assert get_shared_http_client() is get_shared_http_client()
+
+    def test_http2_requires_h2(self, monkeypatch):
+        monkeypatch.setattr("app.components.http_client.http2_available", lambda: False)
+        assert get_shared_http_client(http2=True) is get_shared_http_client(http2=False)
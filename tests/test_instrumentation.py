@@ -0,0 +1,119 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, patch
+from app.components.instrumentation import Metrics, NULL_METRICS, current_metrics, propagate
+from app.components.text_compare import TextComparer
+
+class TestMetrics:
+    def test_no_active_metrics(self):
+        assert current_metrics() is NULL_METRICS
+        with NULL_METRICS.stage("anything"):
+            NULL_METRICS.incr("counter")
+
+    def test_stage_and_counters(self):
+        metrics = Metrics()
+        with metrics.activate():
+            assert current_metrics() is metrics
+            with current_metrics().stage("work"):
+                sum(range(1000))
+            current_metrics().incr("items", 3)
+            current_metrics().incr("items")
+        assert current_metrics() is NULL_METRICS
+
+        report = metrics.report()
+        assert report["stages"]["work"]["calls"] == 1
+        assert report["stages"]["work"]["wall_seconds"] >= 0
+        assert report["counters"] == {"items": 4}
+        json.dumps(report)
+
+    def test_stage_recorded_on_error(self):
+        metrics = Metrics()
+        try:
+            with metrics.stage("failing"):
+                raise ValueError("boom")
+        except ValueError:
+            pass
+        assert metrics.report()["stages"]["failing"]["calls"] == 1
+
+    def test_on_stage_called_at_stage_start(self):
+        started = []
+        metrics = Metrics(on_stage=started.append)
+        with metrics.stage("parse"):
+            assert started == ["parse"]
+        with metrics.stage("diff"):
+            pass
+        assert started == ["parse", "diff"]
+
+    def test_propagate_to_threads(self):
+        metrics = Metrics()
+        with metrics.activate():
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                list(executor.map(propagate(lambda _: current_metrics().incr("calls")), range(20)))
+            # Plain thread without propagation records nothing
+            thread = threading.Thread(target=lambda: current_metrics().incr("calls"))
+            thread.start()
+            thread.join()
+        assert metrics.report()["counters"]["calls"] == 20
+
+    def test_merge(self):
+        first, second = Metrics(), Metrics()
+        with first.stage("diff"):
+            pass
+        first.incr("lines", 10)
+        with second.stage("diff"):
+            pass
+        second.incr("lines", 5)
+        second.merge(first.report())
+        report = second.report()
+        assert report["stages"]["diff"]["calls"] == 2
+        assert report["counters"]["lines"] == 15
+
+    def test_profile(self):
+        metrics = Metrics(profile=True)
+        with metrics.stage("profiled"):
+            [str(i) for i in range(1000)]
+        profile = metrics.report()["profiles"]["profiled"]
+        assert profile["peak_traced_bytes"] > 0
+        assert "function calls" in profile["top_functions"]
+        assert "overlapped" not in profile
+
+    def test_overlapping_profiles_are_marked(self):
+        import tracemalloc
+        metrics = Metrics(profile=True)
+        with metrics.stage("outer"):
+            with metrics.stage("inner"):
+                [str(i) for i in range(1000)]
+        with metrics.stage("alone"):
+            pass
+        profiles = metrics.report()["profiles"]
+        assert profiles["outer"]["overlapped"] and profiles["inner"]["overlapped"]
+        assert "overlapped" not in profiles["alone"]
+        assert not tracemalloc.is_tracing()
+
+class TestComponentInstrumentation:
+    def test_diff_recorded(self):
+        metrics = Metrics()
+        with metrics.activate():
+            TextComparer.compare_texts("a\nb", "a\nc\nd")
+        report = metrics.report()
+        assert report["stages"]["diff"]["calls"] == 1
+        assert report["counters"]["lines_diffed"] == 5
+
+    def test_llm_recorded(self):
+        from app.components.llm_analyzer import LLMAnalyzer
+        response = Mock(choices=[Mock(message=Mock(content="analysis"))],
+                        usage=Mock(prompt_tokens=120, completion_tokens=30))
+        metrics = Metrics()
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with patch('app.components.llm_analyzer.Groq') as mock_groq:
+                mock_groq.return_value.chat.completions.create.return_value = response
+                analyzer = LLMAnalyzer(max_concurrency=4, token_budget=10)
+                with metrics.activate():
+                    analyzer.analyze_differences([f"+ added line {i}" for i in range(10)], {})
+        report = metrics.report()
+        chunks = report["counters"]["llm_chunks_sent"]
+        assert chunks > 1
+        assert report["counters"]["llm_requests"] == chunks + 1  # one per chunk plus the synthesis
+        assert report["counters"]["llm_prompt_tokens"] == 120 * report["counters"]["llm_requests"]
+        assert report["stages"]["llm_analysis"]["calls"] == 1
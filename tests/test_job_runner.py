@@ -0,0 +1,77 @@
+# tests/test_job_runner.py
+import threading
+import pytest
+from unittest.mock import patch
+from app.components.job_runner import Job, JobRunner
+
+@pytest.fixture
+def runner():
+    runner = JobRunner(max_workers=2)
+    yield runner
+    runner.shutdown()
+
+def _wait(job):
+    for _ in range(500):
+        if job.finished:
+            return job
+        threading.Event().wait(0.01)
+    raise AssertionError("job did not finish")
+
+class TestJobRunner:
+    def test_result_and_progress(self, runner):
+        def work(job):
+            job.enter_stage("diff")
+            job.add_finding({"index": 0, "text": "fee"})
+            job.append_text("Sum")
+            job.append_text("mary")
+            job.set_estimate(0.5)
+            return 42
+        job = _wait(runner.submit("key", work, label="lease"))
+        assert (job.status, job.result) == ("done", 42)
+        snapshot = job.snapshot()
+        assert snapshot["stages"] == ["diff"]
+        assert snapshot["findings"] == [{"index": 0, "text": "fee"}]
+        assert snapshot["partial"] == "Summary"
+        assert snapshot["estimate"] == 0.5
+        assert runner.get(job.id) is job
+
+    def test_runs_off_the_calling_thread(self, runner):
+        release = threading.Event()
+        job = runner.submit("key", lambda job: release.wait(5))
+        assert not job.finished
+        release.set()
+        assert _wait(job).result is True
+
+    def test_same_key_shares_job(self, runner):
+        calls = []
+        first = _wait(runner.submit("key", lambda job: calls.append(1)))
+        assert runner.submit("key", lambda job: calls.append(2)) is first
+        assert runner.find("key") is first
+        assert calls == [1]
+
+    def test_failure_recorded_and_retried(self, runner):
+        def fail(job):
+            raise ValueError("bad pdf")
+        failed = _wait(runner.submit("key", fail))
+        assert (failed.status, failed.error) == ("failed", "bad pdf")
+        retried = _wait(runner.submit("key", lambda job: "ok"))
+        assert retried is not failed and retried.result == "ok"
+
+    def test_finished_jobs_bounded(self):
+        runner = JobRunner(max_workers=1, max_finished=2)
+        jobs = [_wait(runner.submit(str(i), lambda job: None)) for i in range(4)]
+        runner.shutdown()
+        assert [runner.get(job.id) is not None for job in jobs] == [False, False, True, True]
+
+    def test_finished_jobs_have_finish_time(self):
+        class CheckedJob(Job):
+            def __setattr__(self, name, value):
+                if name == "status" and value in ("done", "failed"):
+                    assert self.finished_at is not None, "finished before finished_at was set"
+                super().__setattr__(name, value)
+
+        with patch('app.components.job_runner.Job', CheckedJob):
+            runner = JobRunner(max_workers=1, max_finished=0)
+            jobs = [runner.submit("ok", lambda job: 1), runner.submit("bad", lambda job: 1 / 0)]
+            runner.shutdown()
+        assert [(job.status, job.finished_at is not None) for job in jobs] == [("done", True), ("failed", True)]
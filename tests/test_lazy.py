@@ -0,0 +1,47 @@
+# tests/test_lazy.py
+import os
+import subprocess
+import sys
+from app.components.lazy import import_report, lazy_import, warm_up
+
+APP_DIR = os.path.join(os.path.dirname(__file__), "..", "app")
+
+def _write_module(tmp_path, monkeypatch, name):
+    (tmp_path / f"{name}.py").write_text("VALUE = 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, name, raising=False)
+
+class TestLazyImports:
+    def test_imported_on_first_access(self, tmp_path, monkeypatch):
+        _write_module(tmp_path, monkeypatch, "lazy_probe")
+        module = lazy_import("lazy_probe")
+        assert not module.loaded and "lazy_probe" not in sys.modules
+        assert module.VALUE == 42
+        assert module.loaded
+        assert "lazy_probe" in dict(import_report())
+
+    def test_warm_up(self, tmp_path, monkeypatch):
+        _write_module(tmp_path, monkeypatch, "warm_probe")
+        calls = []
+
+        def broken():
+            raise OSError("model missing")
+        warm_up(["warm_probe"], {"model": lambda: calls.append(1), "other": broken}, background=False)
+        report = dict(import_report())
+        assert "warm_probe" in sys.modules and calls == [1]
+        assert "model" in report
+        assert "other (failed: model missing)" in report
+
+    def test_warm_up_in_background(self, tmp_path, monkeypatch):
+        _write_module(tmp_path, monkeypatch, "background_probe")
+        thread = warm_up(["background_probe"])
+        thread.join(5)
+        assert "background_probe" in sys.modules
+
+    def test_app_start_skips_heavy_modules(self):
+        # The first screen must not pay for spaCy, pandas, groq/httpx or pdfplumber
+        code = ("import sys, main; heavy = ('spacy', 'pandas', 'groq', 'httpx', 'pdfplumber'); "
+                "print(','.join(name for name in heavy if name in sys.modules))")
+        result = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, capture_output=True, text=True, timeout=120)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == ""
@@ -1,7 +1,12 @@
 # tests/test_llm_analyzer.py
+import groq
+import httpx
 import pytest
 from unittest.mock import Mock, patch
+from app.components.cache import DiskCache
+from app.components.instrumentation import Metrics
 from app.components.llm_analyzer import LLMAnalyzer
+from app.components.text_compare import hunk_key
 
 @pytest.fixture
 def mock_groq_response():
@@ -123,4 +128,397 @@ class TestLLMAnalyzer:
         with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
             analyzer = LLMAnalyzer()
             with pytest.raises(Exception):
-                analyzer.analyze_differences(invalid_input, sample_entities)
\ No newline at end of file
+                analyzer.analyze_differences(invalid_input, sample_entities)
+
+class TestLLMAnalyzerConcurrency:
+    def test_invalid_concurrency(self):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with pytest.raises(ValueError):
+                LLMAnalyzer(max_concurrency=0)
+            with pytest.raises(ValueError):
+                LLMAnalyzer(synthesis_fan_in=1)
+
+    def test_concurrent_chunks_keep_order(self, sample_entities):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            analyzer = LLMAnalyzer(max_concurrency=4)
+            chunks = [[f"chunk {i}"] for i in range(20)]
+            with patch.object(analyzer, '_analyze_chunk', side_effect=lambda chunk, entities: chunk[0]):
+                result = analyzer._analyze_chunks(chunks, sample_entities)
+            assert result == [f"chunk {i}" for i in range(20)]
+
+    def test_concurrency_is_bounded(self, sample_entities):
+        import threading
+        import time
+
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def fake_analyze(chunk, entities):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.01)
+            with lock:
+                state["active"] -= 1
+            return chunk[0]
+
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            analyzer = LLMAnalyzer(max_concurrency=3)
+            with patch.object(analyzer, '_analyze_chunk', side_effect=fake_analyze):
+                analyzer._analyze_chunks([[i] for i in range(12)], sample_entities)
+            assert 1 < state["peak"] <= 3
+
+    def test_reduce_analyses_is_multi_level(self):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            analyzer = LLMAnalyzer(synthesis_fan_in=4)
+            calls = []
+
+            def fake_synthesize(analyses):
+                calls.append(len(analyses))
+                return "+".join(analyses)
+
+            with patch.object(analyzer, '_synthesize_analyses', side_effect=fake_synthesize):
+                result = analyzer._reduce_analyses([str(i) for i in range(10)])
+
+            assert all(size <= 4 for size in calls)
+            # 10 analyses -> 3 groups -> 1 final synthesis
+            assert calls == [4, 4, 2, 3]
+            assert result == "0+1+2+3+4+5+6+7+8+9"
+
+
+class TestLLMAnalyzerCache:
+    @pytest.fixture
+    def cache(self, tmp_path):
+        from app.components.cache import DiskCache
+        return DiskCache(str(tmp_path / "llm.sqlite"))
+
+    def test_chunk_analysis_cached(self, cache, mock_groq_response, sample_differences, sample_entities):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with patch('app.components.llm_analyzer.Groq') as mock_groq:
+                mock_groq.return_value.chat.completions.create.return_value = mock_groq_response
+                analyzer = LLMAnalyzer(cache=cache)
+                first = analyzer._analyze_chunk(sample_differences, sample_entities)
+                second = analyzer._analyze_chunk(sample_differences, sample_entities)
+                assert first == second == "Test analysis response"
+                mock_groq.return_value.chat.completions.create.assert_called_once()
+                assert cache.hits == 1
+                assert cache.misses == 1
+
+    def test_cache_shared_across_instances(self, cache, mock_groq_response):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with patch('app.components.llm_analyzer.Groq') as mock_groq:
+                mock_groq.return_value.chat.completions.create.return_value = mock_groq_response
+                LLMAnalyzer(cache=cache)._synthesize_analyses(["Analysis 1"])
+                LLMAnalyzer(cache=cache)._synthesize_analyses(["Analysis 1"])
+                mock_groq.return_value.chat.completions.create.assert_called_once()
+
+    def test_only_changed_chunk_is_requested(self, cache):
+        import spacy
+        from app.components.ner_extractor import NERExtractor
+        from app.components.text_compare import TextComparer
+        nlp = spacy.blank("en")
+        nlp.add_pipe("entity_ruler").add_patterns([{"label": "MONEY", "pattern": [{"TEXT": "$"}, {"LIKE_NUM": True}]}])
+        with patch('spacy.load'):
+            extractor = NERExtractor()
+        extractor.nlp = nlp
+        template = [f"{i}. The tenant pays $ {i}00 on day {i % 28 + 1}." for i in range(60)]
+        contract = [line.replace("00 on", "50 on") if i in (10, 25, 40, 55) else line for i, line in enumerate(template)]
+
+        def analyze(analyzer, contract_lines):
+            diff, _, _ = TextComparer.compare_texts("\n".join(template), "\n".join(contract_lines))
+            hunks = TextComparer.compact_diff(diff)
+            _, right = extractor.extract_hunk_entities(hunks)
+            by_key = {hunk.key: entities for hunk, entities in zip(hunks, right)}
+            events = list(analyzer.stream_hunk_analysis(
+                [hunk.to_lines() for hunk in hunks], lambda keys: extractor.merge_entities([by_key[key] for key in keys])))
+            return hunks, events
+
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with patch('app.components.llm_analyzer.Groq') as mock_groq:
+                create = mock_groq.return_value.chat.completions.create
+                create.side_effect = lambda **kwargs: iter(_stream_chunks("Summary")) if kwargs.get("stream") \
+                    else Mock(choices=[Mock(message=Mock(content=f"Analysis {create.call_count}"))])
+                analyzer = LLMAnalyzer(cache=cache, token_budget=100)  # One hunk per chunk
+                hunks, _ = analyze(analyzer, contract)
+                assert len(hunks) == 4 and "MONEY" in str(create.call_args_list[0])
+                assert create.call_count == 5  # Four chunks and the synthesis
+
+                # A line inserted near the top shifts every later hunk's line numbers
+                revised, _ = analyze(analyzer, ["Recital: the parties agree as follows."] + contract)
+                assert len(revised) == 5
+                assert [hunk.header for hunk in revised[1:]] != [hunk.header for hunk in hunks]
+                assert create.call_count == 5 + 2  # The new chunk and the synthesis
+
+    def test_cache_key_depends_on_request_parameters(self, cache):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            analyzer = LLMAnalyzer(cache=cache)
+            base = analyzer._cache_key("system", "prompt", 100)
+            assert base == analyzer._cache_key("system", "prompt", 100)
+            assert base != analyzer._cache_key("system", "prompt", 200)
+            assert base != analyzer._cache_key("system", "other prompt", 100)
+            analyzer.MODEL_NAME = "other-model"
+            assert base != analyzer._cache_key("system", "prompt", 100)
+
+
+class TestTokenBudgetChunking:
+    def test_invalid_token_budget(self):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with pytest.raises(ValueError):
+                LLMAnalyzer(token_budget=0)
+
+    def test_chunks_respect_budget(self):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            analyzer = LLMAnalyzer(token_budget=50)
+            differences = [f"+ added line number {i}" for i in range(100)]
+            chunks = analyzer._chunk_differences(differences)
+            assert len(chunks) > 1
+            assert [line for chunk in chunks for line in chunk] == differences
+            for chunk in chunks:
+                assert sum(analyzer._estimate_tokens(line) for line in chunk) <= 50
+
+    def test_hunks_kept_together(self):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            analyzer = LLMAnalyzer(token_budget=30)
+            hunk = ["@@ -1,2 +1,2 @@", "- old clause text", "+ new clause text"]
+            differences = hunk * 4
+            chunks = analyzer._chunk_differences(differences)
+            for chunk in chunks:
+                assert chunk[0].startswith("@@")
+                assert len(chunk) % 3 == 0
+
+    def test_small_payload_single_request(self, mock_groq_response, sample_entities):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with patch('app.components.llm_analyzer.Groq') as mock_groq:
+                mock_groq.return_value.chat.completions.create.return_value = mock_groq_response
+                analyzer = LLMAnalyzer()
+                # Many short lines but well within the token budget
+                analyzer.analyze_differences(["+ x"] * 1000, sample_entities)
+                mock_groq.return_value.chat.completions.create.assert_called_once()
+
+
+class TestEntityScoping:
+    def test_entities_for_chunk(self, sample_entities):
+        chunk = ["- Original: Salary of $50,000", "+ Modified: Salary of $60,000 paid by ACME Corp"]
+        scoped = LLMAnalyzer._entities_for_chunk(chunk, sample_entities)
+        assert scoped == {"MONEY": ["$50,000", "$60,000"], "ORG": ["ACME Corp"]}
+
+    def test_scoped_prompt(self, mock_groq_response, sample_entities):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with patch('app.components.llm_analyzer.Groq') as mock_groq:
+                create = mock_groq.return_value.chat.completions.create
+                create.return_value = mock_groq_response
+                analyzer = LLMAnalyzer(scope_entities=True)
+                analyzer._analyze_chunk(["+ John Doe signs"], sample_entities)
+                prompt = create.call_args.kwargs["messages"][1]["content"]
+                assert "John Doe" in prompt
+                assert "ACME Corp" not in prompt
+
+def _status_error(error_cls, status_code, headers=None):
+    request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+    response = httpx.Response(status_code, headers=headers or {}, request=request)
+    return error_cls("error", response=response, body=None)
+
+class TestRetries:
+    def test_invalid_max_retries(self):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with pytest.raises(ValueError):
+                LLMAnalyzer(max_retries=-1)
+
+    def test_sdk_retries_disabled(self):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with patch('app.components.llm_analyzer.Groq') as mock_groq:
+                LLMAnalyzer()
+                assert mock_groq.call_args.kwargs["max_retries"] == 0
+
+    def test_rate_limit_retried_with_retry_after(self, mock_groq_response, sample_differences, sample_entities):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with patch('app.components.llm_analyzer.Groq') as mock_groq, \
+                    patch('app.components.llm_analyzer.time.sleep') as sleep:
+                create = mock_groq.return_value.chat.completions.create
+                create.side_effect = [
+                    _status_error(groq.RateLimitError, 429, {"retry-after": "2"}),
+                    _status_error(groq.InternalServerError, 503),
+                    mock_groq_response,
+                ]
+                metrics = Metrics()
+                with metrics.activate():
+                    result = LLMAnalyzer().analyze_differences(sample_differences, sample_entities)
+                assert result == "Test analysis response"
+                assert create.call_count == 3
+                assert sleep.call_args_list[0].args[0] >= 2
+                assert metrics.counters["llm_retries"] == 2
+                assert metrics.counters["llm_requests"] == 1
+
+    def test_client_errors_not_retried(self, sample_differences, sample_entities):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with patch('app.components.llm_analyzer.Groq') as mock_groq, \
+                    patch('app.components.llm_analyzer.time.sleep') as sleep:
+                create = mock_groq.return_value.chat.completions.create
+                create.side_effect = _status_error(groq.BadRequestError, 400)
+                with pytest.raises(RuntimeError):
+                    LLMAnalyzer().analyze_differences(sample_differences, sample_entities)
+                create.assert_called_once()
+                sleep.assert_not_called()
+
+    def test_gives_up_after_max_retries(self, sample_differences, sample_entities):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with patch('app.components.llm_analyzer.Groq') as mock_groq, \
+                    patch('app.components.llm_analyzer.time.sleep'):
+                create = mock_groq.return_value.chat.completions.create
+                create.side_effect = _status_error(groq.RateLimitError, 429)
+                with pytest.raises(RuntimeError):
+                    LLMAnalyzer(max_retries=2).analyze_differences(sample_differences, sample_entities)
+                assert create.call_count == 3
+
+    def test_requests_go_through_rate_limiter(self, mock_groq_response, sample_differences, sample_entities):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with patch('app.components.llm_analyzer.Groq') as mock_groq:
+                mock_groq.return_value.chat.completions.create.return_value = mock_groq_response
+                limiter = Mock()
+                limiter.acquire.return_value = 0
+                LLMAnalyzer(rate_limiter=limiter).analyze_differences(sample_differences, sample_entities)
+                limiter.acquire.assert_called_once()
+                assert limiter.acquire.call_args.args[0] > 0
+
+def _stream_chunks(*pieces):
+    return [Mock(choices=[Mock(delta=Mock(content=piece))], x_groq=None) for piece in pieces]
+
+class TestStreaming:
+    def test_single_chunk_streams_tokens(self, sample_differences, sample_entities):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with patch('app.components.llm_analyzer.Groq') as mock_groq:
+                create = mock_groq.return_value.chat.completions.create
+                create.return_value = iter(_stream_chunks("Salary ", "raised", None))
+                events = list(LLMAnalyzer().stream_analysis(sample_differences, sample_entities))
+                assert events == [
+                    {"type": "token", "text": "Salary "},
+                    {"type": "token", "text": "raised"},
+                    {"type": "done", "text": "Salary raised"},
+                ]
+                assert create.call_args.kwargs["stream"] is True
+
+    def test_chunk_findings_before_synthesis(self, mock_groq_response, sample_entities):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with patch('app.components.llm_analyzer.Groq') as mock_groq:
+                create = mock_groq.return_value.chat.completions.create
+
+                def respond(**kwargs):
+                    if kwargs.get("stream"):
+                        return iter(_stream_chunks("Summary"))
+                    return mock_groq_response
+                create.side_effect = respond
+                analyzer = LLMAnalyzer(max_concurrency=3, token_budget=5)
+                differences = [f"@@ -{i},1 +{i},1 @@\n+ clause {i}" for i in range(4)]
+                events = list(analyzer.stream_analysis(differences, sample_entities))
+                chunk_events = [event for event in events if event["type"] == "chunk"]
+                assert sorted(event["index"] for event in chunk_events) == [0, 1, 2, 3]
+                assert all(event["total"] == 4 for event in chunk_events)
+                assert events[-1] == {"type": "done", "text": "Summary"}
+                assert events.index(chunk_events[-1]) < events.index({"type": "token", "text": "Summary"})
+
+    def test_streamed_response_cached(self, tmp_path, sample_differences, sample_entities):
+        cache = DiskCache(str(tmp_path / "llm.sqlite"))
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with patch('app.components.llm_analyzer.Groq') as mock_groq:
+                create = mock_groq.return_value.chat.completions.create
+                create.return_value = iter(_stream_chunks("Cached ", "text"))
+                analyzer = LLMAnalyzer(cache=cache)
+                list(analyzer.stream_analysis(sample_differences, sample_entities))
+                events = list(analyzer.stream_analysis(sample_differences, sample_entities))
+                assert events == [{"type": "token", "text": "Cached text"}, {"type": "done", "text": "Cached text"}]
+                create.assert_called_once()
+                assert analyzer.analyze_differences(sample_differences, sample_entities) == "Cached text"
+
+    def test_unchanged_hunks_reuse_previous_chunks(self, mock_groq_response, sample_entities):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with patch('app.components.llm_analyzer.Groq') as mock_groq:
+                create = mock_groq.return_value.chat.completions.create
+
+                def respond(**kwargs):
+                    if kwargs.get("stream"):
+                        return iter(_stream_chunks("Summary"))
+                    return mock_groq_response
+                create.side_effect = respond
+                analyzer = LLMAnalyzer(token_budget=5)
+                hunks = [[f"@@ clause {i} @@\n+ clause {i}"] for i in range(4)]
+                first = list(analyzer.stream_hunk_analysis(hunks, sample_entities))[-1]
+                assert len(first["chunks"]) == 4
+
+                create.reset_mock()
+                revised = hunks[:2] + [["@@ clause 2 @@\n+ clause 2 revised"]] + hunks[3:]
+                events = list(analyzer.stream_hunk_analysis(revised, sample_entities, first["chunks"]))
+                chunk_events = sorted((event for event in events if event["type"] == "chunk"), key=lambda e: e["index"])
+                assert [event["reused"] for event in chunk_events] == [True, True, False, True]
+                # One chunk analysis plus the streamed synthesis
+                assert create.call_count == 2
+                assert events[-1]["chunks"][:2] == first["chunks"][:2]
+
+    def test_fully_reused_single_chunk_makes_no_request(self, sample_entities):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with patch('app.components.llm_analyzer.Groq') as mock_groq:
+                create = mock_groq.return_value.chat.completions.create
+                create.return_value = iter(_stream_chunks("Fee raised"))
+                analyzer = LLMAnalyzer()
+                hunks = [["@@ clause 2 @@", "- Fee $1", "+ Fee $2"]]
+                done = list(analyzer.stream_hunk_analysis(hunks, sample_entities))[-1]
+                events = list(analyzer.stream_hunk_analysis(hunks, sample_entities, done["chunks"]))
+                assert events[-1] == done
+                create.assert_called_once()
+
+    def test_stream_errors_wrapped(self, sample_entities):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with patch('app.components.llm_analyzer.Groq'):
+                with pytest.raises(RuntimeError):
+                    list(LLMAnalyzer().stream_analysis("not a list", sample_entities))
+
+
+class TestHunkStream:
+    def test_chunks_analyzed_in_order_and_reduced(self):
+        from app.components.text_compare import DiffHunk
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            analyzer = LLMAnalyzer(token_budget=10, max_concurrency=2)
+            produced = []
+
+            def hunks():
+                for i in range(6):
+                    produced.append(i)
+                    hunk = DiffHunk(i + 1, i + 1)
+                    hunk.add(f"+ clause {i}")
+                    yield hunk
+
+            seen = []
+            with patch.object(analyzer, '_analyze_chunk', side_effect=lambda lines, entities: lines[-1]), \
+                 patch.object(analyzer, '_reduce_analyses', side_effect=lambda analyses: "|".join(analyses)):
+                result = analyzer.analyze_hunk_stream(
+                    hunks(), entities_for=lambda chunk: {}, on_chunk=lambda index, text: seen.append((index, len(produced))))
+            assert result == "|".join(f"+ clause {i}" for i in range(6))
+            assert [index for index, _ in seen] == list(range(6))
+            # The first chunk completes before the hunk generator is exhausted
+            assert seen[0][1] < 6
+
+    def test_no_hunks(self):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            analyzer = LLMAnalyzer()
+            with patch.object(analyzer, '_analyze_chunk', return_value="No changes") as analyze:
+                assert analyzer.analyze_hunk_stream(iter(())) == "No changes"
+            analyze.assert_called_once_with([], {})
+
+    def test_entities_resolved_per_chunk(self):
+        with patch.dict('os.environ', {'GROQ_API_KEY': 'test-key'}):
+            with patch('app.components.llm_analyzer.Groq') as mock_groq:
+                mock_groq.return_value.chat.completions.create.return_value = iter(_stream_chunks("Summary"))
+                analyzer = LLMAnalyzer(token_budget=10, max_concurrency=2)
+                hunks = [[f"@@ clause {i} @@", f"+ clause {i}"] for i in range(3)]
+                requested = []
+
+                def entities_for(keys):
+                    requested.append(keys)
+                    return {"ORG": [f"Org {len(requested)}"]}
+
+                prompts = {}
+                with patch.object(analyzer, '_analyze_chunk',
+                                  side_effect=lambda chunk, entities: prompts.setdefault(chunk[0], entities)["ORG"][0]):
+                    events = list(analyzer.stream_hunk_analysis(hunks, entities_for))
+                assert sorted(key for keys in requested for key in keys) == sorted(hunk_key(hunk) for hunk in hunks)
+                assert len(prompts) == 3 and len({entities["ORG"][0] for entities in prompts.values()}) == 3
+                assert events[-1]["text"] == "Summary"
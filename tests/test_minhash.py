@@ -0,0 +1,70 @@
+# tests/test_minhash.py
+import random
+import pytest
+from app.components.minhash import LSHIndex, MinHash, shingle_hashes
+
+WORDS = ["party", "term", "fee", "notice", "lease", "tenant", "landlord", "payment", "clause", "law",
+         "agreement", "services", "confidential", "breach", "month", "year", "written", "days", "shall", "may"]
+
+def _document(seed: int, words: int = 600) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) + str(rng.randint(0, 50)) for _ in range(words))
+
+def _edit(text: str, rate: float, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return " ".join(f"changed{rng.randint(0, 10**6)}" if rng.random() < rate else word for word in text.split())
+
+def _exact_jaccard(a: str, b: str) -> float:
+    left, right = set(shingle_hashes(a).tolist()), set(shingle_hashes(b).tolist())
+    return len(left & right) / len(left | right)
+
+class TestMinHash:
+    def test_identical_and_rewrapped(self):
+        text = _document(1)
+        assert MinHash.from_text(text).jaccard(MinHash.from_text(text.replace(" ", "\n", 50).upper())) == 1.0
+
+    def test_estimate_close_to_exact(self):
+        text = _document(2)
+        edited = _edit(text, 0.1)
+        estimate = MinHash.from_text(text).jaccard(MinHash.from_text(edited))
+        assert estimate == pytest.approx(_exact_jaccard(text, edited), abs=0.12)
+
+    def test_unrelated_documents(self):
+        assert MinHash.from_text(_document(3)).jaccard(MinHash.from_text(_document(4))) < 0.1
+
+    def test_roundtrip(self):
+        minhash = MinHash.from_text(_document(5))
+        assert MinHash.from_list(minhash.to_list()).jaccard(minhash) == 1.0
+
+    def test_block_processing_matches(self, monkeypatch):
+        text = _document(6, words=3000)
+        whole = MinHash.from_text(text)
+        monkeypatch.setattr("app.components.minhash.BLOCK_SHINGLES", 7)
+        assert MinHash.from_text(text).to_list() == whole.to_list()
+
+class TestLSHIndex:
+    def test_invalid_bands(self):
+        with pytest.raises(ValueError):
+            LSHIndex(num_perm=128, bands=30)
+
+    def test_top_k(self):
+        index = LSHIndex()
+        templates = {f"template-{i}": _document(100 + i) for i in range(50)}
+        for key, text in templates.items():
+            index.add(key, MinHash.from_text(text))
+        contract = _edit(templates["template-7"], 0.05)
+        results = index.query(MinHash.from_text(contract), k=3)
+        assert results[0][0] == "template-7"
+        assert results[0][1] > 0.6
+        assert all(score < 0.2 for _, score in results[1:])
+
+    def test_add_replace_remove(self):
+        index = LSHIndex()
+        first, second = MinHash.from_text(_document(8)), MinHash.from_text(_document(9))
+        index.add("a", first)
+        index.add("a", second)
+        assert len(index) == 1
+        assert index.query(second)[0] == ("a", 1.0)
+        index.remove("a")
+        assert "a" not in index
+        assert index.query(second) == []
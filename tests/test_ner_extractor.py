@@ -53,4 +53,133 @@ class TestNERExtractor:
         extractor.nlp = lambda x: Mock(ents=[])
         
         result = extractor.extract_entities("Text with no named entities")
-        assert result == {}
\ No newline at end of file
+        assert result == {}
+
+
+@pytest.fixture
+def ruler_nlp():
+    import spacy
+    nlp = spacy.blank("en")
+    nlp.add_pipe("entity_ruler").add_patterns([
+        {"label": "ORG", "pattern": "ACME Corp"},
+        {"label": "PERSON", "pattern": "John Doe"},
+    ])
+    return nlp
+
+class TestSharedModel:
+    @patch('spacy.load')
+    def test_shared_loads_once(self, mock_load):
+        from app.components import ner_extractor
+        with patch.dict(ner_extractor._shared_extractors, clear=True):
+            first = NERExtractor.shared()
+            second = NERExtractor.shared()
+            assert first is second
+            mock_load.assert_called_once_with(
+                "en_core_web_sm", disable=list(ner_extractor.NER_UNUSED_COMPONENTS))
+
+    @patch('spacy.load')
+    def test_shared_keyed_by_disable(self, mock_load):
+        from app.components import ner_extractor
+        with patch.dict(ner_extractor._shared_extractors, clear=True):
+            assert NERExtractor.shared(disable=None) is not NERExtractor.shared()
+            assert mock_load.call_count == 2
+
+class TestBatchedExtraction:
+    def test_split_segments(self):
+        from app.components.ner_extractor import split_segments
+        text = "First paragraph.\n\nSecond paragraph here.\n\nThird."
+        segments = split_segments(text, max_chars=25)
+        assert "".join(segment for _, segment in segments) == text
+        for offset, segment in segments:
+            assert len(segment) <= 25
+            assert text[offset:offset + len(segment)] == segment
+        assert segments[0][1] == "First paragraph.\n\n"
+
+    def test_split_segments_without_separators(self):
+        from app.components.ner_extractor import split_segments
+        segments = split_segments("x" * 25, max_chars=10)
+        assert [len(segment) for _, segment in segments] == [10, 10, 5]
+
+    @patch('spacy.load')
+    def test_long_text_offsets(self, mock_load, ruler_nlp, monkeypatch):
+        monkeypatch.setattr("app.components.ner_extractor.MAX_SINGLE_DOC_CHARS", 50)
+        monkeypatch.setattr("app.components.ner_extractor.SEGMENT_CHARS", 40)
+        extractor = NERExtractor()
+        extractor.nlp = ruler_nlp
+        text = "\n\n".join(f"Clause {i}: ACME Corp pays John Doe." for i in range(20))
+
+        spans = extractor.extract_entity_spans(text)
+        assert len(spans) == 40
+        for label, value, start, end in spans:
+            assert text[start:end] == value
+        assert extractor.extract_entities(text) == {"ORG": ["ACME Corp"] * 20, "PERSON": ["John Doe"] * 20}
+
+    @patch('spacy.load')
+    def test_batched_matches_single_pass(self, mock_load, ruler_nlp, monkeypatch):
+        extractor = NERExtractor()
+        extractor.nlp = ruler_nlp
+        text = "\n".join(f"Line {i} mentions ACME Corp." for i in range(30))
+        single = extractor.extract_entity_spans(text)
+
+        monkeypatch.setattr("app.components.ner_extractor.MAX_SINGLE_DOC_CHARS", 100)
+        monkeypatch.setattr("app.components.ner_extractor.SEGMENT_CHARS", 100)
+        assert extractor.extract_entity_spans(text) == single
+
+class TestDiffScopedEntities:
+    @pytest.fixture
+    def hunks(self):
+        from app.components.text_compare import TextComparer
+        template = "Parties: ACME Corp and John Doe.\nFee: fixed.\nTerm: one year.\nSigned."
+        edited = "Parties: ACME Corp and John Doe.\nFee: fixed.\nTerm: one year.\nWitness: Jane Roe.\nSigned."
+        diff, _, _ = TextComparer.compare_texts(template, edited)
+        return TextComparer.compact_diff(diff, context=1)
+
+    @pytest.fixture
+    def extractor(self, ruler_nlp):
+        ruler_nlp.get_pipe("entity_ruler").add_patterns([{"label": "PERSON", "pattern": "Jane Roe"}])
+        with patch('spacy.load'):
+            extractor = NERExtractor()
+        extractor.nlp = ruler_nlp
+        return extractor
+
+    def test_hunk_sides(self, hunks):
+        from app.components.ner_extractor import hunk_sides
+        left, right = hunk_sides(hunks[0])
+        assert left == "Term: one year.\nSigned."
+        assert right == "Term: one year.\nWitness: Jane Roe.\nSigned."
+
+    def test_only_hunks_processed(self, extractor, hunks):
+        left, right = extractor.extract_hunk_entities(hunks)
+        # Unchanged first line is outside the hunk, so its entities are never extracted
+        assert left == [{}]
+        assert right == [{"PERSON": ["Jane Roe"]}]
+
+    def test_known_hunks_skipped(self, extractor, hunks):
+        known = {hunks[0].key: [{"ORG": ["Stored"]}, {"PERSON": ["Stored"]}]}
+        with patch.object(extractor, "_entities_by_text", wraps=extractor._entities_by_text) as run:
+            left, right = extractor.extract_hunk_entities(hunks, known)
+        assert (left, right) == ([{"ORG": ["Stored"]}], [{"PERSON": ["Stored"]}])
+        assert all(call.args[0] == [] for call in run.call_args_list)
+
+    def test_template_side_cached(self, extractor, hunks):
+        extractor.extract_hunk_entities(hunks)
+        extractor.extract_hunk_entities(hunks)
+        assert extractor.template_cache.hits == 1
+
+    def test_entity_delta(self):
+        left = [{"MONEY": ["$50,000"], "ORG": ["ACME Corp"]}, {"PERSON": ["John Doe"]}]
+        right = [{"MONEY": ["$60,000"], "ORG": ["ACME Corp"]}, {"DATE": ["2025"], "GPE": ["Ohio"]}]
+        delta = NERExtractor.entity_delta(left, right)
+        assert delta == {
+            "added": {"DATE": ["2025"]},
+            "removed": {"PERSON": ["John Doe"]},
+            "changed": {"MONEY": [("$50,000", "$60,000")]},
+        }
+
+    def test_merge_entities(self):
+        merged = NERExtractor.merge_entities([{"ORG": ["ACME", "Beta"]}, {"ORG": ["ACME"], "DATE": ["2025"]}])
+        assert merged == {"ORG": ["ACME", "Beta"], "DATE": ["2025"]}
+
+    def test_merge_many_entities(self):
+        dicts = [{"MONEY": [f"${i}", f"${i + 1}", "$0"]} for i in range(20000)]
+        assert NERExtractor.merge_entities(dicts)["MONEY"] == [f"${i}" for i in range(20001)]
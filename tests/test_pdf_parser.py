@@ -1,7 +1,8 @@
+import os
 import pytest
 from unittest.mock import Mock, patch, mock_open
 from io import BytesIO
-from app.components.pdf_parser import PDFParser
+from app.components.pdf_parser import PDFParser, get_shared_pool
 
 @pytest.fixture
 def sample_pdf_content():
@@ -62,4 +63,92 @@ class TestPDFParser:
     def test_file_not_found(self):
         parser = PDFParser()
         with pytest.raises(Exception):
-            parser.extract_text("nonexistent.pdf")
\ No newline at end of file
+            parser.extract_text("nonexistent.pdf")
+    @patch('pdfplumber.open')
+    def test_page_without_text(self, mock_open):
+        mock_pdf = Mock()
+        mock_pdf.pages = [
+            Mock(extract_text=lambda: "Page 1 content"),
+            Mock(extract_text=lambda: None),
+            Mock(extract_text=lambda: "Page 3 content")
+        ]
+        mock_open.return_value.__enter__.return_value = mock_pdf
+
+        result = PDFParser().extract_text("scanned.pdf")
+        assert result == "Page 1 content\n\nPage 3 content"
+
+    @patch('pdfplumber.open')
+    def test_iter_pages_is_lazy(self, mock_open):
+        second_page = Mock(extract_text=Mock(return_value="Page 2 content"))
+        mock_pdf = Mock()
+        mock_pdf.pages = [Mock(extract_text=lambda: "Page 1 content"), second_page]
+        mock_open.return_value.__enter__.return_value = mock_pdf
+
+        pages = PDFParser().iter_pages("dummy.pdf")
+        assert next(pages) == "Page 1 content"
+        second_page.extract_text.assert_not_called()
+        assert list(pages) == ["Page 2 content"]
+
+    def test_invalid_options(self):
+        with pytest.raises(ValueError):
+            PDFParser(backend="unknown")
+        with pytest.raises(ValueError):
+            PDFParser(workers=0)
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "sample_contracts")
+SAMPLE_PDF = os.path.join(SAMPLE_DIR, "Service_Contract_Template.pdf")
+
+class TestPDFParserBackends:
+    def test_pypdfium2_matches_pdfplumber(self):
+        pytest.importorskip("pypdfium2")
+        # Single-column text: both backends agree exactly; layouts can differ elsewhere
+        path = os.path.join(SAMPLE_DIR, "Lease_Contract.pdf")
+        plumber_text = PDFParser().extract_text(path)
+        pdfium_text = PDFParser(backend="pypdfium2").extract_text(path)
+        assert pdfium_text == plumber_text
+
+    def test_bytes_input(self):
+        with open(SAMPLE_PDF, "rb") as f:
+            data = f.read()
+        assert PDFParser().extract_text(BytesIO(data)) == PDFParser().extract_text(SAMPLE_PDF)
+
+    def test_process_pool_keeps_page_order(self, monkeypatch):
+        monkeypatch.setattr("app.components.pdf_parser.MIN_PAGES_PER_WORKER", 1)
+        with open(SAMPLE_PDF, "rb") as f:
+            data = f.read()
+        serial = PDFParser().extract_text(SAMPLE_PDF)
+        assert PDFParser(workers=2).extract_text(data) == serial
+        assert PDFParser(workers=2).extract_text(BytesIO(data)) == serial
+
+    def test_process_pool_shared_and_spawned(self):
+        pool = get_shared_pool(2)
+        assert get_shared_pool(2) is pool
+        assert pool._mp_context.get_start_method() == "spawn"
+
+class TestPDFParserCache:
+    @pytest.fixture
+    def cache(self):
+        from app.components.cache import MemoryCache, TieredCache
+        return TieredCache(MemoryCache())
+
+    def test_cache_skips_extraction(self, cache):
+        with open(SAMPLE_PDF, "rb") as f:
+            data = f.read()
+        first = PDFParser(cache=cache).extract_text(BytesIO(data))
+        with patch('pdfplumber.open') as mock_open:
+            second = PDFParser(cache=cache).extract_text(BytesIO(data))
+            mock_open.assert_not_called()
+        assert first == second
+        assert cache.memory.hits == 1
+
+    def test_key_depends_on_backend(self):
+        data = b"%PDF-1.4 sample"
+        assert PDFParser().cache_key(data) != PDFParser(backend="pypdfium2").cache_key(data)
+        assert PDFParser().cache_key(data) == PDFParser().cache_key(data)
+        assert PDFParser().cache_key(data) != PDFParser().cache_key(data + b" ")
+
+    def test_path_and_upload_share_entry(self, cache):
+        PDFParser(cache=cache).extract_text(SAMPLE_PDF)
+        with open(SAMPLE_PDF, "rb") as f:
+            PDFParser(cache=cache).extract_text(f)
+        assert cache.memory.hits == 1
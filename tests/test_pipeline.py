@@ -0,0 +1,179 @@
+# tests/test_pipeline.py
+import os
+import threading
+import pytest
+from unittest.mock import Mock, patch
+from app.components.job_runner import Job
+from app.components.ner_extractor import NERExtractor
+from app.components.pdf_parser import PDFParser
+from app.components.pipeline import ContractPipeline, analysis_key
+from app.components.revision_store import RevisionStore
+from app.components.template_store import TemplateStore
+from app.components.text_compare import TextComparer, hunk_key
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "sample_contracts")
+
+def _read(name):
+    with open(os.path.join(SAMPLE_DIR, name), "rb") as f:
+        return f.read()
+
+@pytest.fixture
+def extractor():
+    import spacy
+    nlp = spacy.blank("en")
+    nlp.add_pipe("entity_ruler").add_patterns([{"label": "MONEY", "pattern": [{"TEXT": "$"}, {"LIKE_NUM": True}]}])
+    with patch('spacy.load'):
+        extractor = NERExtractor()
+    extractor.nlp = nlp
+    with patch('app.components.pipeline.NERExtractor.shared', return_value=extractor):
+        yield extractor
+
+def _stream(hunks, entities, previous_chunks=None):
+    yield {"type": "chunk", "index": 0, "total": 1, "text": "Rent changed", "reused": bool(previous_chunks)}
+    yield {"type": "token", "text": "Summary"}
+    yield {"type": "done", "text": "Summary", "chunks": [{"hunks": ["k"], "analysis": "Rent changed"}]}
+
+@pytest.fixture
+def analyzer():
+    analyzer = Mock(cache=None)
+    analyzer.stream_hunk_analysis.side_effect = _stream
+    return analyzer
+
+@pytest.fixture
+def pipeline(tmp_path, analyzer):
+    return ContractPipeline(TemplateStore(str(tmp_path / "templates")), analyzer, RevisionStore(str(tmp_path / "revisions")))
+
+class TestContractPipeline:
+    def test_analysis_key(self):
+        assert analysis_key("t", "c", "lease") == analysis_key("t", "c", "lease")
+        assert analysis_key("t", "c", "lease") != analysis_key("t", "c", "lease", clause_diff=False)
+        assert analysis_key("t", "c") != analysis_key("c", "t")
+
+    def test_run_reports_progress_and_result(self, pipeline, extractor):
+        job = Job("key")
+        result = pipeline.run(_read("Lease_Contract.pdf"), _read("Lease_Contract_Template.pdf"),
+                              template_name="lease.pdf", contract_id="lease", job=job)
+        assert result["analysis"] == "Summary"
+        assert result["template_name"] == "lease.pdf"
+        assert 0 < result["similarity"] < 1
+        assert result["revision"] == 1 and result["previous_revision"] is None
+        assert result["side_by_side"].row_count > 0
+        assert set(job.stages) >= {"pdf_extract", "diff", "clause_diff", "ner"}
+        assert job.partial == "Summary" and len(job.findings) == 1
+        assert result["metrics"]["stages"]["diff"]["calls"] >= 1
+
+    def test_next_revision_gets_previous_artifacts(self, pipeline, extractor, analyzer):
+        template = _read("Lease_Contract_Template.pdf")
+        pipeline.run(_read("Lease_Contract.pdf"), template, contract_id="lease")
+        template_hash = TemplateStore.template_key(template, PDFParser())
+        result = pipeline.run(_read("Lease_Contract.pdf") + b"\n", template_hash=template_hash, contract_id="lease")
+        assert result["revision"] == 2 and result["previous_revision"] == 1
+        assert result["revision_changes"] == []
+        assert analyzer.stream_hunk_analysis.call_args.args[2] == [{"hunks": ["k"], "analysis": "Rent changed"}]
+
+    def test_rerun_does_not_compare_with_itself(self, pipeline, extractor):
+        contract, template = _read("Lease_Contract.pdf"), _read("Lease_Contract_Template.pdf")
+        pipeline.run(contract, template, contract_id="lease")
+        result = pipeline.run(contract, template, contract_id="lease")
+        assert result["revision"] == 1 and result["previous_revision"] is None
+        assert result["revision_changes"] is None
+
+    def test_llm_does_not_wait_for_full_diff(self, pipeline, extractor, analyzer):
+        analyzed = threading.Event()
+        compare = TextComparer.compare_with_template
+
+        def slow_compare(*args, **kwargs):
+            assert analyzed.wait(5), "LLM stage waited for the line diff"
+            return compare(*args, **kwargs)
+
+        def stream(*args):
+            analyzed.set()
+            yield from _stream(*args)
+        analyzer.stream_hunk_analysis.side_effect = stream
+        with patch('app.components.pipeline.TextComparer.compare_with_template', side_effect=slow_compare):
+            with pipeline.schedule(_read("Lease_Contract.pdf"), _read("Lease_Contract_Template.pdf")) as stages:
+                assert stages.result("analysis", timeout=5)[1]["text"] == "Summary"
+                assert stages.result("result", timeout=5)["similarity"] > 0
+
+    def test_estimate_published_before_diff(self, pipeline, extractor):
+        job = Job("key")
+        compare = TextComparer.compare_with_template
+
+        def slow_compare(*args, **kwargs):
+            for _ in range(500):
+                if job.estimate is not None:
+                    return compare(*args, **kwargs)
+                threading.Event().wait(0.01)
+            raise AssertionError("estimate waited for the line diff")
+
+        with patch('app.components.pipeline.TextComparer.compare_with_template', side_effect=slow_compare):
+            result = pipeline.run(_read("Lease_Contract.pdf"), _read("Lease_Contract_Template.pdf"), job=job)
+        assert 0 < job.estimate <= 1
+        assert result["estimate"] == job.estimate
+
+    def test_llm_starts_before_ner_finishes(self, pipeline, extractor, analyzer, monkeypatch):
+        monkeypatch.setattr('app.components.pipeline.NER_BATCH_HUNKS', 1)
+        first_chunk_sent = threading.Event()
+        extract = extractor.extract_hunk_entities
+        batches = []
+
+        def slow_extract(hunks, known=None):
+            batches.append(hunks)
+            if len(batches) == 2:
+                assert first_chunk_sent.wait(5), "LLM stage waited for NER on every hunk"
+            return extract(hunks, known)
+
+        def stream(hunks, entities, previous_chunks=None):
+            entities([hunk_key(hunks[0])])
+            first_chunk_sent.set()
+            yield from _stream(hunks, entities, previous_chunks)
+        analyzer.stream_hunk_analysis.side_effect = stream
+        with patch.object(extractor, 'extract_hunk_entities', side_effect=slow_extract):
+            result = pipeline.run(_read("Lease_Contract.pdf"), _read("Lease_Contract_Template.pdf"))
+        assert result["analysis"] == "Summary"
+        assert len(batches) > 1
+
+    def test_prepare_only_without_ner(self, analyzer):
+        pipeline = ContractPipeline(TemplateStore(None), analyzer, run_ner=False)
+        with patch('app.components.pipeline.NERExtractor.shared') as shared:
+            with pipeline.schedule(_read("Lease_Contract.pdf"), _read("Lease_Contract_Template.pdf"),
+                                   prepare_only=True) as stages:
+                hunks = stages.result("hunks", timeout=5)
+                assert stages.result("entities", timeout=5)[2:] == ({}, None)
+        shared.assert_not_called()
+        assert hunks and "analysis" not in stages.futures and "result" not in stages.futures
+        analyzer.stream_hunk_analysis.assert_not_called()
+
+    def test_unknown_stored_template(self, pipeline, extractor):
+        with pytest.raises(ValueError):
+            pipeline.run(_read("Lease_Contract.pdf"), template_hash="missing")
+
+    def test_large_contract_streams(self, tmp_path, analyzer, extractor):
+        def analyze_hunk_stream(hunks, entities_for, on_chunk):
+            entities_for(list(hunks))
+            on_chunk(0, "Rent changed")
+            return "Summary"
+
+        analyzer.analyze_hunk_stream.side_effect = analyze_hunk_stream
+        pipeline = ContractPipeline(TemplateStore(str(tmp_path / "templates")), analyzer,
+                                    RevisionStore(str(tmp_path / "revisions")), streaming_pages=1)
+        job = Job("key")
+        result = pipeline.run(_read("Lease_Contract.pdf"), _read("Lease_Contract_Template.pdf"),
+                              template_name="lease.pdf", contract_id="lease", job=job)
+        assert result["analysis"] == "Summary"
+        assert 0 < result["similarity"] < 1
+        assert result["side_by_side"] is None and result["revision"] is None
+        assert result["streaming"]["hunks"] > 0
+        assert [finding["text"] for finding in job.findings] == ["Rent changed"]
+        analyzer.stream_hunk_analysis.assert_not_called()
+        # Streamed templates are not stored, since the store keeps their full text
+        assert os.listdir(tmp_path / "templates") == []
+
+    def test_profiled_run_is_serial(self, pipeline, extractor):
+        result = pipeline.run(_read("Lease_Contract.pdf"), _read("Lease_Contract_Template.pdf"), profile=True)
+        profiles = result["metrics"]["profiles"]
+        assert result["analysis"] == "Summary"
+        # Stages no longer overlap each other, so they are profiled on their own
+        for name in ("pdf_extract", "clause_diff", "diff", "ner"):
+            assert "overlapped" not in profiles[name]
+            assert "top_functions" in profiles[name]
@@ -0,0 +1,68 @@
+# tests/test_revision_store.py
+import pytest
+from app.components.revision_store import Revision, RevisionStore, contract_identity, scoped_contract_id
+
+@pytest.fixture
+def store(tmp_path):
+    return RevisionStore(str(tmp_path / "revisions"))
+
+def _revision(pdf_hash: str, text: str = "1. Term\nOne year.") -> Revision:
+    return Revision(pdf_hash, "template", text, {"key": [{}, {"MONEY": ["$1"]}]},
+                    [{"hunks": ["key"], "analysis": "Fee changed"}], "Fee changed", 0.9)
+
+class TestContractIdentity:
+    @pytest.mark.parametrize("name", [
+        "Lease_Contract.pdf", "Lease Contract v2.pdf", "lease-contract-rev 3 (final).pdf",
+        "LEASE_CONTRACT_draft (1).pdf", "uploads/Lease Contract Redline.pdf",
+    ])
+    def test_version_markers_ignored(self, name):
+        assert contract_identity(name) == "lease_contract"
+
+    def test_distinct_contracts(self):
+        assert contract_identity("Employment_1.pdf") != contract_identity("Employment_2.pdf")
+
+    def test_scoped_by_workspace(self):
+        assert scoped_contract_id("alice", "lease") != scoped_contract_id("bob", "lease")
+        assert scoped_contract_id("alice", "") == ""
+
+class TestRevisionStore:
+    def test_unknown_contract(self, store):
+        assert store.history("lease") == []
+        assert store.latest("lease") is None
+
+    def test_revisions_numbered_and_persisted(self, store):
+        store.add("lease", _revision("a"))
+        store.add("lease", _revision("b", "1. Term\nTwo years."))
+        reopened = RevisionStore(store.root_dir)
+        latest = reopened.latest("lease")
+        assert [revision.number for revision in reopened.history("lease")] == [1, 2]
+        assert latest.pdf_hash == "b"
+        assert latest.chunks == [{"hunks": ["key"], "analysis": "Fee changed"}]
+        assert latest.hunk_entities == {"key": [{}, {"MONEY": ["$1"]}]}
+        assert latest.clause_index.clauses[0].text == "Term Two years."
+
+    def test_reupload_replaces_latest(self, store):
+        store.add("lease", _revision("a"))
+        store.add("lease", _revision("b"))
+        assert store.add("lease", _revision("b")).number == 2
+        assert len(store.history("lease")) == 2
+
+    def test_previous_skips_same_pdf(self, store):
+        assert store.previous("lease", "a") is None
+        store.add("lease", _revision("a"))
+        assert store.previous("lease", "a") is None
+        store.add("lease", _revision("b"))
+        assert store.previous("lease", "b").pdf_hash == "a"
+        assert store.previous("lease", "c").pdf_hash == "b"
+
+    def test_history_bounded(self, tmp_path):
+        store = RevisionStore(str(tmp_path), max_revisions=3)
+        for pdf_hash in "abcde":
+            store.add("lease", _revision(pdf_hash))
+        assert [revision.number for revision in store.history("lease")] == [3, 4, 5]
+
+    def test_contracts_kept_apart(self, store):
+        store.add("lease", _revision("a"))
+        store.add("employment", _revision("b"))
+        assert store.latest("lease").pdf_hash == "a"
+        assert store.latest("employment").pdf_hash == "b"
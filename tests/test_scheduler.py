@@ -0,0 +1,78 @@
+# tests/test_scheduler.py
+import threading
+import pytest
+from app.components.instrumentation import Metrics, current_metrics
+from app.components.scheduler import StageScheduler
+
+class TestStageScheduler:
+    def test_dependencies_feed_results(self):
+        with StageScheduler() as stages:
+            stages.add("a", lambda: 2)
+            stages.add("b", lambda: 3)
+            stages.add("sum", lambda a, b: a + b, ("a", "b"))
+            stages.add("double", lambda total: total * 2, ("sum",))
+            assert stages.result("double", timeout=5) == 10
+
+    def test_independent_stages_run_in_parallel(self):
+        barrier = threading.Barrier(2, timeout=5)
+        with StageScheduler(max_workers=2) as stages:
+            stages.add("left", barrier.wait)
+            stages.add("right", barrier.wait)
+            # Would time out (BrokenBarrierError) if the two stages ran one after the other
+            assert {stages.result("left", 5), stages.result("right", 5)} == {0, 1}
+
+    def test_stage_starts_before_unrelated_stages_finish(self):
+        release = threading.Event()
+        with StageScheduler(max_workers=2) as stages:
+            stages.add("slow", lambda: release.wait(5))
+            stages.add("fast", lambda: "done")
+            stages.add("after_fast", lambda fast: fast + "!", ("fast",))
+            assert stages.result("after_fast", timeout=5) == "done!"
+            assert not stages["slow"].done()
+            release.set()
+
+    def test_failure_propagates_to_dependents(self):
+        ran = []
+
+        def fail():
+            raise ValueError("bad pdf")
+        with StageScheduler() as stages:
+            stages.add("parse", fail)
+            stages.add("diff", ran.append, ("parse",))
+            with pytest.raises(ValueError, match="bad pdf"):
+                stages.result("diff", timeout=5)
+        assert ran == []
+
+    def test_unknown_or_duplicate_stage(self):
+        with StageScheduler() as stages:
+            stages.add("a", lambda: 1)
+            with pytest.raises(ValueError):
+                stages.add("a", lambda: 1)
+            with pytest.raises(ValueError):
+                stages.add("b", lambda x: x, ("missing",))
+
+    def test_stages_record_into_active_metrics(self):
+        metrics = Metrics()
+
+        def work():
+            with current_metrics().stage("work"):
+                return 1
+        with metrics.activate(), StageScheduler() as stages:
+            stages.add("work", work)
+            stages.result("work", timeout=5)
+        assert metrics.report()["stages"]["work"]["calls"] == 1
+
+    def test_shutdown_fails_pending_stages(self):
+        from concurrent.futures import CancelledError
+        release = threading.Event()
+        stages = StageScheduler(max_workers=1)
+        stages.add("busy", lambda: release.wait(5))
+        stages.add("queued", lambda: "never")
+        stages.add("after", lambda queued: queued, ("queued",))
+        stages.shutdown(wait=False)
+        release.set()
+        # Without a timeout: these must not hang
+        with pytest.raises(CancelledError):
+            stages.result("queued")
+        with pytest.raises(CancelledError):
+            stages.result("after")
@@ -0,0 +1,91 @@
+# tests/test_streaming.py
+import os
+import subprocess
+import sys
+import pytest
+from unittest.mock import Mock
+from app.components.streaming import (FIXED_OVERHEAD_BYTES, MAX_WINDOW_LINES, MIN_WINDOW_LINES, StreamingAnalysis,
+                                      iter_lines, window_for_budget)
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+def _document(count, edited=False):
+    for i in range(count):
+        line = f"{i}. The supplier delivers the goods in schedule {i % 97} within {i % 30} days."
+        if edited and i % 500 == 17:
+            line = line.replace("delivers", "may deliver")
+        yield line
+
+def _analyzer():
+    analyzer = Mock()
+
+    def analyze_hunk_stream(hunks, entities_for, on_chunk):
+        hunks = list(hunks)
+        entities_for(hunks)
+        if on_chunk is not None:
+            on_chunk(0, f"{len(hunks)} changes")
+        return "Summary"
+
+    analyzer.analyze_hunk_stream.side_effect = analyze_hunk_stream
+    return analyzer
+
+class TestWindowForBudget:
+    def test_grows_with_budget(self):
+        assert MIN_WINDOW_LINES <= window_for_budget(128 * 2**20) < window_for_budget(256 * 2**20)
+        assert window_for_budget(64 * 2**30) == MAX_WINDOW_LINES
+
+    def test_budget_too_small(self):
+        with pytest.raises(ValueError):
+            window_for_budget(FIXED_OVERHEAD_BYTES)
+
+def test_iter_lines():
+    assert list(iter_lines(iter(["a\nb", "", "c"]))) == ["a", "b", "c"]
+
+class TestStreamingAnalysis:
+    def test_run(self):
+        ner_extractor = Mock()
+        ner_extractor.extract_hunk_entities.side_effect = lambda hunks: ([{}] * len(hunks), [{"ORG": ["Acme"]}] * len(hunks))
+        ner_extractor.merge_entities.side_effect = lambda dicts: {"ORG": ["Acme"]} if dicts else {}
+        findings = []
+        result = StreamingAnalysis(_analyzer(), ner_extractor, 128 * 2**20).run(
+            _document(3000), _document(3000, edited=True), lambda index, text: findings.append(text))
+        assert result["analysis"] == "Summary"
+        assert result["hunks"] == 6
+        assert findings == ["6 changes"]
+        assert result["entities"] == {"ORG": ["Acme"]}
+        assert result["lines"] == (3000, 3000)
+        assert 0.99 < result["similarity"] < 1
+
+    def test_without_ner(self):
+        result = StreamingAnalysis(_analyzer(), None, 128 * 2**20).run(_document(10), _document(10), None)
+        assert result["hunks"] == 0
+        assert result["entities"] == {}
+        assert result["similarity"] == 1.0
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="needs /proc to measure RSS")
+def test_peak_memory_within_budget():
+    # A 300k-line pair through the real analyzer (against the mock LLM server), in a fresh process
+    code = f"""
+import os, sys
+sys.path.insert(0, {ROOT_DIR!r})
+from benchmarks.mock_llm import MockCompletionServer
+from benchmarks.run import current_rss_bytes, peak_rss_bytes, reset_peak_rss
+from app.components.llm_analyzer import LLMAnalyzer
+from app.components.streaming import StreamingAnalysis
+from tests.test_streaming import _document
+with MockCompletionServer(latency=0) as server:
+    os.environ["GROQ_BASE_URL"] = server.base_url
+    os.environ["GROQ_API_KEY"] = "test-key"
+    analyzer = LLMAnalyzer(max_concurrency=4)
+    reset_peak_rss()
+    baseline = current_rss_bytes()
+    result = StreamingAnalysis(analyzer, None, 128 * 2**20).run(_document(300_000), _document(300_000, edited=True))
+    print(result["hunks"], peak_rss_bytes() - baseline)
+"""
+    env = {key: value for key, value in os.environ.items() if key not in ("GROQ_BASE_URL", "GROQ_API_KEY")}
+    completed = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, env=env, capture_output=True, text=True,
+                               timeout=300)
+    assert completed.returncode == 0, completed.stderr
+    hunks, growth = map(int, completed.stdout.split())
+    assert hunks == 600
+    assert growth < 128 * 2**20
@@ -0,0 +1,129 @@
+import pytest
+from unittest.mock import Mock
+from app.components.template_store import TemplateFingerprint, TemplateStore
+from app.components.diff_engine import line_hash
+
+@pytest.fixture
+def store(tmp_path):
+    return TemplateStore(str(tmp_path / "templates"))
+
+def _parser(extractor):
+    parser = Mock(extractor=extractor)
+    parser.extract_text.return_value = "1. Term\nThe term is one year."
+    parser.cache_key.side_effect = lambda data: f"{extractor}:{TemplateStore.hash_bytes(data)}"
+    return parser
+
+@pytest.fixture
+def pdf_parser():
+    return _parser("pdfplumber:1.0")
+
+class TestTemplateFingerprint:
+    def test_line_hashes(self):
+        fingerprint = TemplateFingerprint("abc", "first\nsecond")
+        assert fingerprint.lines == ["first", "second"]
+        assert fingerprint.line_hashes == [line_hash("first"), line_hash("second")]
+
+    def test_roundtrip(self):
+        fingerprint = TemplateFingerprint("abc", "text", name="lease.pdf")
+        restored = TemplateFingerprint.from_dict(fingerprint.to_dict())
+        assert restored.text == "text"
+        assert restored.line_hashes == fingerprint.line_hashes
+        assert restored.name == "lease.pdf"
+
+class TestTemplateStore:
+    def test_get_missing(self, store):
+        assert store.get("missing") is None
+
+    def test_get_or_create_parses_once(self, store, pdf_parser):
+        first = store.get_or_create(b"%PDF template", pdf_parser)
+        second = store.get_or_create(b"%PDF template", pdf_parser)
+
+        assert first is second
+        assert first.template_hash == TemplateStore.template_key(b"%PDF template", pdf_parser)
+        assert first.extractor == "pdfplumber:1.0"
+        pdf_parser.extract_text.assert_called_once()
+
+    def test_other_extractor_parses_again(self, store, pdf_parser):
+        first = store.get_or_create(b"%PDF template", pdf_parser)
+        other = _parser("pypdfium2:4.0")
+        second = store.get_or_create(b"%PDF template", other)
+        assert second.template_hash != first.template_hash
+        other.extract_text.assert_called_once()
+        assert [fingerprint for fingerprint, _ in store.find_similar(second.text, extractor="pypdfium2:4.0")] == [second]
+
+    def test_memory_bounded(self, tmp_path, pdf_parser):
+        store = TemplateStore(str(tmp_path / "templates"), max_in_memory=2)
+        first = store.get_or_create(b"one", pdf_parser)
+        store.get_or_create(b"two", pdf_parser)
+        store.get(first.template_hash)  # Most recently used
+        store.get_or_create(b"three", pdf_parser)
+        assert list(store._memory) == [first.template_hash, TemplateStore.template_key(b"three", pdf_parser)]
+        # Evicted fingerprints still load from disk
+        assert store.get(TemplateStore.template_key(b"two", pdf_parser)).text == first.text
+
+    def test_memory_only(self, tmp_path, pdf_parser, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        store = TemplateStore(None)
+        fingerprint = store.get_or_create(b"%PDF template", pdf_parser)
+        assert store.get_or_create(b"%PDF template", pdf_parser) is fingerprint
+        assert [match for match, _ in store.find_similar(fingerprint.text)] == [fingerprint]
+        assert list(tmp_path.iterdir()) == []
+
+    def test_persisted_across_instances(self, tmp_path, pdf_parser):
+        root = str(tmp_path / "templates")
+        TemplateStore(root).get_or_create(b"%PDF template", pdf_parser)
+
+        fingerprint = TemplateStore(root).get_or_create(b"%PDF template", pdf_parser)
+        assert fingerprint.text == "1. Term\nThe term is one year."
+        pdf_parser.extract_text.assert_called_once()
+
+    def test_stale_format_rebuilt(self, store, pdf_parser):
+        store.FORMAT_VERSION = 0
+        store.put(TemplateFingerprint(TemplateStore.template_key(b"pdf", pdf_parser), "old text"))
+        store._memory.clear()
+        store.FORMAT_VERSION = TemplateStore.FORMAT_VERSION
+
+        fingerprint = store.get_or_create(b"pdf", pdf_parser)
+        assert fingerprint.text == "1. Term\nThe term is one year."
+
+class TestTemplateSimilarity:
+    LEASE = "1. Premises\nThe landlord rents the premises at [ADDRESS] to the tenant for retail use.\n" \
+            "2. Rent\nThe tenant pays [AMOUNT] per month in advance on the first day of each month."
+    EMPLOYMENT = "1. Position\nThe employee works as [TITLE] and reports to the manager.\n" \
+                 "2. Salary\nThe employer pays a salary of [SALARY] per year in monthly installments."
+
+    def _put(self, store, template_hash, text, name):
+        store.put(TemplateFingerprint(template_hash, text, name=name))
+
+    def test_minhash_persisted(self, store):
+        self._put(store, "lease", self.LEASE, "Lease.pdf")
+        restored = TemplateStore(store.root_dir).get("lease")
+        assert restored.name == "Lease.pdf"
+        assert restored.minhash.to_list() == TemplateFingerprint("x", self.LEASE).minhash.to_list()
+
+    def test_find_similar(self, store):
+        self._put(store, "lease", self.LEASE, "Lease.pdf")
+        self._put(store, "employment", self.EMPLOYMENT, "Employment.pdf")
+        contract = self.LEASE.replace("[ADDRESS]", "12 Main Street").replace("[AMOUNT]", "$900")
+        results = TemplateStore(store.root_dir).find_similar(contract)
+        assert [fingerprint.template_hash for fingerprint, _ in results] == ["lease"]
+        assert 0.4 < results[0][1] < 1.0
+
+    def test_extractor_filtered_before_top_k(self, store):
+        store.put(TemplateFingerprint("plumber-1", self.LEASE, extractor="pdfplumber:1.0"))
+        store.put(TemplateFingerprint("plumber-2", self.LEASE + "\n3. Notices", extractor="pdfplumber:1.0"))
+        store.put(TemplateFingerprint("pdfium", self.LEASE + "\n3. Term", extractor="pypdfium2:4.0"))
+        results = TemplateStore(store.root_dir).find_similar(self.LEASE, k=1, extractor="pypdfium2:4.0")
+        assert [fingerprint.template_hash for fingerprint, _ in results] == ["pdfium"]
+
+    def test_index_reads_only_sketches(self, store):
+        self._put(store, "lease", self.LEASE, "Lease.pdf")
+        with open(store._path("lease"), "w", encoding="utf-8") as f:
+            f.write("not parsed while indexing")
+        index = TemplateStore(store.root_dir)._similarity_index()
+        assert "lease" in index
+
+    def test_index_updated_on_put(self, store):
+        assert store.find_similar(self.EMPLOYMENT) == []
+        self._put(store, "employment", self.EMPLOYMENT, None)
+        assert store.find_similar(self.EMPLOYMENT)[0][1] == 1.0
@@ -1,5 +1,6 @@
 import pytest
-from app.components.text_compare import TextComparer
+from unittest.mock import patch
+from app.components.text_compare import TextComparer, WindowedComparer
 
 class TestTextComparer:
     @pytest.fixture
@@ -79,4 +80,192 @@ class TestTextComparer:
         
         # Verify structure
         assert len(side_by_side['left']) < len(side_by_side['right'])  # Right has extra inserted line
-        assert 0 < similarity < 1  # Partially similar
\ No newline at end of file
+        assert 0 < similarity < 1  # Partially similar
+class TestCompactDiff:
+    @pytest.fixture
+    def long_texts(self):
+        left = [f"Clause {i} unchanged." for i in range(40)]
+        right = list(left)
+        right[5] = "Clause 5 was edited."
+        right[30] = "Clause 30 was edited."
+        return "\n".join(left), "\n".join(right)
+
+    def test_no_changes_no_hunks(self):
+        diff, _, _ = TextComparer.compare_texts("Same\nText", "Same\nText")
+        assert TextComparer.compact_diff(diff) == []
+
+    def test_hunks_have_limited_context(self, long_texts):
+        diff, _, _ = TextComparer.compare_texts(*long_texts)
+        hunks = TextComparer.compact_diff(diff, context=2)
+
+        assert len(hunks) == 2
+        assert hunks[0].header == "@@ -4,5 +4,5 @@"
+        assert hunks[0].lines == [
+            "  Clause 3 unchanged.",
+            "  Clause 4 unchanged.",
+            "- Clause 5 unchanged.",
+            "+ Clause 5 was edited.",
+            "  Clause 6 unchanged.",
+            "  Clause 7 unchanged.",
+        ]
+        assert hunks[1].left_start == 29
+        assert hunks[1].right_start == 29
+
+    def test_hint_lines_dropped(self):
+        diff = ["  same", "- The price is 100", "? ^", "+ The price is 200", "? ^"]
+        hunks = TextComparer.compact_diff(diff, context=0)
+        assert len(hunks) == 1
+        assert not any(line.startswith('? ') for line in hunks[0].lines)
+        assert hunks[0].header == "@@ -2,1 +2,1 @@"
+
+    def test_nearby_changes_merge(self):
+        diff = ["- a", "  b", "  c", "+ d"]
+        hunks = TextComparer.compact_diff(diff, context=1)
+        assert len(hunks) == 1
+        assert hunks[0].lines == diff
+
+    def test_hunk_key_ignores_line_numbers(self):
+        from app.components.text_compare import hunk_key
+        lines = ["- old", "+ new"]
+        assert hunk_key(["@@ -4,1 +4,1 @@"] + lines) == hunk_key(["@@ -9,1 +10,1 @@"] + lines)
+        assert hunk_key(["@@ -4,1 +4,1 @@"] + lines) != hunk_key(["@@ -4,1 +4,1 @@", "- old", "+ newer"])
+        assert hunk_key(["@@ clause 2 @@"] + lines) != hunk_key(["@@ clause 3 @@"] + lines)
+
+    def test_format_hunks(self, long_texts):
+        diff, _, _ = TextComparer.compare_texts(*long_texts)
+        hunks = TextComparer.compact_diff(diff)
+        formatted = TextComparer.format_hunks(hunks)
+        assert formatted[0].startswith("@@ ")
+        assert len(formatted) == sum(len(h.lines) + 1 for h in hunks)
+        assert len(formatted) < len(diff)
+
+def test_unequal_replace_keeps_all_lines():
+    text1 = "Header\nOld one\nFooter"
+    text2 = "Header\nNew one\nNew two\nNew three\nFooter"
+    diff, _, side_by_side = TextComparer.compare_texts(text1, text2)
+    assert len([line for line in diff if line.startswith('+ ')]) == 3
+    assert [line for tag, line in side_by_side['right'] if tag == 'insert'] == ["New one", "New two", "New three"]
+
+def test_compare_with_template_matches_compare_texts():
+    from app.components.template_store import TemplateFingerprint
+    template_text = "Header\nSalary: $50,000\nFooter"
+    edited_text = "Header\nSalary: $60,000\nFooter\nAddendum"
+    fingerprint = TemplateFingerprint("hash", template_text)
+    assert TextComparer.compare_with_template(fingerprint, edited_text) == \
+        TextComparer.compare_texts(template_text, edited_text)
+
+def test_compare_without_diff():
+    with patch('app.components.text_compare.LineDiff.differ_lines') as differ_lines:
+        differences, similarity, side_by_side = TextComparer.compare_texts("a\nb", "a\nc", with_diff=False)
+    differ_lines.assert_not_called()
+    assert differences is None and similarity == 0.5
+    assert side_by_side.row_count == 2
+
+class TestClauseHunks:
+    TEMPLATE = ("Agreement between the parties.\n1. Term\nThe term is one year.\n2. Fees\n"
+                "Fees are $1,000 per month. Payment is due\nwithin 30 days.\n3. Notices\nNotices are written.")
+
+    def test_rewrapping_produces_no_hunks(self):
+        rewrapped = self.TEMPLATE.replace("Payment is due\nwithin", "Payment\nis due within")
+        assert TextComparer.compact_diff(TextComparer.compare_texts(self.TEMPLATE, rewrapped)[0])
+        assert TextComparer.clause_hunks(self.TEMPLATE, rewrapped) == []
+
+    def test_only_changed_sentence_sent(self):
+        edited = self.TEMPLATE.replace("$1,000", "$2,000")
+        hunks = TextComparer.clause_hunks(self.TEMPLATE, edited)
+        assert [hunk.to_lines() for hunk in hunks] == [[
+            "@@ clause 2 @@",
+            "- Fees Fees are $1,000 per month.",
+            "+ Fees Fees are $2,000 per month.",
+            "  Payment is due within 30 days.",
+        ]]
+
+    def test_renumbering_ignored_and_moves_reported(self):
+        edited = ("Agreement between the parties.\n1. Notices\nNotices are written.\n2. Term\n"
+                  "The term is one year.\n3. Fees\nFees are $1,000 per month. Payment is due within 30 days.")
+        hunks = TextComparer.clause_hunks(self.TEMPLATE, edited)
+        assert [hunk.header for hunk in hunks] == ["@@ clause 1 (was clause 3) moved @@"]
+        assert hunks[0].lines == []
+
+    def test_added_and_removed_clauses(self):
+        edited = self.TEMPLATE.replace("3. Notices\nNotices are written.", "4. Penalties\nLate fees apply.")
+        hunks = TextComparer.clause_hunks(self.TEMPLATE, edited)
+        assert [hunk.to_lines() for hunk in hunks] == [
+            ["@@ clause 3 removed @@", "- Notices Notices are written."],
+            ["@@ clause 4 added @@", "+ Penalties Late fees apply."],
+        ]
+
+    def test_template_clause_index_reused(self):
+        from app.components.template_store import TemplateFingerprint
+        fingerprint = TemplateFingerprint("hash", self.TEMPLATE)
+        assert fingerprint.clause_index is fingerprint.clause_index
+        edited = self.TEMPLATE.replace("one year", "two years")
+        assert [hunk.to_lines() for hunk in TextComparer.clause_hunks(fingerprint.clause_index, edited)] == \
+            [hunk.to_lines() for hunk in TextComparer.clause_hunks(self.TEMPLATE, edited)]
+
+class TestWindowedComparer:
+    @pytest.fixture
+    def documents(self):
+        left = [f"{i}. The supplier delivers batch {i % 7} within {i % 30} days." for i in range(400)]
+        right = list(left)
+        right[3] = "3. The supplier may deliver late."
+        del right[100:104]
+        right[200:200] = [f"Inserted clause {i}." for i in range(5)]
+        right[350] = right[350].replace("supplier", "vendor")
+        right.extend(["Addendum one.", "Addendum two."])
+        return left, right
+
+    @staticmethod
+    def _changed(hunks):
+        return sum(1 for hunk in hunks for line in hunk.lines if line[:2] in ('- ', '+ '))
+
+    @pytest.mark.parametrize("window_lines", [5, 7, 20, 50, 1000])
+    def test_hunks_match_full_diff(self, documents, window_lines):
+        left, right = documents
+        diff, similarity, _ = TextComparer.compare_texts("\n".join(left), "\n".join(right))
+        expected = [hunk.to_lines() for hunk in TextComparer.compact_diff(diff)]
+        comparer = WindowedComparer(window_lines)
+        hunks = list(comparer.iter_hunks(iter(left), iter(right)))
+        assert [hunk.to_lines() for hunk in hunks] == expected
+        assert comparer.similarity == pytest.approx(similarity, abs=0.01)
+        assert (comparer.left_lines, comparer.right_lines) == (len(left), len(right))
+        for previous, hunk in zip(hunks, hunks[1:]):
+            assert previous.left_start + previous.left_count <= hunk.left_start
+
+    @pytest.mark.parametrize("block", [150, 190])
+    def test_block_larger_than_window_realigns(self, block):
+        left = [f"{i}. The supplier delivers batch {i % 7}." for i in range(2000)]
+        exhibit = [f"Exhibit line {i}." for i in range(block)]
+        inserted = WindowedComparer(100).iter_hunks(iter(left), iter(left[:500] + exhibit + left[500:]))
+        assert self._changed(inserted) == block
+        removed = WindowedComparer(100).iter_hunks(iter(left), iter(left[:500] + left[500 + block:]))
+        assert self._changed(removed) == block
+
+    def test_block_beyond_lookahead_recovers(self):
+        left = [f"{i}. The supplier delivers batch {i % 7}." for i in range(5000)]
+        right = left[:500] + [f"Exhibit line {i}." for i in range(1000)] + left[500:]
+        right[-100] = "A late edit."
+        hunks = list(WindowedComparer(100).iter_hunks(iter(left), iter(right)))
+        # Over-reported around the block, but aligned again afterwards
+        assert self._changed(hunks) <= 3 * 1000 + 2
+        assert hunks[-1].lines == [f"  {left[-102]}", f"  {left[-101]}", f"- {left[-100]}", "+ A late edit.",
+                                   f"  {left[-99]}", f"  {left[-98]}"]
+
+    @pytest.mark.parametrize("window_lines", [1, 2, 3])
+    def test_tiny_windows_terminate(self, documents, window_lines):
+        left, right = documents
+        comparer = WindowedComparer(window_lines)
+        hunks = list(comparer.iter_hunks(iter(left), iter(right)))
+        assert (comparer.left_lines, comparer.right_lines) == (len(left), len(right))
+        reported = {line for hunk in hunks for line in hunk.lines if line[:2] in ('- ', '+ ')}
+        assert {'+ Addendum one.', '- 3. The supplier delivers batch 3 within 3 days.'} <= reported
+
+    def test_identical_streams(self):
+        lines = [f"line {i}" for i in range(100)]
+        comparer = WindowedComparer(10)
+        assert list(comparer.iter_hunks(iter(lines), iter(lines))) == []
+        assert comparer.similarity == 1.0
+
+    def test_invalid_window(self):
+        with pytest.raises(ValueError):
+            WindowedComparer(0)